@@ -138,6 +138,20 @@ export const promos = {
   generate: (count = 1) => api.post('promos/', { count }),
 };
 
+export const system = {
+  sessions: () => api.get('system/sessions/'),
+  cache: () => api.get('system/cache/'),
+  metrics: () => api.get('metrics/'),
+};
+
+export const profiles = {
+  list: () => api.get('profiles/'),
+  get: (id) => api.get(`profiles/${id}/`),
+  delete: (id) => api.delete(`profiles/${id}/`),
+  createToken: () => api.post('profiles/token/'),
+  downloadUrl: (id) => `/api/admin/profiles/${id}/download/`,
+};
+
 export const preview = {
   simulate: (settings) => api.post('preview/settings/', settings),
 };
@@ -393,6 +393,8 @@ export default function CardsPage() {
                   <div className="h-48 bg-gray-100">
                     <img
                       src={card.image}
+                      srcSet={webpSrcSet(card)}
+                      sizes="192px"
                       alt={card.title}
                       className="w-full h-full object-contain"
                     />
@@ -446,4 +448,9 @@ export default function CardsPage() {
       )}
     </div>
   );
-}
\ No newline at end of file
+}
+// Resized WebP copies from the API (image_variants); the original stays as src
+function webpSrcSet(card) {
+  const webp = card.image_variants?.formats?.find((f) => f.type === 'image/webp');
+  return webp?.sizes.map((size) => `${size.url} ${size.width}w`).join(', ');
+}
@@ -1,7 +1,7 @@
 // src/pages/DashboardPage.jsx - Main Dashboard with Analytics
 import React from 'react';
 import { useQuery } from '@tanstack/react-query';
-import { analytics } from '../lib/api';
+import { analytics, system } from '../lib/api';
 import {
   TrendingUp,
   Users,
@@ -41,6 +41,24 @@ export default function DashboardPage() {
     },
   });
 
+  const { data: metrics } = useQuery({
+    queryKey: ['request-metrics'],
+    queryFn: async () => {
+      const res = await system.metrics();
+      return res.data;
+    },
+    refetchInterval: 15000,
+  });
+
+  const slowestRoutes = (metrics?.routes || []).slice(0, 8).map((r) => ({
+    route: r.name && r.name !== '<unmatched>' ? r.name : r.route,
+    p50: r.latency_ms.p50,
+    p95: r.latency_ms.p95,
+    p99: r.latency_ms.p99,
+    queries: r.db.queries_mean,
+    count: r.count,
+  }));
+
   if (isLoading) {
     return (
       <div className="flex items-center justify-center h-96">
@@ -69,7 +87,7 @@ export default function DashboardPage() {
       value: overview?.overview?.active_sessions_period || 0,
       icon: TrendingUp,
       color: 'bg-purple-500',
-      change: '+8%',
+      change: `${overview?.funnel?.completion_rate || 0}% finished`,
     },
     {
       name: 'Promo Codes',
@@ -198,6 +216,32 @@ export default function DashboardPage() {
         </div>
       </div>
 
+      {/* Request Performance */}
+      <div className="bg-white rounded-xl shadow-md border border-gray-200 p-6">
+        <div className="flex items-center justify-between mb-4">
+          <h3 className="text-lg font-bold text-gray-900">Slowest Endpoints (ms)</h3>
+          <span className="text-sm text-gray-500 flex items-center gap-1">
+            <Target size={16} />
+            {metrics ? `since ${Math.round(metrics.uptime_seconds / 60)} min` : '—'}
+          </span>
+        </div>
+        <ResponsiveContainer width="100%" height={300}>
+          <BarChart data={slowestRoutes} layout="vertical" margin={{ left: 40 }}>
+            <CartesianGrid strokeDasharray="3 3" />
+            <XAxis type="number" />
+            <YAxis type="category" dataKey="route" width={140} tick={{ fontSize: 12 }} />
+            <Tooltip
+              formatter={(value, name) => [name === 'queries' ? value : `${value} ms`, name]}
+            />
+            <Legend />
+            <Bar dataKey="p50" fill="#10b981" name="p50" />
+            <Bar dataKey="p95" fill="#f59e0b" name="p95" />
+            <Bar dataKey="p99" fill="#ef4444" name="p99" />
+            <Bar dataKey="queries" fill="#6366f1" name="queries" />
+          </BarChart>
+        </ResponsiveContainer>
+      </div>
+
       {/* Top Players */}
       <div className="bg-white rounded-xl shadow-md border border-gray-200 p-6">
         <h3 className="text-lg font-bold text-gray-900 mb-4">Top Players</h3>
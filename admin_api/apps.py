@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class AdminApiConfig(AppConfig):
     name = 'admin_api'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from .middleware import install_query_timer
+
+        # Count queries for RequestMetricsMiddleware on every DB connection
+        connection_created.connect(install_query_timer, dispatch_uid='admin_api.install_query_timer')
+        for conn in connections.all(initialized_only=True):
+            install_query_timer(sender=None, connection=conn)
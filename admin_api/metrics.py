@@ -0,0 +1,202 @@
+# admin_api/metrics.py - In-process request metrics (latency, DB queries, response size)
+
+import math
+import threading
+import time
+
+
+class LogLinearHistogram:
+    """
+    HDR-style histogram over non-negative integers with fixed memory.
+
+    Values below 16 get their own bucket; above that every power of two is
+    split into 16 linear sub-buckets, so any recorded value is reproduced
+    within ~6%. 608 counters cover 0 .. 2**40.
+    """
+    SUB_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BITS
+    MAX_SHIFT = 36
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (self.SUB_BUCKETS * (self.MAX_SHIFT + 2))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def _index(cls, value):
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = min(value.bit_length() - cls.SUB_BITS - 1, cls.MAX_SHIFT)
+        top = min(value >> shift, 2 * cls.SUB_BUCKETS - 1)
+        return cls.SUB_BUCKETS + shift * cls.SUB_BUCKETS + (top - cls.SUB_BUCKETS)
+
+    @classmethod
+    def _bucket_value(cls, index):
+        """Midpoint of the value range covered by a bucket."""
+        if index < cls.SUB_BUCKETS:
+            return index
+        shift, offset = divmod(index - cls.SUB_BUCKETS, cls.SUB_BUCKETS)
+        low = (cls.SUB_BUCKETS + offset) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, value):
+        # Hot path: _index() inlined
+        if value < 16:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            shift = value.bit_length() - 5
+            if shift > 36:
+                index = len(self.counts) - 1
+            else:
+                index = 16 + (shift << 4) + (value >> shift) - 16
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            if bucket:
+                seen += bucket
+                if seen >= target:
+                    return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+
+class RouteMetrics:
+    """Counters for one URL route; latency in microseconds, sizes in bytes."""
+
+    def __init__(self, route, name):
+        self.route = route
+        self.name = name
+        self.lock = threading.Lock()
+        self.latency = LogLinearHistogram()
+        self.response_bytes = LogLinearHistogram()
+        self.errors = 0
+        self.db_queries = 0
+        self.db_queries_max = 0
+        self.db_time_us = 0
+
+    def record(self, latency_us, queries, db_time_us, size, status_code):
+        with self.lock:
+            self.latency.record(latency_us)
+            self.response_bytes.record(size)
+            self.db_queries += queries
+            self.db_time_us += db_time_us
+            if queries > self.db_queries_max:
+                self.db_queries_max = queries
+            if status_code >= 500:
+                self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            count = self.latency.count
+            return {
+                'route': self.route,
+                'name': self.name,
+                'count': count,
+                'errors': self.errors,
+                'latency_ms': {
+                    'mean': round(self.latency.mean() / 1000, 3),
+                    'p50': round(self.latency.percentile(0.50) / 1000, 3),
+                    'p90': round(self.latency.percentile(0.90) / 1000, 3),
+                    'p95': round(self.latency.percentile(0.95) / 1000, 3),
+                    'p99': round(self.latency.percentile(0.99) / 1000, 3),
+                    'max': round(self.latency.max / 1000, 3),
+                    'sum': round(self.latency.total / 1000, 3),
+                },
+                'db': {
+                    'queries_total': self.db_queries,
+                    'queries_mean': round(self.db_queries / count, 2) if count else 0,
+                    'queries_max': self.db_queries_max,
+                    'time_ms_total': round(self.db_time_us / 1000, 3),
+                    'time_ms_mean': round(self.db_time_us / count / 1000, 3) if count else 0,
+                },
+                'response_bytes': {
+                    'mean': round(self.response_bytes.mean()),
+                    'p95': round(self.response_bytes.percentile(0.95)),
+                    'total': self.response_bytes.total,
+                },
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def route(self, route, name):
+        metrics = self._routes.get(route)
+        if metrics is None:
+            with self._lock:
+                metrics = self._routes.setdefault(route, RouteMetrics(route, name))
+        return metrics
+
+    def snapshot(self):
+        routes = [metrics.snapshot() for metrics in list(self._routes.values())]
+        routes.sort(key=lambda r: r['latency_ms']['p95'], reverse=True)
+        return {
+            'since': self.started_at,
+            'uptime_seconds': round(time.time() - self.started_at),
+            'routes': routes,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+            self.started_at = time.time()
+
+
+registry = MetricsRegistry()
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(snapshot):
+    """Prometheus text exposition (summary-style quantiles per route)."""
+    lines = [
+        '# HELP fruitgame_http_request_duration_seconds Request latency per route.',
+        '# TYPE fruitgame_http_request_duration_seconds summary',
+    ]
+    for r in snapshot['routes']:
+        label = f'route="{_escape_label(r["route"])}",name="{_escape_label(r["name"])}"'
+        for q in ('p50', 'p90', 'p95', 'p99'):
+            quantile = int(q[1:]) / 100
+            lines.append(
+                f'fruitgame_http_request_duration_seconds{{{label},quantile="{quantile}"}} '
+                f'{r["latency_ms"][q] / 1000:.6f}'
+            )
+        lines.append(f'fruitgame_http_request_duration_seconds_sum{{{label}}} {r["latency_ms"]["sum"] / 1000:.6f}')
+        lines.append(f'fruitgame_http_request_duration_seconds_count{{{label}}} {r["count"]}')
+
+    counters = [
+        ('fruitgame_http_request_errors_total', 'Responses with status >= 500.', lambda r: r['errors']),
+        ('fruitgame_db_queries_total', 'Database queries executed.', lambda r: r['db']['queries_total']),
+        ('fruitgame_db_query_seconds_total', 'Time spent in database queries.',
+         lambda r: f'{r["db"]["time_ms_total"] / 1000:.6f}'),
+        ('fruitgame_http_response_bytes_total', 'Response body bytes.', lambda r: r['response_bytes']['total']),
+    ]
+    for metric, help_text, value in counters:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for r in snapshot['routes']:
+            label = f'route="{_escape_label(r["route"])}",name="{_escape_label(r["name"])}"'
+            lines.append(f'{metric}{{{label}}} {value(r)}')
+
+    return '\n'.join(lines) + '\n'
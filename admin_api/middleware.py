@@ -1,4 +1,14 @@
-# admin_api/middleware.py - CSRF Exempt Middleware for Admin API
+# admin_api/middleware.py - CSRF Exempt Middleware for Admin API, request metrics
+import contextvars
+import cProfile
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import registry
+from .profiling import PROFILE_HEADER, profile_reason, save_capture
+
 
 class AdminApiCsrfExemptMiddleware:
     """
@@ -15,4 +25,202 @@ class AdminApiCsrfExemptMiddleware:
             setattr(request, '_dont_enforce_csrf_checks', True)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+# ====================== REQUEST METRICS ======================
+class _QueryTimer:
+    """Per-request query counter filled by the connection-level wrapper below."""
+
+    __slots__ = ('count', 'elapsed')
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+
+_current_timer = contextvars.ContextVar('request_query_timer', default=None)
+_current_sql_trace = contextvars.ContextVar('request_sql_trace', default=None)
+
+
+def timed_execute(execute, sql, params, many, context):
+    """
+    execute_wrapper installed once on every DB connection (see AdminApiConfig).
+    Doing it per request through connection.execute_wrapper() would cost a
+    few microseconds for the thread-local connection lookup alone.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        timer.elapsed += duration
+        timer.count += 1
+
+        trace = _current_sql_trace.get()
+        if trace is not None:
+            # Placeholders only: parameter values (phone numbers, promo
+            # codes) must not end up in capture files on disk
+            trace.append({
+                'sql': sql,
+                'many': many,
+                'duration_ms': round(duration * 1000, 3),
+            })
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver."""
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count/time and response size per URL route
+    into admin_api.metrics.registry (served by /api/admin/metrics/).
+    Keep it first in MIDDLEWARE so the timings cover the whole stack.
+
+    Sync and async: under ASGI a sync-only middleware would put the whole
+    stack, async views included, back on a worker thread. Queries the async
+    ORM runs on its threads are still counted (they copy the context).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', False)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self._acall(request)
+        timer = _QueryTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_timer.reset(token)
+        return self.record(request, response, timer, elapsed)
+
+    async def _acall(self, request):
+        timer = _QueryTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_timer.reset(token)
+        return self.record(request, response, timer, elapsed)
+
+    def record(self, request, response, timer, elapsed):
+        match = request.resolver_match
+        if match is not None:
+            route, name = match.route, match.view_name
+        else:
+            route, name = '<unmatched>', '<unmatched>'
+
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+
+        registry.route(route, name).record(
+            int(elapsed * 1_000_000), timer.count, int(timer.elapsed * 1_000_000),
+            size, response.status_code,
+        )
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.2f}, '
+                f'db;dur={timer.elapsed * 1000:.2f};desc="{timer.count} queries"'
+            )
+        return response
+
+
+# ====================== PROFILER ======================
+class RequestProfilerMiddleware:
+    """
+    Captures a cProfile stack profile plus the ordered SQL trace of a request
+    when it carries a staff profile token (X-Profile-Token header) or is
+    picked by PROFILER_SAMPLE_RATE. Captures are listed at
+    /api/admin/profiles/. Must come after RequestMetricsMiddleware.
+
+    In async mode the profile covers the event loop thread only (queries
+    run on sync_to_async threads, and other requests' coroutines interleave);
+    the SQL trace is still complete.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self._acall(request)
+        reason = profile_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        trace = []
+        token = _current_sql_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            _current_sql_trace.reset(token)
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            _current_sql_trace.reset(token)
+
+        capture_id = save_capture(profiler, trace, request, response, duration, reason)
+        response['X-Profile-Id'] = capture_id
+        return response
+
+    async def _acall(self, request):
+        # A token is checked against the database (is_staff): not on the event loop
+        if PROFILE_HEADER in request.META:
+            reason = await sync_to_async(profile_reason)(request)
+        else:
+            reason = profile_reason(request)
+        if reason is None:
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        trace = []
+        token = _current_sql_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            _current_sql_trace.reset(token)
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            _current_sql_trace.reset(token)
+
+        # Writes files and may load request.user
+        capture_id = await sync_to_async(save_capture)(profiler, trace, request, response, duration, reason)
+        response['X-Profile-Id'] = capture_id
+        return response
@@ -0,0 +1,141 @@
+# admin_api/profiling.py - Opt-in per-request cProfile + SQL trace captures
+
+import io
+import json
+import pstats
+import random
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils import timezone
+
+PROFILE_TOKEN_SALT = 'admin_api.profile-token'
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+
+_CAPTURE_ID_RE = re.compile(r'^\d{14}-[0-9a-f]{8}$')
+
+
+def issue_profile_token(user):
+    """Signed token a staff user sends as X-Profile-Token to profile a request."""
+    return signing.dumps({'u': user.pk}, salt=PROFILE_TOKEN_SALT)
+
+
+def profile_reason(request):
+    """
+    Why this request should be profiled ('staff' / 'sampled'), or None.
+
+    Header only - a query parameter would end up in access logs and
+    Referer headers. The token's user must still be active staff.
+    """
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        try:
+            payload = signing.loads(token, salt=PROFILE_TOKEN_SALT, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+        except signing.BadSignature:
+            payload = None
+        if payload and _is_staff(payload.get('u')):
+            return 'staff'
+
+    rate = settings.PROFILER_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return 'sampled'
+    return None
+
+
+def _is_staff(user_id):
+    return get_user_model().objects.filter(pk=user_id, is_staff=True, is_active=True).exists()
+
+
+def capture_dir():
+    path = Path(settings.PROFILER_CAPTURE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _top_functions(profiler, limit=40):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+def save_capture(profiler, sql_trace, request, response, duration, reason):
+    """Write <id>.prof (pstats) and <id>.json (metadata + SQL trace), prune old captures."""
+    capture_id = f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    directory = capture_dir()
+
+    profiler.dump_stats(str(directory / f"{capture_id}.prof"))
+
+    match = request.resolver_match
+    user = getattr(request, 'user', None)
+
+    # Parameter names only: values can be phone numbers
+    path = request.path + (f"?{'&'.join(sorted(request.GET))}" if request.GET else '')
+
+    meta = {
+        'id': capture_id,
+        'created_at': timezone.now().isoformat(),
+        'reason': reason,
+        'method': request.method,
+        'path': path,
+        'route': match.route if match else None,
+        'view_name': match.view_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+        'sql_count': len(sql_trace),
+        'sql_time_ms': round(sum(q['duration_ms'] for q in sql_trace), 3),
+        'sql': sql_trace,
+        'top_functions': _top_functions(profiler),
+    }
+    (directory / f"{capture_id}.json").write_text(json.dumps(meta, default=str))
+
+    _prune(directory)
+    return capture_id
+
+
+def _prune(directory):
+    captures = sorted(directory.glob('*.json'))
+    for old in captures[:-settings.PROFILER_MAX_CAPTURES]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def list_captures():
+    """Newest first, without the heavy SQL/stats payloads."""
+    captures = []
+    for path in sorted(capture_dir().glob('*.json'), reverse=True):
+        try:
+            meta = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        meta.pop('sql', None)
+        meta.pop('top_functions', None)
+        captures.append(meta)
+    return captures
+
+
+def capture_path(capture_id, suffix):
+    """Path of a capture file, or None for unknown / malformed ids."""
+    if not _CAPTURE_ID_RE.match(capture_id):
+        return None
+    path = capture_dir() / f"{capture_id}{suffix}"
+    return path if path.exists() else None
+
+
+def load_capture(capture_id):
+    path = capture_path(capture_id, '.json')
+    return json.loads(path.read_text()) if path else None
+
+
+def delete_capture(capture_id):
+    path = capture_path(capture_id, '.json')
+    if path is None:
+        return False
+    path.unlink(missing_ok=True)
+    path.with_suffix('.prof').unlink(missing_ok=True)
+    return True
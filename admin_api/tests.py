@@ -1,3 +1,282 @@
-from django.test import TestCase
+import cProfile
+import json
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import DifficultySettings, FruitCard, GameConfig, Player, TextCard
+from core.testing import PerformanceTestCase
+
+from . import profiling
+from .metrics import LogLinearHistogram, registry as metrics_registry, render_prometheus
+
+# core/urls.py also names a route 'game-config', so that one is addressed by path
+GAME_CONFIG_URL = '/api/admin/config/'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminApiPerformanceTests(PerformanceTestCase):
+    """Query / latency budgets for every view in admin_api/urls.py"""
+    baseline_path = Path(__file__).with_name('perf_baseline.json')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = Player.objects.create_superuser(
+            phone_number='+998990000001', name='Admin', password='secret',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, name, max_queries, budget_ms, data=None, **kwargs):
+        self.assertPerformance(
+            name, lambda: self.client.get(reverse(name, kwargs=kwargs or None), data or {}),
+            max_queries=max_queries, budget_ms=budget_ms,
+        )
+
+    def send(self, method, name, payload, max_queries, budget_ms, status=200, label=None, **kwargs):
+        self.assertPerformance(
+            label or f"{name} {method}",
+            lambda: getattr(self.client, method)(
+                reverse(name, kwargs=kwargs or None), payload, content_type='application/json',
+            ),
+            max_queries=max_queries, budget_ms=budget_ms, status=status,
+        )
+
+    # ---------------- auth ----------------
+    def test_auth(self):
+        self.get('admin-profile', max_queries=2, budget_ms=20)
+        self.assertPerformance(
+            'admin-login',
+            lambda: self.client.post(reverse('admin-login'), {
+                'phone_number': self.admin.phone_number, 'password': 'secret',
+            }, content_type='application/json'),
+            max_queries=7, budget_ms=30,
+        )
+        self.send('post', 'admin-logout', {}, max_queries=4, budget_ms=20, label='admin-logout')
+
+    # ---------------- content ----------------
+    def test_difficulty(self):
+        setting = DifficultySettings.objects.get(difficulty_level=1)
+        self.get('difficulty-list', max_queries=3, budget_ms=20)
+        self.send('put', 'difficulty-detail', {'time_seconds': 170}, max_queries=4, budget_ms=20, pk=setting.pk)
+
+    def test_game_config(self):
+        self.assertPerformance(
+            'game-config', lambda: self.client.get(GAME_CONFIG_URL), max_queries=3, budget_ms=20,
+        )
+        self.assertPerformance(
+            'game-config put',
+            lambda: self.client.put(GAME_CONFIG_URL, {'promo_score_threshold': 120}, content_type='application/json'),
+            max_queries=6, budget_ms=20,
+        )
+
+    def test_cards(self):
+        fruit = FruitCard.objects.first()
+        text = TextCard.objects.first()
+        self.get('fruit-cards-list', max_queries=3, budget_ms=30)
+        self.get('text-cards-list', max_queries=3, budget_ms=30)
+        self.send('put', 'fruit-card-detail', {'weight': 2}, max_queries=4, budget_ms=20, pk=fruit.pk)
+        self.send('put', 'text-card-detail', {'correct_fruit_id': fruit.pk}, max_queries=5, budget_ms=20,
+                  pk=text.pk)
+
+    # ---------------- analytics ----------------
+    def test_analytics_overview(self):
+        # Same limit for 7 and 90 days: one GROUP BY, not a query per day
+        for days in (7, 90):
+            self.assertPerformance(
+                f"analytics-overview {days}d",
+                lambda: self.client.get(reverse('analytics-overview'), {'days': days}),
+                max_queries=8, budget_ms=150,
+            )
+
+    def test_analytics_players(self):
+        self.get('analytics-players', max_queries=3, budget_ms=60)
+
+    # ---------------- players & promos ----------------
+    def test_players(self):
+        self.get('players-list', max_queries=4, budget_ms=40)
+        self.get('players-list', max_queries=4, budget_ms=40, data={'search': '+99870', 'page': 3})
+        player = Player.objects.get(pk=self.player_ids[1])
+        self.send('put', 'player-detail', {'is_active': True}, max_queries=4, budget_ms=20, pk=player.pk)
+
+    def test_promos(self):
+        self.get('promos-list', max_queries=3, budget_ms=80)
+        # 50 codes must not mean 50 INSERTs
+        self.send('post', 'promos-list', {'count': 50}, max_queries=4, budget_ms=40, status=201,
+                  label='promos-list post 50')
+
+    # ---------------- system ----------------
+    def test_system(self):
+        self.get('system-sessions', max_queries=4, budget_ms=20)
+        self.get('system-cache', max_queries=2, budget_ms=20)
+        self.get('metrics', max_queries=2, budget_ms=30)
+        self.get('metrics-prometheus', max_queries=2, budget_ms=30)
+
+    def test_profiles(self):
+        self.send('post', 'profiles-token', {}, max_queries=2, budget_ms=20, label='profiles-token')
+        self.get('profiles-list', max_queries=2, budget_ms=50)
+        self.assertPerformance(
+            'profile-detail (missing)',
+            lambda: self.client.get(reverse('profile-detail', kwargs={'capture_id': '20000101000000-deadbeef'})),
+            max_queries=2, budget_ms=20, status=404,
+        )
+
+    def test_preview(self):
+        self.send('post', 'preview-settings', {'base_points': 8}, max_queries=2, budget_ms=20,
+                  label='preview-settings')
+
+
+class LogLinearHistogramTests(SimpleTestCase):
+
+    def test_bucketing(self):
+        histogram = LogLinearHistogram()
+        for value in range(16):
+            self.assertEqual(histogram._bucket_value(histogram._index(value)), value)   # exact below 16
+        for value in [16, 17, 100, 1000, 12345, 10 ** 6, 2 ** 39]:
+            middle = histogram._bucket_value(histogram._index(value))
+            self.assertLessEqual(abs(middle - value) / value, 1 / 16, value)
+        # record() inlines _index(); both must agree
+        for value in [0, 5, 15, 16, 31, 32, 1000, 2 ** 20 + 3, 2 ** 41, 2 ** 50]:
+            histogram = LogLinearHistogram()
+            histogram.record(value)
+            self.assertEqual(histogram.counts.index(1), histogram._index(value), value)
+
+    def test_quantiles(self):
+        histogram = LogLinearHistogram()
+        self.assertEqual(histogram.percentile(0.5), 0)
+        for value in range(1, 1001):
+            histogram.record(value)
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(histogram.percentile(q), q * 1000, delta=q * 1000 / 16)
+        self.assertEqual(histogram.percentile(1.0), 1000)   # capped at the real max
+        self.assertEqual((histogram.count, histogram.total, histogram.mean()), (1000, 500500, 500.5))
+
+        histogram.record(-5)   # clamped to 0
+        self.assertEqual(histogram.percentile(0.0001), 0)
+
+
+@override_settings(METRICS_TOKEN='scraper-secret', REQUEST_METRICS_SERVER_TIMING=True)
+class RequestMetricsTests(TestCase):
+    """RequestMetricsMiddleware and the JSON / Prometheus endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Player.objects.create_superuser(phone_number='+998990000002', name='Admin', password='x')
+        GameConfig.load()
+
+    def setUp(self):
+        caches[settings.GAME_CACHE_ALIAS].clear()
+        metrics_registry.reset()
+
+    def route(self, route):
+        return next(r for r in metrics_registry.snapshot()['routes'] if r['route'] == route)
+
+    def test_middleware_records_per_route(self):
+        for _ in range(3):
+            response = self.client.get('/api/leaderboard/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        self.client.get('/api/nope/')
+
+        leaderboard = self.route('api/leaderboard/')
+        self.assertEqual((leaderboard['name'], leaderboard['count'], leaderboard['errors']), ('leaderboard', 3, 0))
+        self.assertEqual(leaderboard['db']['queries_max'], 1)   # the first request builds the cached rows
+        self.assertEqual(leaderboard['response_bytes']['total'], 3 * len(response.content))
+        self.assertEqual(self.route('<unmatched>')['count'], 1)
+
+    async def test_middleware_in_async_mode(self):
+        response = await self.async_client.get('/api/game/version/')
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(self.route('api/game/version/')['count'], 1)
+
+    def test_prometheus_output(self):
+        self.client.get('/api/leaderboard/')
+        response = self.client.get(reverse('metrics-prometheus'), HTTP_AUTHORIZATION='Bearer scraper-secret')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        label = 'route="api/leaderboard/",name="leaderboard"'
+        self.assertIn('# TYPE fruitgame_http_request_duration_seconds summary', body)
+        self.assertRegex(body, rf'fruitgame_http_request_duration_seconds{{{label},quantile="0.95"}} \d+\.\d{{6}}\n')
+        self.assertIn(f'fruitgame_http_request_duration_seconds_count{{{label}}} 1\n', body)
+        self.assertIn(f'fruitgame_db_queries_total{{{label}}} 1\n', body)
+
+        snapshot = {'routes': [{**self.route('api/leaderboard/'), 'route': 'a"b\\c\nd'}]}
+        self.assertIn('route="a\\"b\\\\c\\nd"', render_prometheus(snapshot))
+
+    def test_scraper_token_reads_but_cannot_reset(self):
+        self.client.get('/api/leaderboard/')
+        scraper = {'HTTP_AUTHORIZATION': 'Bearer scraper-secret'}
+        self.assertEqual(self.client.get(reverse('metrics'), **scraper).status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        self.assertIn(self.client.delete(reverse('metrics'), **scraper).status_code, (401, 403))
+        self.route('api/leaderboard/')   # still there
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.delete(reverse('metrics')).status_code, 200)
+        self.assertNotIn('api/leaderboard/', [r['route'] for r in metrics_registry.snapshot()['routes']])
+
+
+class RequestProfilerTests(TestCase):
+    """Who gets profiled, and what a capture keeps on disk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Player.objects.create_superuser(phone_number='+998990000003', name='Admin', password='x')
+        cls.player = Player.objects.create(phone_number='+998990000004', name='Player')
+        GameConfig.load()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILER_CAPTURE_DIR=directory.name, PROFILER_SAMPLE_RATE=0))
+        self.factory = RequestFactory()
+
+    def reason(self, token=None, **query):
+        headers = {'HTTP_X_PROFILE_TOKEN': token} if token else {}
+        return profiling.profile_reason(self.factory.get('/api/leaderboard/', query, **headers))
+
+    def test_profile_reason(self):
+        token = profiling.issue_profile_token(self.admin)
+        self.assertEqual(self.reason(token), 'staff')
+        self.assertIsNone(self.reason(_profile=token))   # header only: query strings end up in logs
+        self.assertIsNone(self.reason(token + 'x'))
+        self.assertIsNone(self.reason(profiling.issue_profile_token(self.player)))
+
+        Player.objects.filter(pk=self.admin.pk).update(is_staff=False)
+        self.assertIsNone(self.reason(token))   # re-checked on every request
+
+        with override_settings(PROFILER_SAMPLE_RATE=1):
+            self.assertEqual(self.reason(), 'sampled')
+
+    def test_capture_keeps_no_parameter_values(self):
+        phone, token = '+998991234567', profiling.issue_profile_token(self.admin)
+        response = self.client.get('/api/profile/', {'phone_number': phone}, HTTP_X_PROFILE_TOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Profile-Id', response)
+
+        path = profiling.capture_path(response['X-Profile-Id'], '.json')
+        self.assertNotIn(phone.lstrip('+'), path.read_text())
+        capture = json.loads(path.read_text())
+        self.assertEqual(capture['path'], '/api/profile/?phone_number')
+        self.assertGreater(capture['sql_count'], 0)
+        self.assertTrue(all(set(query) == {'sql', 'many', 'duration_ms'} for query in capture['sql']))
+
+    @override_settings(PROFILER_MAX_CAPTURES=2)
+    def test_save_capture_prunes(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        profiler.disable()
+        request = self.factory.get('/api/leaderboard/', {'difficulty': 'easy'})
+        ids = [profiling.save_capture(profiler, [], request, HttpResponse(), 0.01, 'sampled') for _ in range(3)]
+
+        self.assertEqual(len(profiling.list_captures()), 2)
+        self.assertEqual(len(list(Path(profiling.capture_dir()).glob('*.prof'))), 2)
+        meta = profiling.load_capture(next(i for i in ids if profiling.capture_path(i, '.json')))
+        self.assertEqual((meta['path'], meta['sql_count'], meta['user_id']), ('/api/leaderboard/?difficulty', 0, None))
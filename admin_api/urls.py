@@ -34,6 +34,20 @@ urlpatterns = [
     # Promos
     path('promos/',                 csrf_exempt(views.PromoCodesView.as_view()), name='promos-list'),
 
+    # System
+    path('system/sessions/',        views.SessionStorageStatsView.as_view(), name='system-sessions'),
+    path('system/cache/',           views.CacheStatsView.as_view(),          name='system-cache'),
+
+    # Metrics
+    path('metrics/',                csrf_exempt(views.MetricsView.as_view()), name='metrics'),
+    path('metrics/prometheus/',     views.PrometheusMetricsView.as_view(),    name='metrics-prometheus'),
+
+    # Profiler
+    path('profiles/',                          views.ProfileCapturesView.as_view(),               name='profiles-list'),
+    path('profiles/token/',                    csrf_exempt(views.ProfileTokenView.as_view()),     name='profiles-token'),
+    path('profiles/<str:capture_id>/',         csrf_exempt(views.ProfileCapturesView.as_view()),  name='profile-detail'),
+    path('profiles/<str:capture_id>/download/', views.ProfileDownloadView.as_view(),              name='profile-download'),
+
     # Preview
     path('preview/settings/',       csrf_exempt(views.PreviewGameSettingsView.as_view()), name='preview-settings'),
 ]
\ No newline at end of file
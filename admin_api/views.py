@@ -4,15 +4,24 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.contrib.auth import authenticate, login, logout
 from django.db.models import Count, Avg, Sum, Q, F, Max
+from django.db.models.functions import TruncDate
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.crypto import constant_time_compare
+from django.http import HttpResponse, FileResponse
+from django.conf import settings as django_settings
+from datetime import datetime, time, timedelta
 import json
 
+from core.images import CardImageError, variant_payload
 from core.models import (
     DifficultySettings, GameConfig, FruitCard, TextCard,
-    GameSession, Player, Tournament
+    GameSession, GameSessionRollup, Player, Tournament
 )
 from rewards.models import PromoCode
+from core.session_cleanup import session_table_stats
+from core.cache import analytics_cache, cache_stats
+from .metrics import registry as metrics_registry, render_prometheus
+from . import profiling
 
 
 # Custom permission classes
@@ -23,6 +32,17 @@ class IsAdminUser(permissions.BasePermission):
         return request.user and request.user.is_authenticated and request.user.is_staff
 
 
+class IsAdminUserOrMetricsToken(IsAdminUser):
+    """Staff session, or 'Authorization: Bearer <METRICS_TOKEN>' for scrapers"""
+
+    def has_permission(self, request, view):
+        token = django_settings.METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and header.startswith('Bearer ') and constant_time_compare(header[7:], token):
+            return True
+        return super().has_permission(request, view)
+
+
 # ====================== AUTHENTICATION ======================
 class AdminLoginView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -301,6 +321,7 @@ class FruitCardsView(APIView):
                 'title': card.title,
                 'code': card.code,
                 'image': request.build_absolute_uri(card.image.url) if card.image else None,
+                'image_variants': variant_payload(card.image_variants, request.build_absolute_uri),
                 'is_active': card.is_active,
                 'weight': card.weight,
                 'order': card.order,
@@ -316,14 +337,17 @@ class FruitCardsView(APIView):
         # Convert string booleans to actual booleans
         is_active = parse_bool(data.get('is_active', True))
 
-        card = FruitCard.objects.create(
-            title=data.get('title'),
-            code=data.get('code'),
-            image=image,
-            is_active=is_active,
-            weight=int(data.get('weight', 1)),
-            order=int(data.get('order', 0)),
-        )
+        try:
+            card = FruitCard.objects.create(
+                title=data.get('title'),
+                code=data.get('code'),
+                image=image,
+                is_active=is_active,
+                weight=int(data.get('weight', 1)),
+                order=int(data.get('order', 0)),
+            )
+        except CardImageError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': True, 'id': card.id}, status=status.HTTP_201_CREATED)
 
@@ -348,7 +372,10 @@ class FruitCardsView(APIView):
         if 'image' in request.FILES:
             card.image = request.FILES['image']
 
-        card.save()
+        try:
+            card.save()
+        except CardImageError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': True})
 
@@ -374,6 +401,7 @@ class TextCardsView(APIView):
                 'title': card.title,
                 'code': card.code,
                 'image': request.build_absolute_uri(card.image.url) if card.image else None,
+                'image_variants': variant_payload(card.image_variants, request.build_absolute_uri),
                 'correct_fruit': {
                     'id': card.correct_fruit.id,
                     'code': card.correct_fruit.code,
@@ -404,15 +432,18 @@ class TextCardsView(APIView):
         # Convert string boolean
         is_active = parse_bool(data.get('is_active', True))
 
-        card = TextCard.objects.create(
-            title=data.get('title'),
-            code=data.get('code'),
-            image=image,
-            correct_fruit=fruit,
-            is_active=is_active,
-            weight=int(data.get('weight', 1)),
-            order=int(data.get('order', 0)),
-        )
+        try:
+            card = TextCard.objects.create(
+                title=data.get('title'),
+                code=data.get('code'),
+                image=image,
+                correct_fruit=fruit,
+                is_active=is_active,
+                weight=int(data.get('weight', 1)),
+                order=int(data.get('order', 0)),
+            )
+        except CardImageError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': True, 'id': card.id}, status=status.HTTP_201_CREATED)
 
@@ -448,7 +479,10 @@ class TextCardsView(APIView):
         if 'image' in request.FILES:
             card.image = request.FILES['image']
 
-        card.save()
+        try:
+            card.save()
+        except CardImageError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': True})
 
@@ -467,46 +501,88 @@ class AnalyticsOverviewView(APIView):
 
     def get(self, request):
         days = int(request.query_params.get('days', 30))
+        return Response(analytics_cache.get_or_build(f"overview:{days}", lambda: self.build_overview(days)))
+
+    @staticmethod
+    def build_overview(days):
         start_date = timezone.now() - timedelta(days=days)
 
         total_players = Player.objects.count()
-        total_sessions = GameSession.objects.count()
-        active_sessions = GameSession.objects.filter(started_at__gte=start_date).count()
-
-        total_promos = PromoCode.objects.count()
-        claimed_promos = PromoCode.objects.filter(is_used=True).count()
-
+        # Start-to-finish funnel for the period rides on the same aggregate
+        in_period = Q(started_at__gte=start_date)
+        session_totals = GameSession.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=in_period),
+            finished=Count('id', filter=in_period & Q(status=GameSession.STATUS_FINISHED)),
+            abandoned=Count('id', filter=in_period & Q(status=GameSession.STATUS_ABANDONED)),
+        )
+        active_sessions = session_totals['active']
+        funnel = {
+            'started': active_sessions,
+            'finished': session_totals['finished'],
+            'abandoned': session_totals['abandoned'],
+            'in_progress': active_sessions - session_totals['finished'] - session_totals['abandoned'],
+            'completion_rate': round(
+                session_totals['finished'] / active_sessions * 100 if active_sessions else 0, 2
+            ),
+        }
+
+        promo_totals = PromoCode.objects.aggregate(
+            total=Count('id'),
+            claimed=Count('id', filter=Q(is_used=True)),
+        )
+        total_promos = promo_totals['total']
+        claimed_promos = promo_totals['claimed']
+
+        # Archived partitions only survive as rollups; all-time numbers add them back
+        archived = {
+            row['difficulty']: row
+            for row in GameSessionRollup.objects.order_by().values('difficulty').annotate(
+                games=Sum('games'), finished=Sum('finished_games'),
+                score=Sum('score_total'), duration=Sum('duration_total'),
+            )
+        }
+        total_sessions = session_totals['total'] + sum(row['games'] for row in archived.values())
+
+        # One grouped query instead of one aggregate per level
+        per_level = {
+            row['difficulty']: row
+            for row in GameSession.objects.filter(difficulty__in=[1, 2, 3], ended_at__isnull=False)
+            .order_by().values('difficulty')
+            .annotate(finished=Count('id'), score=Sum('score_balls'), duration=Sum('duration'))
+        }
         difficulty_stats = []
         for level in [1, 2, 3]:
-            stats = GameSession.objects.filter(
-                difficulty=level,
-                ended_at__isnull=False
-            ).aggregate(
-                avg_score=Avg('score_balls'),
-                total_games=Count('id'),
-                avg_duration=Avg('duration'),
-            )
-
+            live = per_level.get(level, {})
+            old = archived.get(level, {})
+            games = live.get('finished', 0) + (old.get('finished') or 0)
+            score = (live.get('score') or 0) + (old.get('score') or 0)
+            duration = (live.get('duration') or 0) + (old.get('duration') or 0)
             difficulty_stats.append({
                 'level': level,
-                'avg_score': round(stats['avg_score'] or 0, 2),
-                'total_games': stats['total_games'],
-                'avg_duration': round(stats['avg_duration'] or 0, 2),
+                'avg_score': round(score / games, 2) if games else 0,
+                'total_games': games,
+                'avg_duration': round(duration / games, 2) if games else 0,
             })
 
+        # Sessions per local day in one GROUP BY, days without games filled with 0
+        today = timezone.localdate()
+        first_day = today - timedelta(days=days - 1)
+        per_day = dict(
+            GameSession.objects.filter(
+                started_at__gte=timezone.make_aware(datetime.combine(first_day, time.min))
+            ).order_by().annotate(day=TruncDate('started_at'))
+            .values('day').annotate(count=Count('id')).values_list('day', 'count')
+        )
         daily_data = []
         for i in range(days):
-            date = timezone.now().date() - timedelta(days=i)
-            count = GameSession.objects.filter(
-                started_at__date=date
-            ).count()
+            date = first_day + timedelta(days=i)
             daily_data.append({
                 'date': str(date),
-                'sessions': count,
+                'sessions': per_day.get(date, 0),
             })
-        daily_data.reverse()
 
-        return Response({
+        return {
             'overview': {
                 'total_players': total_players,
                 'total_sessions': total_sessions,
@@ -515,9 +591,10 @@ class AnalyticsOverviewView(APIView):
                 'claimed_promos': claimed_promos,
                 'claim_rate': round((claimed_promos / total_promos * 100) if total_promos > 0 else 0, 2),
             },
+            'funnel': funnel,
             'difficulty_stats': difficulty_stats,
             'daily_sessions': daily_data,
-        })
+        }
 
 
 class PlayerAnalyticsView(APIView):
@@ -643,18 +720,20 @@ class PromoCodesView(APIView):
             )
 
         count = int(request.data.get('count', 1))
-        codes = []
 
         import random
         import string
 
-        for _ in range(count):
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            promo = PromoCode.objects.create(code=code)
-            codes.append({
-                'id': promo.id,
-                'code': promo.code,
-            })
+        # Draw unique codes, drop the few that already exist, insert in one batch
+        alphabet = string.ascii_uppercase + string.digits
+        new_codes = set()
+        while len(new_codes) < count:
+            batch = {''.join(random.choices(alphabet, k=8)) for _ in range(count - len(new_codes))}
+            batch -= set(PromoCode.objects.filter(code__in=batch).values_list('code', flat=True))
+            new_codes |= batch
+
+        promos = PromoCode.objects.bulk_create([PromoCode(code=code) for code in new_codes])
+        codes = [{'id': promo.id, 'code': promo.code} for promo in promos]
 
         return Response({
             'success': True,
@@ -662,6 +741,94 @@ class PromoCodesView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+# ====================== SYSTEM ======================
+class SessionStorageStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(session_table_stats())
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class MetricsView(APIView):
+    """Per-route latency / DB / size metrics of this worker process"""
+    permission_classes = [IsAdminUserOrMetricsToken]
+
+    def get_permissions(self):
+        # The scraper's token only reads; resetting takes a staff session
+        if self.request.method == 'DELETE':
+            return [IsAdminUser()]
+        return super().get_permissions()
+
+    def get(self, request):
+        data = metrics_registry.snapshot()
+        data['cache'] = cache_stats()
+        return Response(data)
+
+    def delete(self, request):
+        metrics_registry.reset()
+        return Response({'success': True})
+
+
+class PrometheusMetricsView(APIView):
+    permission_classes = [IsAdminUserOrMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(metrics_registry.snapshot()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+# ====================== PROFILER ======================
+class ProfileTokenView(APIView):
+    """Issue a signed token that turns on profiling for requests carrying it"""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        return Response({
+            'token': profiling.issue_profile_token(request.user),
+            'header': 'X-Profile-Token',
+            'expires_in': django_settings.PROFILER_TOKEN_MAX_AGE,
+        })
+
+
+class ProfileCapturesView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, capture_id=None):
+        if capture_id is None:
+            return Response(profiling.list_captures())
+
+        capture = profiling.load_capture(capture_id)
+        if capture is None:
+            return Response({'error': 'Capture not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(capture)
+
+    def delete(self, request, capture_id):
+        if not profiling.delete_capture(capture_id):
+            return Response({'error': 'Capture not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'success': True})
+
+
+class ProfileDownloadView(APIView):
+    """Raw pstats file - open with `python -m pstats` or snakeviz"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, capture_id):
+        path = profiling.capture_path(capture_id, '.prof')
+        if path is None:
+            return Response({'error': 'Capture not found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name,
+                            content_type='application/octet-stream')
+
+
 # ====================== PREVIEW ======================
 class PreviewGameSettingsView(APIView):
     permission_classes = [IsAdminUser]
@@ -9,8 +9,9 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from core.asgi import get_asgi_application   # Django's, plus zero-copy file sends
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("DJANGO_SERVER", "asgi")   # no persistent DB connections (config/database.py)
 
 application = get_asgi_application()
@@ -2,18 +2,23 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
-from django.views.generic import TemplateView
+
+from core.fileserving import index_shell, serve_media, serve_static, service_worker
+from core.media_views import resized_image
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include('core.urls')),
-    path("", TemplateView.as_view(template_name="index.html"), name="home"),
+    path("", index_shell, name="home"),
+    path("sw.js", service_worker, name="service-worker"),   # at / so it can control the page
     path('api/admin/', include('admin_api.urls')),
-
-
+    # Before the media route below, which would claim the same prefix
+    path(f"{settings.MEDIA_URL.lstrip('/')}r/<int:width>x<int:height>/<path:path>", resized_image,
+         name='resized-image'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+if settings.SERVE_STATIC:
+    urlpatterns.append(path(f"{settings.STATIC_URL.lstrip('/')}<path:path>", serve_static, name='static'))
+
+if settings.SERVE_MEDIA:
+    urlpatterns.append(path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name='media'))
@@ -9,9 +9,10 @@ from django.urls import reverse
 from django.utils import timezone
 import csv
 import json
+from . import gamelog, images, signals
 from .models import (
     DifficultySettings, GameConfig, FruitCard, TextCard,
-    Player, GameSession, Tournament
+    Player, GameSession, GameSessionRollup, Tournament
 )
 
 
@@ -203,7 +204,7 @@ class FruitCardAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width:60px;height:60px;object-fit:cover;border-radius:10px;border:2px solid #e2e8f0;" />',
-                obj.image.url
+                images.smallest_url(obj.image_variants) or obj.image.url
             )
         return mark_safe('<span style="color:#aaa;font-style:italic">No image</span>')
 
@@ -220,12 +221,14 @@ class FruitCardAdmin(admin.ModelAdmin):
 
     def activate_selected(self, request, queryset):
         updated = queryset.update(is_active=True)
+        signals.cards_changed()
         self.message_user(request, f'{updated} fruit card(s) activated.', messages.SUCCESS)
 
     activate_selected.short_description = 'Activate selected'
 
     def deactivate_selected(self, request, queryset):
         updated = queryset.update(is_active=False)
+        signals.cards_changed()
         self.message_user(request, f'{updated} fruit card(s) deactivated.', messages.WARNING)
 
     deactivate_selected.short_description = 'Deactivate selected'
@@ -248,7 +251,7 @@ class TextCardAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width:60px;height:60px;object-fit:cover;border-radius:10px;border:2px solid #e2e8f0;" />',
-                obj.image.url
+                images.smallest_url(obj.image_variants) or obj.image.url
             )
         return mark_safe('<span style="color:#aaa;font-style:italic">No image</span>')
 
@@ -256,10 +259,12 @@ class TextCardAdmin(admin.ModelAdmin):
 
     def activate_selected(self, request, queryset):
         updated = queryset.update(is_active=True)
+        signals.cards_changed()
         self.message_user(request, f'{updated} text card(s) activated.', messages.SUCCESS)
 
     def deactivate_selected(self, request, queryset):
         updated = queryset.update(is_active=False)
+        signals.cards_changed()
         self.message_user(request, f'{updated} text card(s) deactivated.', messages.WARNING)
 
 
@@ -406,14 +411,18 @@ class PlayerAdmin(admin.ModelAdmin):
 @admin.register(GameSession)
 class GameSessionAdmin(admin.ModelAdmin):
     list_display = ('session_short', 'player_link', 'difficulty_badge', 'score_display', 'duration_display',
-                    'started_at', 'anti_cheat_status')
-    list_filter = (DifficultyFilter, 'anti_cheat_status', 'started_at', 'ended_at')
+                    'started_at', 'status', 'anti_cheat_status')
+    list_filter = (DifficultyFilter, 'status', 'anti_cheat_status', 'started_at', 'ended_at')
     search_fields = ('session_id', 'player__name', 'player__phone_number')
     readonly_fields = ('session_id', 'player', 'started_at', 'ended_at', 'log_json_pretty')
     date_hierarchy = 'started_at'
     actions = ['export_as_csv']
     list_per_page = 50
 
+    def get_queryset(self, request):
+        # Logs are only shown on the change page; keep them out of list rows
+        return super().get_queryset(request).defer('log_json', 'log_bin')
+
     def session_short(self, obj):
         return format_html('<code style="font-size:11px">{}</code>', str(obj.session_id)[:16] + '...')
 
@@ -452,9 +461,16 @@ class GameSessionAdmin(admin.ModelAdmin):
     duration_display.short_description = 'Time'
 
     def log_json_pretty(self, obj):
-        if obj.log_json:
+        # Binary move logs are decoded only when a single session is opened
+        log = obj.log_json
+        if obj.log_bin:
             try:
-                pretty = json.dumps(obj.log_json, indent=2, ensure_ascii=False)
+                log = gamelog.decode(obj.log_bin)
+            except gamelog.GameLogError as e:
+                return f'Invalid game log: {e}'
+        if log:
+            try:
+                pretty = json.dumps(log, indent=2, ensure_ascii=False)
                 return format_html(
                     '<pre style="background:#f8f9fa;padding:15px;border-radius:8px;font-size:12px;max-height:500px;overflow:auto;border:1px solid #ddd;">{}</pre>',
                     pretty
@@ -463,7 +479,7 @@ class GameSessionAdmin(admin.ModelAdmin):
                 return 'Invalid JSON'
         return '-'
 
-    log_json_pretty.short_description = 'Game Log (JSON)'
+    log_json_pretty.short_description = 'Game Log'
 
     def export_as_csv(self, request, queryset):
         response = HttpResponse(content_type='text/csv')
@@ -491,6 +507,30 @@ class GameSessionAdmin(admin.ModelAdmin):
         return False
 
 
+# =====================================================
+# GameSessionRollup Admin (written by partition_sessions --archive)
+# =====================================================
+@admin.register(GameSessionRollup)
+class GameSessionRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        'month', 'difficulty', 'games', 'finished_games',
+        'avg_score', 'best_score', 'archived_at'
+    )
+    list_filter = ('difficulty',)
+    date_hierarchy = 'month'
+    ordering = ('-month', 'difficulty')
+
+    def avg_score(self, obj):
+        return round(obj.score_total / obj.finished_games, 2) if obj.finished_games else 0
+    avg_score.short_description = 'Avg Score'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # =====================================================
 # # Tournament
 # # =====================================================
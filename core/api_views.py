@@ -4,8 +4,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from .models import GameConfig, FruitCard, TextCard, DifficultySettings
+from . import atlas, images
+from .cache import config_cache
 
 
 # core/api_views.py (or wherever it is)
@@ -16,24 +19,30 @@ class UserGameConfigView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        # Global config (your existing code)
+        return Response(self.cached_payload())
+
+    @classmethod
+    def cached_payload(cls):
+        # Cached; invalidated by core.signals whenever config/cards/difficulties change
+        return config_cache.get_or_build('game-config', cls.build_payload)
+
+    @classmethod
+    def build_payload(cls):
+        fruit_cards, text_cards, difficulty_settings = cls.querysets()
         config_obj = GameConfig.load()
-        config_data = {
-            'maintenance_mode': config_obj.maintenance_mode,
-            'promo_score_threshold': config_obj.promo_score_threshold,
-            'timer_seconds': config_obj.timer_seconds,
-            'version': config_obj.config_version,
-            # ... add others if needed
-        }
+        return cls.assemble(config_obj, list(fruit_cards), list(text_cards), list(difficulty_settings))
 
+    @staticmethod
+    def querysets():
+        """(fruit cards, text cards, difficulty settings) rows; shared with core.async_views."""
         # Fruit cards (unchanged)
         fruit_cards = FruitCard.objects.filter(is_active=True).order_by('order').values(
-            'id', 'code', 'title', 'image', 'is_active', 'weight', 'order'
+            'id', 'code', 'title', 'image', 'image_variants', 'is_active', 'weight', 'order'
         )
 
         # Text cards – keep your renamed annotation
         text_cards = TextCard.objects.filter(is_active=True).select_related('correct_fruit').order_by('order').values(
-            'id', 'title', 'code', 'image', 'is_active', 'weight', 'order',
+            'id', 'title', 'code', 'image', 'image_variants', 'is_active', 'weight', 'order',
             correct_fruit_pk=F('correct_fruit__id'),          # safe rename
             correct_fruit_code=F('correct_fruit__code'),
         )
@@ -55,10 +64,49 @@ class UserGameConfigView(APIView):
             names=F('name_en'),                             # or 'names' if it's JSONField
             # name_uz=F('name_uz'), name_ru=F('name_ru')   # if separate fields
         )
+        return fruit_cards, text_cards, difficulty_settings
+
+    @staticmethod
+    def assemble(config_obj, fruit_cards, text_cards, difficulty_settings):
+        """The payload from the loaded config and the querysets() rows (lists)."""
+        # Global config (your existing code)
+        config_data = {
+            'maintenance_mode': config_obj.maintenance_mode,
+            'promo_score_threshold': config_obj.promo_score_threshold,
+            'timer_seconds': config_obj.timer_seconds,
+            'version': config_obj.config_version,
+            # ... add others if needed
+        }
+
+        # Resized WebP/AVIF URLs and sizes, so clients can pick one for the card size
+        for card in fruit_cards + text_cards:
+            card['image_variants'] = images.variant_payload(card['image_variants'])
+        # Sprite sheets of the same images, while they match these cards
+        card_atlas = atlas.attach(config_obj.card_atlas, fruit_cards, text_cards)
 
-        return Response({
+        return {
             'config': config_data,
-            'fruit_cards': list(fruit_cards),
-            'text_cards': list(text_cards),
-            'difficulty_settings': list(difficulty_settings),
-        })
\ No newline at end of file
+            'fruit_cards': fruit_cards,
+            'text_cards': text_cards,
+            'atlas': card_atlas,
+            'difficulty_settings': difficulty_settings,
+        }
+
+
+class GameConfigVersionView(APIView):
+    """
+    {"version": n} of /game/config/, for the service worker to decide
+    whether its cached config is stale. Served from the same cache entry:
+    no queries while it is warm, and a 304 when the version is unchanged.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []   # no session or token lookup
+
+    def get(self, request):
+        etag = f'"{UserGameConfigView.cached_payload()["config"]["version"]}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response({'version': int(etag.strip('"'))})
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,76 @@
+# core/asgi.py - ASGI handler that sends files without copying them through Python
+#
+# Responses from core.fileserving carry `file_span = (path, offset, count)`.
+# When the server offers the `http.response.zerocopysend` extension, the
+# body goes out as one zero-copy message and the server calls sendfile()
+# on the descriptor. Otherwise the file is read in BLOCK_SIZE chunks on a
+# worker thread. Django's own handler turns a sync iterator (FileResponse)
+# into a list first, so every download of a 4 MB track held all of it in
+# memory.
+#
+# Used by config/asgi.py; WSGI servers get sendfile through
+# wsgi.file_wrapper instead.
+
+import contextvars
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+ZEROCOPY = 'http.response.zerocopysend'
+BLOCK_SIZE = 256 * 1024
+
+_scope = contextvars.ContextVar('scope', default=None)
+
+
+class SendfileASGIHandler(ASGIHandler):
+
+    async def handle(self, scope, receive, send):
+        _scope.set(scope)
+        await super().handle(scope, receive, send)
+
+    async def send_response(self, response, send):
+        span = getattr(response, 'file_span', None)
+        if span is None:
+            return await super().send_response(response, send)
+
+        scope = _scope.get() or {}
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': self.response_headers(response)})
+        if scope.get('method') == 'HEAD':
+            await send({'type': 'http.response.body'})
+            return
+
+        path, offset, count = span
+        f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+        try:
+            if ZEROCOPY in scope.get('extensions', {}):
+                await send({'type': ZEROCOPY, 'file': f, 'offset': offset, 'count': count})
+                return
+            await sync_to_async(f.seek, thread_sensitive=False)(offset)
+            while count > 0:
+                chunk = await sync_to_async(f.read, thread_sensitive=False)(min(BLOCK_SIZE, count))
+                if not chunk:
+                    break
+                count -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            f.close()
+
+    @staticmethod
+    def response_headers(response):
+        """Headers and cookies as ASGI (name, value) byte pairs, as ASGIHandler.send_response builds them."""
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie', cookie.output(header='').encode('ascii').strip()))
+        return headers
+
+
+def get_asgi_application():
+    """django.core.asgi.get_asgi_application() with SendfileASGIHandler."""
+    django.setup(set_prefix=False)
+    return SendfileASGIHandler()
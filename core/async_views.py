@@ -0,0 +1,114 @@
+# core/async_views.py - Async versions of the hot read-only game endpoints
+#
+# Routed instead of the DRF views in core/urls.py when ASYNC_VIEWS is on
+# (DJANGO_ASYNC_VIEWS=True), for deployments served by an ASGI server
+# (config/asgi.py). DRF has no async views, so these are plain Django
+# views answering the same JSON from the same cache entries and the same
+# querysets as their DRF counterparts:
+#
+#   /api/game/config/    UserGameConfigView
+#   /api/leaderboard/    LeaderboardView
+#   /api/profile/        PlayerProfileView (GET; PATCH is handed to the DRF view)
+#
+# Django's async ORM and cache calls still run the database driver on
+# sync_to_async threads. What changes is that a request waiting on a cache
+# miss or a slow query holds a coroutine, not one of the server's worker
+# threads, so a burst of slow requests no longer queues every other one.
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+
+from .api_views import UserGameConfigView
+from .authentication import GameTokenAuthentication
+from .cache import config_cache, leaderboard_cache, profile_cache
+from .models import GameConfig, Player
+from .serializers import LeaderboardEntrySerializer, PlayerSerializer
+from .views import LeaderboardView, PlayerProfileView
+
+
+def json_response(data, status=200, **kwargs):
+    """JsonResponse rendered like DRF's JSONRenderer (compact, UTF-8, DRF encoder)."""
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}, **kwargs,
+    )
+
+
+class AsyncGameConfigView(View):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request):
+        return json_response(await config_cache.aget_or_build('game-config', self.build_payload))
+
+    @staticmethod
+    async def build_payload():
+        fruit_cards, text_cards, difficulty_settings = UserGameConfigView.querysets()
+        config_obj, _ = await GameConfig.objects.aget_or_create(pk=1)
+        return UserGameConfigView.assemble(
+            config_obj,
+            [row async for row in fruit_cards],
+            [row async for row in text_cards],
+            [row async for row in difficulty_settings],
+        )
+
+
+class AsyncLeaderboardView(View):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request):
+        difficulty, error = LeaderboardView.parse_difficulty(request.GET.get('difficulty'))
+        if error:
+            return json_response({'error': error}, status=400)
+        return json_response(await leaderboard_cache.aget_or_build(
+            difficulty, lambda: self.build_rows(difficulty)
+        ))
+
+    @staticmethod
+    async def build_rows(difficulty):
+        sessions = [session async for session in LeaderboardView.top_sessions(difficulty)]
+        return list(LeaderboardEntrySerializer(sessions, many=True).data)
+
+
+# Token-authenticated like the DRF view, which is CSRF-exempt as every APIView
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncPlayerProfileView(View):
+    http_method_names = ['get', 'head', 'patch', 'options']
+
+    async def get(self, request):
+        authenticator = GameTokenAuthentication()
+        try:
+            authenticated = authenticator.authenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            response = json_response({'detail': str(e.detail)}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+
+        phone = request.GET.get('phone_number')
+        if phone:
+            player, _ = await Player.objects.aget_or_create(phone_number=phone, defaults={'name': 'Guest'})
+            player.last_login = timezone.now()
+            await player.asave()
+        elif authenticated is not None:
+            player = await Player.objects.aget(pk=authenticated[0].pk)
+        else:
+            return json_response({'player': None, 'history': [], 'promos': []})
+
+        activity = await profile_cache.aget_or_build(player.pk, lambda: self.build_activity(player.pk))
+        return json_response({'player': PlayerSerializer(player).data, **activity})
+
+    @staticmethod
+    async def build_activity(player_id):
+        history, promos = PlayerProfileView.activity_querysets(player_id)
+        return PlayerProfileView.activity_payload(
+            [row async for row in history], [row async for row in promos]
+        )
+
+    async def patch(self, request):
+        # Rare (settings changes): the DRF view, on a thread
+        return await sync_to_async(PlayerProfileView.as_view())(request)
@@ -0,0 +1,217 @@
+# core/atlas.py - Sprite sheets of the active card images
+#
+# All active fruit and text card images are scaled to fit a
+# CARD_ATLAS_CELL square and packed into one or a few WebP sheets of at
+# most CARD_ATLAS_MAX_SIZE px. That way a game loads two or three images
+# instead of one per card. The result is stored on GameConfig.card_atlas:
+#
+#   {"version": 7, "fingerprint": "...",
+#    "sheets": [{"name": "atlas/cards.1f0c....0.webp", "width": 1960, "height": 590}],
+#    "sprites": {"fruit:3": [sheet, x, y, width, height], "text:8": [...]}}
+#
+# `fingerprint` identifies the set of card images the sheets were built
+# from. /api/game/config/ only references the atlas while it still matches
+# the active cards, so a stale atlas is never served: clients fall back to
+# the per-card images until the rebuild is done. core.signals schedules it
+# after the card change commits, in a background thread
+# (CARD_ATLAS_BACKGROUND_BUILD): decoding and encoding every card image is
+# too slow for the admin request that saved the card.
+
+import hashlib
+import io
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+
+from .cache import config_cache
+from .models import FruitCard, GameConfig, TextCard
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY = 'atlas'
+PADDING = 2   # px between sprites, so scaled-down neighbours do not bleed in
+WEBP_OPTIONS = {'quality': 85, 'method': 4}
+
+
+def _key(kind, card_id):
+    return f"{kind}:{card_id}"
+
+
+def fingerprint(fruit_cards, text_cards):
+    """Hash of (kind, id, image) over card rows that have an image."""
+    rows = sorted(
+        (kind, card['id'], str(card['image']))
+        for kind, cards in (('fruit', fruit_cards), ('text', text_cards))
+        for card in cards if card['image']
+    )
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+def _active_cards():
+    fields = ('id', 'image', 'image_variants')
+    return (
+        list(FruitCard.objects.filter(is_active=True).order_by('pk').values(*fields)),
+        list(TextCard.objects.filter(is_active=True).order_by('pk').values(*fields)),
+    )
+
+
+def _source_name(card, cell):
+    """Smallest WebP variant covering the cell (fast to decode), else the original."""
+    for variant in card['image_variants'].get('sources', {}).get('webp', []):
+        if variant['width'] >= cell or variant['width'] == card['image_variants']['width']:
+            return variant['name']
+    return card['image']
+
+
+def _load_sprite(card, cell):
+    with default_storage.open(_source_name(card, cell), 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    image = image.convert('RGBA')
+    image.thumbnail((cell, cell), Image.Resampling.LANCZOS)
+    return image
+
+
+def pack(sizes, max_size):
+    """
+    Shelf-pack (width, height) boxes, tallest first, into sheets of at most
+    max_size px. Returns ([(sheet, x, y)] in input order, [(w, h)] per sheet).
+    """
+    placements = [None] * len(sizes)
+    sheets = []
+    x = y = row_height = used_width = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x and x + w > max_size:
+            x, y, row_height = 0, y + row_height + PADDING, 0
+        if y and y + h > max_size:
+            sheets.append((used_width, y - PADDING))
+            x = y = row_height = used_width = 0
+        placements[i] = (len(sheets), x, y)
+        x += w + PADDING
+        row_height = max(row_height, h)
+        used_width = max(used_width, x - PADDING)
+    if sizes:
+        sheets.append((used_width, y + row_height))
+    return placements, sheets
+
+
+def build_atlas(force=False):
+    """
+    Rebuild the atlas if the active card images changed since the last
+    build (or with force) and bump GameConfig.config_version. Returns the
+    stored atlas. Three queries when nothing changed.
+    """
+    fruit_cards, text_cards = _active_cards()
+    current = fingerprint(fruit_cards, text_cards)
+    config = GameConfig.load()
+    if not force and config.card_atlas.get('fingerprint') == current:
+        return config.card_atlas
+
+    cell = settings.CARD_ATLAS_CELL
+    keys, sprites = [], []
+    for kind, cards in (('fruit', fruit_cards), ('text', text_cards)):
+        for card in cards:
+            if not card['image']:
+                continue
+            try:
+                sprites.append(_load_sprite(card, cell))
+            except (OSError, Image.DecompressionBombError) as e:
+                logger.warning("Card %s left out of the atlas: %s", _key(kind, card['id']), e)
+                continue
+            keys.append(_key(kind, card['id']))
+
+    placements, sizes = pack([sprite.size for sprite in sprites], settings.CARD_ATLAS_MAX_SIZE)
+    sheets = [Image.new('RGBA', size, (0, 0, 0, 0)) for size in sizes]
+    for sprite, (sheet, x, y) in zip(sprites, placements):
+        sheets[sheet].paste(sprite, (x, y))
+
+    atlas = {'version': None, 'fingerprint': current, 'sheets': [], 'sprites': {}}
+    for n, sheet in enumerate(sheets):
+        buf = io.BytesIO()
+        sheet.save(buf, 'WEBP', **WEBP_OPTIONS)
+        data = buf.getvalue()
+        name = os.path.join(DIRECTORY, f"cards.{hashlib.sha256(data).hexdigest()[:12]}.{n}.webp")
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(data))
+        atlas['sheets'].append({'name': name, 'width': sheet.width, 'height': sheet.height})
+    for key, sprite, (sheet, x, y) in zip(keys, sprites, placements):
+        atlas['sprites'][key] = [sheet, x, y, sprite.width, sprite.height]
+
+    with transaction.atomic():
+        # Locked against concurrent builds and GameConfig.save(): the
+        # version stored is one above the value stored right now
+        stored = GameConfig.objects.select_for_update().get(pk=config.pk)
+        if fingerprint(*_active_cards()) != current:
+            return stored.card_atlas   # cards changed meanwhile; their own rebuild is scheduled
+        if not force and stored.card_atlas.get('fingerprint') == current:
+            return stored.card_atlas   # a concurrent build stored the same cards
+        atlas['version'] = stored.config_version + 1
+        # update(), not save(): GameConfig.save() keeps the stored card_atlas
+        GameConfig.objects.filter(pk=config.pk).update(card_atlas=atlas, config_version=atlas['version'])
+    config_cache.invalidate()
+    return atlas
+
+
+_scheduled = threading.Lock()
+_state = {'running': False, 'again': False}
+
+
+def schedule_build():
+    """
+    build_atlas() in a background thread (CARD_ATLAS_BACKGROUND_BUILD).
+    Changes arriving while a build runs fold into one more build after it,
+    so saving ten cards costs two builds, not ten threads.
+    """
+    if not settings.CARD_ATLAS_BACKGROUND_BUILD:
+        build_atlas()
+        return
+    with _scheduled:
+        if _state['running']:
+            _state['again'] = True
+            return
+        _state['running'] = True
+
+    def run():
+        try:
+            while True:
+                try:
+                    build_atlas()
+                except Exception:
+                    logger.exception('Card atlas build failed')
+                with _scheduled:
+                    if not _state['again']:
+                        _state['running'] = False
+                        return
+                    _state['again'] = False
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='card-atlas-build', daemon=True).start()
+
+
+def attach(atlas, fruit_cards, text_cards):
+    """
+    Set card['sprite'] = {sheet, x, y, width, height} on config payload rows
+    and return the sheets for the payload, or None (no sprites) when the
+    atlas does not match these cards.
+    """
+    if not atlas.get('sheets') or atlas.get('fingerprint') != fingerprint(fruit_cards, text_cards):
+        return None
+    for kind, cards in (('fruit', fruit_cards), ('text', text_cards)):
+        for card in cards:
+            sprite = atlas['sprites'].get(_key(kind, card['id']))
+            card['sprite'] = dict(zip(('sheet', 'x', 'y', 'width', 'height'), sprite)) if sprite else None
+    return {
+        'version': atlas['version'],
+        'sheets': [
+            {'url': default_storage.url(sheet['name']), 'width': sheet['width'], 'height': sheet['height']}
+            for sheet in atlas['sheets']
+        ],
+    }
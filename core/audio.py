@@ -0,0 +1,202 @@
+# core/audio.py - Sound effect sprite and transcoded music for the client
+#
+# `manage.py build_audio` (also run by build_static) reads the sources
+# under AUDIO_SOURCE_DIR and writes to AUDIO_BUILD_DIR, which is collected
+# as static/audio/:
+#
+#   - every sounds/*.wav back to back (with short silences between them
+#     when encoded) as one sprite: one request and one decode instead of
+#     fourteen
+#   - every music/* file, deduplicated by content (identical tracks share
+#     one output file)
+#   - audio.json, inlined into the game page by {% audio_manifest %}:
+#
+#     {"sprite": {"sources": [{"type": "audio/webm; codecs=opus", "path": "audio/sfx.<sha12>.webm"}],
+#                 "sounds": {"click": [start, duration], ...}},
+#      "music": {"calm_ambient.mp3": [{"type": ..., "path": "audio/music.<sha12>.webm"}, ...]}}
+#
+# With ffmpeg on PATH the sprite and the music are encoded as Opus (WebM)
+# with an AAC (MP4) fallback for Safari, at low bitrates, and the MP4s are
+# laid out for streaming. Without ffmpeg the sprite stays 16-bit PCM WAV
+# and the music is copied as-is, so the build still runs.
+#
+# Output names hash the input and the encoder settings: unchanged audio is
+# not re-encoded, and a new encode never reuses an old file name.
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import wave
+
+from django.conf import settings
+
+SOUND_DIR = 'sounds'
+MUSIC_DIR = 'music'
+MUSIC_EXTENSIONS = ('.mp3', '.ogg', '.opus', '.m4a', '.wav', '.flac')
+MANIFEST = 'audio.json'
+STATIC_PREFIX = 'audio/'
+GAP = 0.1   # seconds of silence between sprites when encoding; lossy codecs smear sound across the joins
+
+# Client formats, best first (ffmpeg only)
+ENCODERS = {
+    'webm': {'type': 'audio/webm; codecs=opus', 'args': ['-c:a', 'libopus', '-vbr', 'on']},
+    'm4a': {'type': 'audio/mp4; codecs=mp4a.40.2', 'args': ['-c:a', 'aac', '-movflags', '+faststart']},
+}
+SFX_BITRATE = {'webm': '48k', 'm4a': '64k'}
+MUSIC_BITRATE = {'webm': '64k', 'm4a': '96k'}
+
+COPY_TYPES = {'.mp3': 'audio/mpeg', '.ogg': 'audio/ogg', '.opus': 'audio/ogg; codecs=opus',
+              '.m4a': 'audio/mp4', '.wav': 'audio/wav', '.flac': 'audio/flac'}
+
+
+class AudioError(ValueError):
+    pass
+
+
+def ffmpeg():
+    """Path of the ffmpeg binary, or None when it is not installed."""
+    return shutil.which(settings.AUDIO_FFMPEG)
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+    return h.hexdigest()[:12]
+
+
+def _encode(binary, source, dest, ext, bitrate):
+    tmp = f"{dest}.tmp.{ext}"
+    try:
+        subprocess.run(
+            [binary, '-nostdin', '-v', 'error', '-y', '-i', source, '-vn', '-map_metadata', '-1',
+             *ENCODERS[ext]['args'], '-b:a', bitrate[ext], tmp],
+            check=True, capture_output=True, timeout=600,
+        )
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise AudioError(f"ffmpeg failed on {os.path.basename(source)}: {e.stderr.decode(errors='replace').strip()}")
+    os.replace(tmp, dest)
+
+
+def _outputs(binary, source, stem, data, bitrate, build_dir, copy_ext):
+    """
+    [(type, filename)] for one input: encoded with ffmpeg, or the input
+    itself (copied as stem.<hash>.<copy_ext>) without it.
+    """
+    if binary is None:
+        filename = f"{stem}.{_digest(data)}{copy_ext}"
+        dest = os.path.join(build_dir, filename)
+        if not os.path.exists(dest):
+            shutil.copyfile(source, dest)
+        return [(COPY_TYPES[copy_ext], filename)]
+
+    written = []
+    for ext, encoder in ENCODERS.items():
+        filename = f"{stem}.{_digest(data, encoder['args'], bitrate[ext])}.{ext}"
+        dest = os.path.join(build_dir, filename)
+        if not os.path.exists(dest):
+            _encode(binary, source, dest, ext, bitrate)
+        written.append((encoder['type'], filename))
+    return written
+
+
+def _sprite_pcm(paths, gap):
+    """Concatenated PCM of the WAV files, the shared wave params, and {name: [start, duration]}."""
+    params = None
+    chunks, sounds = [], {}
+    frames_so_far = 0
+    for path in paths:
+        try:
+            with wave.open(path, 'rb') as w:
+                current = (w.getnchannels(), w.getsampwidth(), w.getframerate())
+                frames = w.readframes(w.getnframes())
+        except (OSError, EOFError, wave.Error) as e:
+            raise AudioError(f"{os.path.basename(path)}: unreadable WAV ({e})")
+        if params is None:
+            params = current
+            silence = b'\0' * (round(gap * params[2]) * params[0] * params[1])
+        elif current != params:
+            raise AudioError(
+                f"{os.path.basename(path)} is {current[0]} ch / {current[1] * 8}-bit / {current[2]} Hz, "
+                f"the other sounds are {params[0]} ch / {params[1] * 8}-bit / {params[2]} Hz"
+            )
+        frame_size = params[0] * params[1]
+        name = os.path.splitext(os.path.basename(path))[0]
+        sounds[name] = [round(frames_so_far / params[2], 4), round(len(frames) / frame_size / params[2], 4)]
+        chunks += [frames, silence]
+        frames_so_far += (len(frames) + len(silence)) // frame_size
+    return b''.join(chunks), params, sounds
+
+
+def build(force=False):
+    """
+    Build the sprite and the music into AUDIO_BUILD_DIR and write the
+    manifest; files of earlier builds are removed. Returns the manifest.
+    """
+    source_dir, build_dir = str(settings.AUDIO_SOURCE_DIR), str(settings.AUDIO_BUILD_DIR)
+    if force and os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir, exist_ok=True)
+    binary = ffmpeg()
+    manifest = {'encoder': 'ffmpeg' if binary else None, 'sprite': None, 'music': {}}
+
+    sound_dir = os.path.join(source_dir, SOUND_DIR)
+    wavs = sorted(
+        os.path.join(sound_dir, name) for name in os.listdir(sound_dir) if name.lower().endswith('.wav')
+    ) if os.path.isdir(sound_dir) else []
+    if wavs:
+        pcm, (channels, sample_width, rate), sounds = _sprite_pcm(wavs, GAP if binary else 0)
+        wav_path = os.path.join(build_dir, f"sfx.{_digest(pcm, channels, sample_width, rate)}.wav")
+        if not os.path.exists(wav_path):
+            with wave.open(wav_path, 'wb') as w:
+                w.setnchannels(channels)
+                w.setsampwidth(sample_width)
+                w.setframerate(rate)
+                w.writeframes(pcm)
+        outputs = _outputs(binary, wav_path, 'sfx', pcm, SFX_BITRATE, build_dir, '.wav')
+        if binary:
+            os.remove(wav_path)   # only the encoder's input
+        manifest['sprite'] = {
+            'sources': [{'type': type_, 'path': STATIC_PREFIX + name} for type_, name in outputs],
+            'sounds': sounds,
+        }
+
+    music_dir = os.path.join(source_dir, MUSIC_DIR)
+    tracks = sorted(
+        name for name in os.listdir(music_dir) if name.lower().endswith(MUSIC_EXTENSIONS)
+    ) if os.path.isdir(music_dir) else []
+    for name in tracks:
+        source = os.path.join(music_dir, name)
+        with open(source, 'rb') as f:
+            data = f.read()
+        # Identical files hash to the same output names: encoded and downloaded once
+        outputs = _outputs(binary, source, 'music', data, MUSIC_BITRATE, build_dir,
+                           os.path.splitext(name)[1].lower())
+        manifest['music'][name] = [{'type': type_, 'path': STATIC_PREFIX + out} for type_, out in outputs]
+
+    keep = {MANIFEST} | {
+        entry['path'][len(STATIC_PREFIX):]
+        for entry in [*(manifest['sprite'] or {}).get('sources', []), *sum(manifest['music'].values(), [])]
+    }
+    for name in os.listdir(build_dir):
+        if name not in keep:
+            os.remove(os.path.join(build_dir, name))
+
+    tmp = os.path.join(build_dir, f"{MANIFEST}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(build_dir, MANIFEST))
+    return manifest
+
+
+def load_manifest():
+    """The last build's manifest, or None before the first build_audio."""
+    try:
+        with open(os.path.join(settings.AUDIO_BUILD_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
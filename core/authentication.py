@@ -0,0 +1,71 @@
+# core/authentication.py - Stateless game tokens for the player API
+
+from django.conf import settings
+from django.core import signing
+from django.utils.functional import cached_property
+from rest_framework import authentication, exceptions
+
+GAME_TOKEN_SALT = 'core.game-token'
+
+
+def issue_game_token(player, session):
+    """Sign a short-lived token binding a player to one game session."""
+    return signing.dumps({'p': player.pk, 's': str(session.session_id)}, salt=GAME_TOKEN_SALT)
+
+
+class GameTokenUser:
+    """
+    Lightweight stand-in for request.user built from a verified token.
+    Nothing is loaded from the database unless `.player` is accessed.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, player_id, session_id):
+        self.id = self.pk = player_id
+        self.session_id = session_id
+
+    def __str__(self):
+        return f"GameTokenUser({self.pk})"
+
+    @cached_property
+    def player(self):
+        from .models import Player
+        return Player.objects.get(pk=self.pk)
+
+
+class GameTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authorization: Game <token>
+
+    Used by the player-facing endpoints (/api/session/*, /api/profile/) instead
+    of cookie sessions, so a game never creates a django_session row.
+    """
+    keyword = 'Game'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid game token header')
+
+        try:
+            payload = signing.loads(
+                auth[1].decode(),
+                salt=GAME_TOKEN_SALT,
+                max_age=settings.GAME_TOKEN_MAX_AGE,
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Game token expired')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Invalid game token')
+
+        return GameTokenUser(payload['p'], payload['s']), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
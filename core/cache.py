@@ -0,0 +1,370 @@
+# core/cache.py - Namespaced cache with single-flight and stale-while-revalidate
+#
+# Usage:
+#     leaderboard_cache = CacheNamespace('leaderboard')
+#     data = leaderboard_cache.get_or_build(difficulty, lambda: build(difficulty))
+#     leaderboard_cache.invalidate()          # bump namespace version
+#
+# Works with any Django cache backend (local-memory and file-based included).
+# The a-prefixed methods (aget_or_build, ...) are the same for coroutine
+# builders, used by core.async_views.
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+_MISSING = object()
+
+# Per-process counters, keyed by namespace
+_stats = defaultdict(lambda: defaultdict(int))
+_stats_lock = threading.Lock()
+
+# In-process single-flight: one build per key, other threads wait for it
+_flights = {}
+_flights_lock = threading.Lock()
+
+# Same for coroutines: one future per (event loop, key)
+_aflights = {}
+_refresh_tasks = set()   # the event loop only keeps weak references to tasks
+_ABANDONED = object()    # a flight's result when its leader was cancelled
+
+_namespaces = {}
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def _count(namespace, counter, amount=1):
+    with _stats_lock:
+        _stats[namespace][counter] += amount
+
+
+def single_flight(key, fn):
+    """Run fn() once per key at a time; concurrent callers share its result."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value, False
+
+    try:
+        flight.value = fn()
+        return flight.value, True
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.event.set()
+
+
+async def asingle_flight(key, coro_fn):
+    """
+    single_flight() for coroutine functions, within one event loop. If the
+    leading caller is cancelled (its client went away), the waiting callers
+    are not: the first of them builds instead.
+    """
+    loop = asyncio.get_running_loop()
+    flight_key = (loop, key)
+    while (future := _aflights.get(flight_key)) is not None:
+        value = await asyncio.shield(future)
+        if value is not _ABANDONED:
+            return value, False
+
+    future = _aflights[flight_key] = loop.create_future()
+    try:
+        value = await coro_fn()
+    except asyncio.CancelledError:
+        future.set_result(_ABANDONED)
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()   # waiters get it; no "never retrieved" warning without them
+        raise
+    else:
+        future.set_result(value)
+        return value, True
+    finally:
+        _aflights.pop(flight_key, None)
+
+
+class CacheNamespace:
+    """
+    A group of cache entries sharing a key prefix, a version and TTL defaults.
+
+    Entries are stored as (value, fresh_until). Past fresh_until an entry is
+    stale but still served for `stale_ttl` more seconds while one caller
+    rebuilds it. A miss is rebuilt exactly once: threads in this process
+    share one build, other processes wait on a lock key in the cache.
+    """
+
+    def __init__(self, name, ttl=None, stale_ttl=None):
+        default_ttl, default_stale = settings.GAME_CACHE_TTLS.get(name, (60, 300))
+        self.name = name
+        self.ttl = default_ttl if ttl is None else ttl
+        self.stale_ttl = default_stale if stale_ttl is None else stale_ttl
+        _namespaces[name] = self
+
+    @property
+    def cache(self):
+        return caches[settings.GAME_CACHE_ALIAS]
+
+    # ---------------- keys & versions ----------------
+    def _version_key(self):
+        return f"{settings.GAME_CACHE_KEY_PREFIX}:{self.name}:__version__"
+
+    def version(self):
+        version = self.cache.get(self._version_key())
+        if version is None:
+            self.cache.add(self._version_key(), 1, None)
+            version = self.cache.get(self._version_key(), 1)
+        return version
+
+    def make_key(self, key, version=None):
+        version = self.version() if version is None else version
+        return f"{settings.GAME_CACHE_KEY_PREFIX}:{self.name}:v{version}:{key}"
+
+    # ---------------- reads ----------------
+    def get_or_build(self, key, builder, ttl=None, stale_ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        cache_key = self.make_key(key)
+
+        entry = self.cache.get(cache_key, _MISSING)
+        if entry is not _MISSING:
+            value, fresh_until = entry
+            if time.time() < fresh_until:
+                _count(self.name, 'hits')
+                return value
+
+            _count(self.name, 'stale_hits')
+            self._revalidate(cache_key, builder, ttl, stale_ttl)
+            return value
+
+        _count(self.name, 'misses')
+        value, built = single_flight(
+            cache_key, lambda: self._build_locked(cache_key, builder, ttl, stale_ttl)
+        )
+        if not built:
+            _count(self.name, 'coalesced')
+        return value
+
+    def _store(self, cache_key, value, ttl, stale_ttl):
+        self.cache.set(cache_key, (value, time.time() + ttl), ttl + stale_ttl)
+
+    def _build(self, cache_key, builder, ttl, stale_ttl):
+        _count(self.name, 'rebuilds')
+        try:
+            value = builder()
+        except Exception:
+            _count(self.name, 'errors')
+            raise
+        self._store(cache_key, value, ttl, stale_ttl)
+        return value
+
+    def _build_locked(self, cache_key, builder, ttl, stale_ttl):
+        """Build under a cross-process lock; losers wait for the winner's value."""
+        lock_key = f"{cache_key}:lock"
+        lock_timeout = settings.GAME_CACHE_LOCK_TIMEOUT
+
+        if self.cache.add(lock_key, 1, lock_timeout):
+            try:
+                return self._build(cache_key, builder, ttl, stale_ttl)
+            finally:
+                self.cache.delete(lock_key)
+
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.cache.get(cache_key, _MISSING)
+            if entry is not _MISSING:
+                return entry[0]
+            if not self.cache.has_key(lock_key):
+                break
+
+        # Lock holder died or is too slow - build it ourselves
+        return self._build(cache_key, builder, ttl, stale_ttl)
+
+    def _revalidate(self, cache_key, builder, ttl, stale_ttl):
+        """Refresh a stale entry once, in the background when enabled."""
+        lock_key = f"{cache_key}:lock"
+        if not self.cache.add(lock_key, 1, settings.GAME_CACHE_LOCK_TIMEOUT):
+            return  # someone is already refreshing it
+
+        def refresh():
+            try:
+                self._build(cache_key, builder, ttl, stale_ttl)
+            except Exception:
+                pass  # keep serving the stale value; counted in 'errors'
+            finally:
+                self.cache.delete(lock_key)
+
+        if not settings.GAME_CACHE_BACKGROUND_REFRESH:
+            refresh()
+            return
+
+        def run():
+            try:
+                refresh()
+            finally:
+                connections.close_all()
+
+        threading.Thread(target=run, name=f"cache-refresh-{self.name}", daemon=True).start()
+
+    # ---------------- async reads ----------------
+    async def aversion(self):
+        version = await self.cache.aget(self._version_key())
+        if version is None:
+            await self.cache.aadd(self._version_key(), 1, None)
+            version = await self.cache.aget(self._version_key(), 1)
+        return version
+
+    async def amake_key(self, key):
+        return self.make_key(key, await self.aversion())
+
+    async def aget_or_build(self, key, builder, ttl=None, stale_ttl=None):
+        """get_or_build() where builder is a coroutine function."""
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        cache_key = await self.amake_key(key)
+
+        entry = await self.cache.aget(cache_key, _MISSING)
+        if entry is not _MISSING:
+            value, fresh_until = entry
+            if time.time() < fresh_until:
+                _count(self.name, 'hits')
+                return value
+
+            _count(self.name, 'stale_hits')
+            await self._arevalidate(cache_key, builder, ttl, stale_ttl)
+            return value
+
+        _count(self.name, 'misses')
+        value, built = await asingle_flight(
+            cache_key, lambda: self._abuild_locked(cache_key, builder, ttl, stale_ttl)
+        )
+        if not built:
+            _count(self.name, 'coalesced')
+        return value
+
+    async def _abuild(self, cache_key, builder, ttl, stale_ttl):
+        _count(self.name, 'rebuilds')
+        try:
+            value = await builder()
+        except Exception:
+            _count(self.name, 'errors')
+            raise
+        await self.cache.aset(cache_key, (value, time.time() + ttl), ttl + stale_ttl)
+        return value
+
+    async def _abuild_locked(self, cache_key, builder, ttl, stale_ttl):
+        lock_key = f"{cache_key}:lock"
+        lock_timeout = settings.GAME_CACHE_LOCK_TIMEOUT
+
+        if await self.cache.aadd(lock_key, 1, lock_timeout):
+            try:
+                return await self._abuild(cache_key, builder, ttl, stale_ttl)
+            finally:
+                await self.cache.adelete(lock_key)
+
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await self.cache.aget(cache_key, _MISSING)
+            if entry is not _MISSING:
+                return entry[0]
+            if not await self.cache.ahas_key(lock_key):
+                break
+
+        return await self._abuild(cache_key, builder, ttl, stale_ttl)
+
+    async def _arevalidate(self, cache_key, builder, ttl, stale_ttl):
+        lock_key = f"{cache_key}:lock"
+        if not await self.cache.aadd(lock_key, 1, settings.GAME_CACHE_LOCK_TIMEOUT):
+            return
+
+        async def refresh():
+            try:
+                await self._abuild(cache_key, builder, ttl, stale_ttl)
+            except Exception:
+                pass
+            finally:
+                await self.cache.adelete(lock_key)
+
+        if not settings.GAME_CACHE_BACKGROUND_REFRESH:
+            await refresh()
+            return
+
+        async def run():
+            try:
+                await refresh()
+            finally:
+                await sync_to_async(connections.close_all)()
+
+        # A fresh context: the request's thread-sensitive executor is shut
+        # down once the response is sent, so the refresh must not inherit it
+        task = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+
+    # ---------------- invalidation ----------------
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def invalidate(self):
+        """Drop every entry in the namespace by bumping its version."""
+        _count(self.name, 'invalidations')
+        try:
+            self.cache.incr(self._version_key())
+        except ValueError:
+            self.cache.set(self._version_key(), 2, None)
+
+
+def cache_stats():
+    """Per-process hit/miss/rebuild counters for every namespace."""
+    with _stats_lock:
+        counters = {name: dict(values) for name, values in _stats.items()}
+
+    result = {}
+    for name in sorted(set(_namespaces) | set(counters)):
+        values = counters.get(name, {})
+        lookups = values.get('hits', 0) + values.get('stale_hits', 0) + values.get('misses', 0)
+        result[name] = {
+            'hits': values.get('hits', 0),
+            'stale_hits': values.get('stale_hits', 0),
+            'misses': values.get('misses', 0),
+            'coalesced': values.get('coalesced', 0),
+            'rebuilds': values.get('rebuilds', 0),
+            'errors': values.get('errors', 0),
+            'invalidations': values.get('invalidations', 0),
+            'hit_rate': round(
+                (values.get('hits', 0) + values.get('stale_hits', 0)) / lookups * 100, 2
+            ) if lookups else 0,
+        }
+    return result
+
+
+# Shared namespaces used by the game and admin views
+config_cache = CacheNamespace('config')
+leaderboard_cache = CacheNamespace('leaderboard')
+profile_cache = CacheNamespace('profile')
+analytics_cache = CacheNamespace('analytics')
+finish_cache = CacheNamespace('finish')   # session/finish answers replayed to retries
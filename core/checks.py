@@ -0,0 +1,40 @@
+# core/checks.py - System checks for caches that must be shared between processes
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+
+
+def events_cache_is_local():
+    """Whether the move-log buffer (core.session_events) lives in this process's memory."""
+    return isinstance(caches[settings.SESSION_EVENTS_CACHE_ALIAS], LocMemCache)
+
+
+@register(Tags.caches)
+def check_events_cache(app_configs, **kwargs):
+    """
+    The move-log buffer in per-process memory only works with a single
+    worker: chunks uploaded to one are invisible to the others.
+    """
+    if settings.WEB_CONCURRENCY > 1 and events_cache_is_local():
+        return [Error(
+            f"The '{settings.SESSION_EVENTS_CACHE_ALIAS}' cache is local to each process, "
+            f"but WEB_CONCURRENCY={settings.WEB_CONCURRENCY}.",
+            hint='Set SESSION_EVENTS_CACHE_DIR to a directory shared by the workers.',
+            id='core.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_events_cache_flush(app_configs, **kwargs):
+    """Even with one worker, manage.py flush_session_events runs in another process."""
+    if settings.WEB_CONCURRENCY == 1 and events_cache_is_local():
+        return [Warning(
+            f"The '{settings.SESSION_EVENTS_CACHE_ALIAS}' cache is local to the web process: "
+            f"manage.py flush_session_events cannot see it, so running games are never snapshotted.",
+            hint='Set SESSION_EVENTS_CACHE_DIR to a directory shared with the management commands.',
+            id='core.W001',
+        )]
+    return []
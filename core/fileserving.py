@@ -0,0 +1,343 @@
+# core/fileserving.py - Static files, media and the game shell, served by Django
+#
+# serve_static() answers /static/<path> from STATIC_ROOT (SERVE_STATIC),
+# serve_media() /media/<path> from MEDIA_ROOT (SERVE_MEDIA):
+#
+#   - hashed static names (core.storage manifest) are cached for a year,
+#     immutable; other static files must be revalidated, media are cached
+#     for MEDIA_MAX_AGE
+#   - the .br / .gz copy built by collectstatic when Accept-Encoding allows
+#   - ETag / Last-Modified with 304s, and single byte ranges (206 / 416)
+#     for seeking in music
+#
+# Who sends the bytes (file_response):
+#
+#   FILE_ACCEL = 'x-accel-redirect'   nginx: Django checks the request and
+#       answers with an internal URI (FILE_ACCEL_LOCATIONS); nginx sends
+#       the file, including ranges and its own conditional checks. The
+#       locations need `internal;` and `gzip_static on;` (and brotli_static
+#       with the brotli module), e.g.
+#
+#           location /internal/static/ { internal; alias /srv/fruit/staticfiles/; gzip_static on; gzip_vary on; }
+#
+#   FILE_ACCEL = 'x-sendfile'         Apache mod_xsendfile / lighttpd: the
+#       same with the absolute path of the file (the precompressed copy,
+#       when one is picked)
+#
+#   FILE_ACCEL = ''                   Django itself. Whole files are
+#       FileResponses, sent with the WSGI server's file_wrapper (sendfile)
+#       or, under core.asgi, as ASGI zero-copy sends; ranges are streamed.
+
+import functools
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .api_views import UserGameConfigView
+from .storage import ENCODINGS
+
+HASHED_NAME = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{12}(?P<ext>\.[^./]+)$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_hashed(path):
+    """True for a content-hashed name listed in the staticfiles manifest."""
+    match = HASHED_NAME.match(path)
+    if not match:
+        return False
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return hashed_files.get(match['stem'] + match['ext']) == path
+
+
+def _etag(stat, suffix=''):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}"'
+
+
+def _parse_range(header, size):
+    """(start, end) of a single satisfiable range, None for no/invalid/unsupported range, False if unsatisfiable."""
+    match = RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None   # multiple ranges, other units: send the whole file
+    first, last = match.groups()
+    if first:
+        if last and int(last) < int(first):
+            return None   # invalid range: ignored, like a missing header
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1   # suffix range: the last N bytes
+    if start >= size:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    header = request.headers.get('If-Range')
+    if not header:
+        return True
+    if header.startswith(('"', 'W/')):
+        return header == etag
+    date = parse_http_date_safe(header)
+    return date is not None and int(mtime) <= date
+
+
+def _read(path, start, length, block_size=FileResponse.block_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _accepts(header, coding):
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip() == coding:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _accel_location(path):
+    """Internal URI of path under one of FILE_ACCEL_LOCATIONS, or None."""
+    for root, location in settings.FILE_ACCEL_LOCATIONS.items():
+        root = os.path.abspath(root)
+        if os.path.commonpath([root, path]) == root:
+            return location.rstrip('/') + '/' + quote(os.path.relpath(path, root).replace(os.sep, '/'))
+    return None
+
+
+def _accel_response(path, served, content_type):
+    """Empty response handing the file to the web server in front, or None to send it ourselves."""
+    if settings.FILE_ACCEL == 'x-accel-redirect':
+        location = _accel_location(path)   # nginx picks .gz/.br itself (gzip_static)
+        if location is None:
+            return None
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = location
+        return response
+    if settings.FILE_ACCEL == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = served
+        return response
+    return None
+
+
+def file_response(request, path, content_type, encodings=(), cache_control=None, etag=None, last_modified=None):
+    """
+    Conditional / range / precompressed response for the file at `path`,
+    sent by us or handed to the web server (FILE_ACCEL, see above).
+    `encodings`: (content-coding, file suffix) pairs to try, best first;
+    range requests always get the identity file. `etag` and `last_modified`
+    (a timestamp) replace the file's own validators, for a file derived
+    from another one (core.resize renders).
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('No such file')
+    if not os.path.isfile(path):
+        raise Http404('No such file')
+
+    own_etag, mtime = etag is None, stat.st_mtime if last_modified is None else last_modified
+    served, coding, etag = path, None, etag or _etag(stat)
+    if 'Range' not in request.headers:
+        accepted = request.headers.get('Accept-Encoding', '')
+        for name, suffix in encodings:
+            if _accepts(accepted, name) and os.path.exists(path + suffix):
+                coded = '-' + suffix[1:]
+                served, coding = path + suffix, name
+                etag = _etag(stat, coded) if own_etag else f'{etag[:-1]}{coded}"'
+                break
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if response is None:
+        response = _accel_response(path, served, content_type)
+        if response is not None:
+            coding = coding if settings.FILE_ACCEL == 'x-sendfile' else None
+        else:
+            response = _body(request, served, stat, etag, mtime, content_type)
+        if coding:
+            response['Content-Encoding'] = coding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if encodings:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    return response
+
+
+def _body(request, path, stat, etag, mtime, content_type):
+    if 'Range' in request.headers and _if_range_matches(request, etag, mtime):
+        size = stat.st_size
+        span = _parse_range(request.headers['Range'], size)
+        if span is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if span:
+            start, end = span
+            response = StreamingHttpResponse(_read(path, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+            response.file_span = (path, start, end - start + 1)   # for core.asgi
+            return response
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response.file_span = (path, 0, os.fstat(response.file_to_stream.fileno()).st_size)
+    return response
+
+
+@require_safe
+def serve_static(request, path):
+    """GET /static/<path> from STATIC_ROOT (see module docstring)."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('No such file')
+
+    content_type, _ = mimetypes.guess_type(path)
+    if is_hashed(path):
+        cache_control = {'public': True, 'max_age': settings.STATIC_IMMUTABLE_MAX_AGE, 'immutable': True}
+    else:
+        cache_control = {'public': True, 'no_cache': True}
+    return file_response(
+        request, full_path, content_type or 'application/octet-stream',
+        encodings=[(coding, suffix) for coding, suffix, _ in ENCODINGS],
+        cache_control=cache_control,
+    )
+
+
+@require_safe
+def serve_media(request, path):
+    """GET /media/<path> from MEDIA_ROOT (see module docstring)."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('No such file')
+
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding:   # e.g. a .gz upload: not ours to decode in the browser
+        content_type = 'application/octet-stream'
+    return file_response(
+        request, full_path, content_type or 'application/octet-stream',
+        cache_control={'public': True, 'max_age': settings.MEDIA_MAX_AGE},
+    )
+
+
+# ---------------- game shell ----------------
+#
+# The page is the same bytes for every visitor and language (i18n runs in
+# the browser), so it is never rendered per request: `build_static` writes
+# it once per deploy, and without that file the template is rendered once
+# per process (every request under DEBUG). No context processors run, so
+# the session is not touched. Per config version the response adds
+#
+#   - Link: preload hints for /api/game/config/ and the card atlas sheets,
+#     from the cached config payload (no queries while it is cached)
+#   - an ETag of the page and the config version, for 304s; Cache-Control
+#     is no-cache, so browsers revalidate on every visit
+_shell = {'mtime': None, 'body': None, 'hash': None}
+
+
+def _shell_body():
+    """(body, hash) of index.html as prebuilt by `manage.py build_static`, else rendered."""
+    try:
+        mtime = os.stat(settings.INDEX_SHELL_PATH).st_mtime_ns
+    except FileNotFoundError:
+        mtime = 'rendered'
+    if _shell['mtime'] != mtime or (mtime == 'rendered' and settings.DEBUG):
+        if mtime == 'rendered':
+            body = render_to_string('index.html').encode()
+        else:
+            with open(settings.INDEX_SHELL_PATH, 'rb') as f:
+                body = f.read()
+        _shell.update(mtime=mtime, body=body, hash=hashlib.sha256(body).hexdigest()[:16])
+    return _shell['body'], _shell['hash']
+
+
+def _preload_links(payload):
+    # The URL api.js getConfig() fetches ('game-config' is also an admin_api route name)
+    links = ['</api/game/config/>; rel=preload; as=fetch; crossorigin=use-credentials']
+    for sheet in (payload.get('atlas') or {}).get('sheets', []):
+        links.append(f'<{sheet["url"]}>; rel=preload; as=image')
+    return ', '.join(links)
+
+
+@require_safe
+def index_shell(request):
+    """The game page (see above)."""
+    body, body_hash = _shell_body()
+    payload = UserGameConfigView.cached_payload()
+    etag = f'"{body_hash}-{payload["config"]["version"]}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='text/html; charset=utf-8')
+    response['ETag'] = etag
+    response['Link'] = _preload_links(payload)
+
+    if settings.CSRF_COOKIE_NAME in request.COOKIES:
+        patch_cache_control(response, public=True, no_cache=True)
+    else:
+        get_token(request)   # sets the csrftoken cookie api.js sends back
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ---------------- service worker ----------------
+# static/js/sw.js, served from / so it may control the game page, with
+# the hashed files to precache prepended. A deploy changes the list, so
+# the script bytes change and browsers install the new worker. Built once
+# per process (every request under DEBUG, where sw.js is being edited).
+PRECACHE_PREFIXES = ('js/', 'style.css', 'custom-confirm-modal.css', 'images/')
+SERVICE_WORKER = 'js/sw.js'
+
+
+@functools.cache
+def _service_worker():
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    precache = ['/'] + [
+        staticfiles_storage.base_url + hashed
+        for name, hashed in sorted(hashed_files.items())
+        if name.startswith(PRECACHE_PREFIXES) and name != SERVICE_WORKER
+    ]
+    with open(finders.find(SERVICE_WORKER), 'rb') as f:
+        source = f.read()
+    build = hashlib.sha256(json.dumps(precache).encode() + source).hexdigest()[:16]
+    manifest = json.dumps({'build': build, 'precache': precache})
+    return f"self.ASSET_MANIFEST = {manifest};\n".encode() + source, f'"{build}"'
+
+
+@require_safe
+def service_worker(request):
+    """GET /sw.js (see above); always revalidated."""
+    if settings.DEBUG:
+        _service_worker.cache_clear()
+    body, etag = _service_worker()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='text/javascript; charset=utf-8')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,172 @@
+# core/gamelog.py - Compact binary encoding of per-move game logs
+#
+# Clients send the move log as JSON:
+#
+#   {"events": [{"t": 1830, "type": "match", "text": 12, "fruit": 7},
+#               {"t": 4120, "type": "miss", "text": 3, "fruit": 7},
+#               {"t": 9000, "type": "shuffle"}, ...]}
+#
+# t is milliseconds since the game started, text / fruit are card ids.
+# It is stored in GameSession.log_bin as:
+#
+#   byte 0          format version (1)
+#   varint          number of events
+#   per event       varint(delta_ms << 2 | kind)
+#                   varint(text), varint(fruit)     only for miss / match
+#
+# Varints are unsigned LEB128 (7 bits per byte, high bit = more). A typical
+# move takes 3-4 bytes against ~45 for the JSON object.
+
+import collections
+
+VERSION = 1
+KINDS = ('miss', 'match', 'hint', 'shuffle')
+KIND_CODES = {name: code for code, name in enumerate(KINDS)}
+CARD_KINDS = frozenset((KIND_CODES['miss'], KIND_CODES['match']))
+MAX_EVENTS = 5000
+
+
+class GameLogError(ValueError):
+    pass
+
+
+def _put_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _int(event, key, index):
+    value = event.get(key)
+    if type(value) is not int or value < 0:
+        raise GameLogError(f"events[{index}].{key} must be a non-negative integer")
+    return value
+
+
+# ====================== ENCODE ======================
+def encode(events):
+    """JSON move events -> bytes. Raises GameLogError on malformed input."""
+    if not isinstance(events, (list, tuple)):
+        raise GameLogError('events must be a list')
+    if len(events) > MAX_EVENTS:
+        raise GameLogError(f"At most {MAX_EVENTS} events per game")
+
+    out = bytearray((VERSION,))
+    _put_varint(out, len(events))
+    previous = 0
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            raise GameLogError(f"events[{index}] must be an object")
+        kind = KIND_CODES.get(event.get('type'))
+        if kind is None:
+            raise GameLogError(f"events[{index}].type must be one of {', '.join(KINDS)}")
+        t = _int(event, 't', index)
+        if t < previous:
+            raise GameLogError(f"events[{index}].t goes back in time")
+
+        _put_varint(out, (t - previous) << 2 | kind)
+        if kind in CARD_KINDS:
+            _put_varint(out, _int(event, 'text', index))
+            _put_varint(out, _int(event, 'fruit', index))
+        previous = t
+    return bytes(out)
+
+
+# ====================== DECODE ======================
+def iter_events(data):
+    """
+    Yield (t_ms, kind, text, fruit) tuples; text / fruit are None for hint
+    and shuffle. Cheap enough to stream over many sessions for analysis.
+    """
+    data = bytes(data)   # BinaryField hands back memoryview on PostgreSQL
+    if not data:
+        return
+    if data[0] != VERSION:
+        raise GameLogError(f"Unsupported game log version {data[0]}")
+
+    size = len(data)
+    pos = 1
+
+    def varint():
+        nonlocal pos
+        result = shift = 0
+        while True:
+            if pos >= size:
+                raise GameLogError('Truncated game log')
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    t = 0
+    for _ in range(varint()):
+        head = varint()
+        t += head >> 2
+        kind = head & 3
+        if kind < 2:   # miss / match
+            yield t, KINDS[kind], varint(), varint()
+        else:
+            yield t, KINDS[kind], None, None
+
+
+def count(data):
+    """Number of events in an encoded log, read from the header only."""
+    data = bytes(data)
+    if not data:
+        return 0
+    result = shift = 0
+    for byte in data[1:]:
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result
+        shift += 7
+    raise GameLogError('Truncated game log')
+
+
+def _as_json(event):
+    t, kind, text, fruit = event
+    if text is None:
+        return {'t': t, 'type': kind}
+    return {'t': t, 'type': kind, 'text': text, 'fruit': fruit}
+
+
+def merge(parts):
+    """
+    Concatenate encoded logs (e.g. chunks uploaded during play) into one,
+    ordered by time; events with equal t keep their part order.
+    """
+    events = sorted(
+        (event for part in parts for event in iter_events(part)),
+        key=lambda event: event[0],
+    )
+    return encode([_as_json(event) for event in events])
+
+
+def difference(data, other):
+    """
+    The events of `data` that `other` does not hold (as a multiset), e.g. a
+    chunk that may already be part of a stored snapshot.
+    """
+    held = collections.Counter(iter_events(other))
+    fresh = []
+    for event in iter_events(data):
+        if held[event]:
+            held[event] -= 1
+        else:
+            fresh.append(event)
+    return encode([_as_json(event) for event in fresh])
+
+
+def decode(data):
+    """bytes -> the JSON shape encode() accepts."""
+    events = []
+    for t, kind, text, fruit in iter_events(data):
+        event = {'t': t, 'type': kind}
+        if text is not None:
+            event['text'] = text
+            event['fruit'] = fruit
+        events.append(event)
+    return {'v': VERSION, 'events': events}
@@ -0,0 +1,243 @@
+# core/images.py - Card image variants (resized WebP/AVIF)
+#
+# Each uploaded FruitCard/TextCard image is resized to CARD_IMAGE_WIDTHS
+# and encoded as WebP, and as AVIF when Pillow has an AVIF encoder. Files
+# are named after a hash of their content, so they can be cached forever:
+#
+#   fruits/variants/apple.3f9a1c0b7e2d.192w.webp
+#
+# The model keeps what was written in its `image_variants` JSON:
+#
+#   {"width": 301, "height": 301,
+#    "sources": {"avif": [{"name": ..., "width": 96, "height": 96}, ...],
+#                "webp": [...]}}
+#
+# Encoding runs in a thread pool: Pillow releases the GIL while resizing
+# and encoding, so the variants of one image are built in parallel.
+#
+# Saving a card only checks that a new image can be read and empties
+# image_variants (clients use the original meanwhile). The variants are
+# built after the save commits, in a background thread
+# (CARD_IMAGE_BACKGROUND_BUILD), and the files of the replaced set are
+# deleted once no card refers to them any more.
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import config_cache
+
+logger = logging.getLogger(__name__)
+
+# Best first: clients take the first type they support
+FORMATS = {
+    'avif': {'format': 'AVIF', 'mime': 'image/avif', 'options': {'quality': 55, 'speed': 6}},
+    'webp': {'format': 'WEBP', 'mime': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+}
+
+
+class CardImageError(ValueError):
+    pass
+
+
+def available_formats():
+    Image.init()
+    return [ext for ext, spec in FORMATS.items() if spec['format'] in Image.SAVE]
+
+
+def target_widths(width):
+    """Configured widths below the original; the original width if all are larger (never upscale)."""
+    widths = sorted(w for w in set(settings.CARD_IMAGE_WIDTHS) if w < width)
+    return widths or [width]
+
+
+def _verify(source):
+    try:
+        source.seek(0)
+        Image.open(source).verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise CardImageError(f"Unreadable image: {e}")
+    finally:
+        source.seek(0)
+
+
+def _open(source):
+    try:
+        source.seek(0)
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise CardImageError(f"Unreadable image: {e}")
+    finally:
+        source.seek(0)   # the original is still saved after us
+    return image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+
+def _encode(image, width, ext, stem):
+    height = max(1, round(image.height * width / image.width))
+    resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    resized.save(buf, FORMATS[ext]['format'], **FORMATS[ext]['options'])
+    data = buf.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return ext, {'name': f"{stem}.{digest}.{width}w.{ext}", 'width': width, 'height': height}, data
+
+
+def build_variants(source, upload_to, pool=None):
+    """
+    Encode every variant of `source` (an open File) into `<upload_to>/variants/`
+    and return the image_variants dict. Pass a ThreadPoolExecutor to share
+    workers between images.
+    """
+    image = _open(source)
+    formats = available_formats()
+    stem = os.path.splitext(os.path.basename(source.name or 'card'))[0]
+    directory = os.path.join(upload_to, 'variants')
+    jobs = [(width, ext) for width in target_widths(image.width) for ext in formats]
+
+    executor = pool or ThreadPoolExecutor(settings.CARD_IMAGE_WORKERS)
+    try:
+        encoded = list(executor.map(lambda job: _encode(image, *job, stem), jobs))
+    finally:
+        if pool is None:
+            executor.shutdown()
+
+    sources = {ext: [] for ext in formats}
+    for ext, variant, data in encoded:
+        name = os.path.join(directory, variant['name'])
+        # Same content, same name: re-uploading an unchanged image writes nothing
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(data))
+        sources[ext].append({**variant, 'name': name})
+
+    return {'width': image.width, 'height': image.height, 'sources': sources}
+
+
+def variant_names(variants):
+    return {entry['name'] for entries in (variants or {}).get('sources', {}).values() for entry in entries}
+
+
+def refresh_variants(card):
+    """
+    Called by FruitCard/TextCard.save() before saving: a new image (or none)
+    empties card.image_variants. Returns the names of the replaced variant
+    files, for schedule_variants() once saved; None when the image is unchanged.
+    """
+    if card.image and card.image._committed:
+        return None
+    if card.image:
+        _verify(card.image)
+    replaced = variant_names(card.image_variants)
+    card.image_variants = {}
+    return replaced
+
+
+def schedule_variants(card, replaced):
+    """After the save commits, build the variants of card.image and drop the replaced files."""
+    job = (type(card), card.pk, card.image.name or '', replaced)
+    transaction.on_commit(lambda: _enqueue(job), robust=True)
+
+
+_scheduled = threading.Lock()
+_queue = deque()
+_state = {'running': False}
+
+
+def _enqueue(job):
+    if not settings.CARD_IMAGE_BACKGROUND_BUILD:
+        build_card_variants(*job)
+        return
+    with _scheduled:
+        _queue.append(job)
+        if _state['running']:
+            return
+        _state['running'] = True
+
+    def run():
+        try:
+            while True:
+                with _scheduled:
+                    if not _queue:
+                        _state['running'] = False
+                        return
+                    job = _queue.popleft()
+                try:
+                    build_card_variants(*job)
+                except Exception:
+                    logger.exception('Card image variants build failed')
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='card-image-variants', daemon=True).start()
+
+
+def build_card_variants(model, pk, image_name, replaced=()):
+    """
+    Build and store the variants of card `pk` if its image is still
+    `image_name`, then delete `replaced` files no card refers to. A set built
+    for an image replaced meanwhile is deleted the same way.
+    """
+    orphans = set(replaced)
+    card = model.objects.filter(pk=pk, image=image_name).first() if image_name else None
+    if card is not None:
+        with card.image.open('rb') as source:
+            variants = build_variants(source, card.image.field.upload_to)
+        if model.objects.filter(pk=pk, image=image_name).update(image_variants=variants):
+            config_cache.invalidate()   # update() sends no post_save
+        else:
+            orphans |= variant_names(variants)
+    if orphans:
+        delete_unreferenced(orphans)
+
+
+def delete_unreferenced(names):
+    """Delete the variant files among `names` that no card's image_variants lists."""
+    from .models import FruitCard, TextCard
+
+    referenced = set()
+    for model in (FruitCard, TextCard):
+        for variants in model.objects.exclude(image_variants={}).values_list('image_variants', flat=True).iterator():
+            referenced |= variant_names(variants)
+    for name in set(names) - referenced:
+        default_storage.delete(name)
+
+
+def variant_payload(variants, build_url=None):
+    """
+    Client form of image_variants: original size plus per-format lists of
+    {url, width, height}, smallest first. `build_url` makes URLs absolute.
+    """
+    if not variants:
+        return None
+    payload = {'width': variants['width'], 'height': variants['height'], 'formats': []}
+    for ext in FORMATS:
+        entries = variants['sources'].get(ext)
+        if not entries:
+            continue
+        urls = []
+        for entry in entries:
+            url = default_storage.url(entry['name'])
+            urls.append({
+                'url': build_url(url) if build_url else url,
+                'width': entry['width'],
+                'height': entry['height'],
+            })
+        payload['formats'].append({'type': FORMATS[ext]['mime'], 'sizes': urls})
+    return payload
+
+
+def smallest_url(variants):
+    """URL of the smallest WebP variant (admin thumbnails), or None."""
+    entries = (variants or {}).get('sources', {}).get('webp')
+    return default_storage.url(entries[0]['name']) if entries else None
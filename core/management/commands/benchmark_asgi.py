@@ -0,0 +1,266 @@
+# core/management/commands/benchmark_asgi.py
+#
+#   python manage.py benchmark_asgi --concurrency 64 --requests 2000 --db-delay 20
+#   python manage.py benchmark_asgi --modes wsgi asgi-async --threads 8 --json bench.json
+#
+# Throughput and latency of ONE worker process serving the hot read
+# endpoints, per deployment:
+#
+#   wsgi         config/wsgi.py's handler on --threads threads (a gunicorn
+#                gthread worker); requests beyond that wait in its queue
+#   asgi-sync    config/asgi.py's handler with the DRF views, which Django
+#                runs on a thread per request
+#   asgi-async   config/asgi.py's handler with core.async_views
+#                (DJANGO_ASYNC_VIEWS=True)
+#
+# --concurrency clients each keep one request in flight. --db-delay sleeps
+# before every query to stand in for a remote or loaded database, and the
+# game cache is swapped for a DummyCache so every request reaches it.
+# Concurrent misses of one key still share a single build (core.cache
+# single-flight), so the default paths put the request number ({i}) into
+# the leaderboard difficulty: every one of those is its own query.
+# "peak" is the largest number of queries in flight at once: how many
+# requests the worker actually overlapped. Each mode runs in a child
+# process, because ASYNC_VIEWS is read when the URLconf loads. Requests
+# only read (config and leaderboard), so any database will do.
+
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+MODES = {
+    'wsgi': 'False',
+    'asgi-sync': 'False',
+    'asgi-async': 'True',
+}
+DEFAULT_PATHS = ['/api/leaderboard/?difficulty={i}', '/api/leaderboard/?difficulty={i}', '/api/game/config/']
+BENCH_CACHE = 'benchmark-dummy'
+
+
+class _Gauge:
+    """Queries in flight now and at most."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+def _install_db_delay(delay, gauge):
+    def delayed(execute, sql, params, many, context):
+        with gauge:
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delayed not in connection.execute_wrappers:   # fired again on every reconnect
+            connection.execute_wrappers.append(delayed)
+
+    connection_created.connect(install, weak=False)
+
+
+def _host():
+    return next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in '.*'), 'localhost')
+
+
+def game_cache_bypassed():
+    """override_settings() pointing the game cache at a DummyCache."""
+    caches = {**settings.CACHES, BENCH_CACHE: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    return override_settings(CACHES=caches, GAME_CACHE_ALIAS=BENCH_CACHE, REQUEST_METRICS_SERVER_TIMING=False)
+
+
+def summarize(elapsed, latencies, statuses):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status >= 400),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def _split(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+def run_wsgi(paths, total, concurrency, threads):
+    from django.core.handlers.wsgi import WSGIHandler
+    handler = WSGIHandler()
+    host = _host()
+
+    def serve(path):
+        path, query = _split(path)
+        status = []
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        result = handler(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+        try:
+            b''.join(result)
+        finally:
+            result.close()   # request_finished: closes the DB connection, or keeps it (CONN_MAX_AGE)
+        return status[0]
+
+    counter = iter(range(total))
+    latencies, statuses = [], []
+
+    with ThreadPoolExecutor(threads, thread_name_prefix='worker') as server:
+        def client():
+            for i in counter:
+                start = time.perf_counter()
+                statuses.append(server.submit(serve, paths[i % len(paths)].format(i=i)).result())
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return time.perf_counter() - started, latencies, statuses
+
+
+def run_asgi(paths, total, concurrency):
+    from core.asgi import SendfileASGIHandler
+    handler = SendfileASGIHandler()
+    host = _host().encode()
+
+    async def serve(path):
+        path, query = _split(path)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'server': (host.decode(), 80), 'client': ('127.0.0.1', 1),
+            'headers': [(b'host', host)],
+        }
+        inbox = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = []
+
+        async def receive():
+            if inbox:
+                return inbox.pop()
+            await asyncio.Event().wait()   # the client never disconnects
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await handler(scope, receive, send)
+        return status[0]
+
+    async def main():
+        counter = iter(range(total))
+        latencies, statuses = [], []
+
+        async def client():
+            for i in counter:
+                start = time.perf_counter()
+                statuses.append(await serve(paths[i % len(paths)].format(i=i)))
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, statuses
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = "Compare requests/s of one WSGI worker and one ASGI worker (sync and async views) on a slow database"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight')
+        parser.add_argument('--threads', type=int, default=8, help='Threads of the WSGI worker')
+        parser.add_argument('--db-delay', type=float, default=20.0, help='Milliseconds added to every query')
+        parser.add_argument('--path', dest='paths', action='append', default=None,
+                            help="Path to request, repeatable; {i} is the request number (default: %s)" % ' '.join(DEFAULT_PATHS))
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the report as JSON')
+        parser.add_argument('--worker', choices=list(MODES), default=None, help='Internal: run one mode')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['threads'] < 1:
+            raise CommandError('--requests, --concurrency and --threads must be >= 1')
+        options['paths'] = options['paths'] or DEFAULT_PATHS
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        report = {}
+        for mode in options['modes']:
+            self.stdout.write(f"{mode}: {options['requests']} requests, {options['concurrency']} in flight ...")
+            report[mode] = self.spawn(mode, options)
+        self.print_report(report, options)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    def spawn(self, mode, options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_asgi', '--worker', mode,
+            '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+            '--threads', str(options['threads']), '--db-delay', str(options['db_delay']),
+            *sum((['--path', path] for path in options['paths']), []),
+        ]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, 'DJANGO_ASYNC_VIEWS': MODES[mode]}
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"{mode} worker failed:\n{result.stderr.strip()}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options):
+        gauge = _Gauge()
+        _install_db_delay(options['db_delay'] / 1000, gauge)
+        with game_cache_bypassed():
+            if options['worker'] == 'wsgi':
+                elapsed, latencies, statuses = run_wsgi(
+                    options['paths'], options['requests'], options['concurrency'], options['threads'],
+                )
+            else:
+                elapsed, latencies, statuses = run_asgi(
+                    options['paths'], options['requests'], options['concurrency'],
+                )
+        return {**summarize(elapsed, latencies, statuses), 'peak_queries': gauge.peak}
+
+    def print_report(self, report, options):
+        header = f"{'mode':<12}{'reqs':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'peak':>7}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, r in report.items():
+            self.stdout.write(
+                f"{mode:<12}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['peak_queries']:>7}"
+            )
+        self.stdout.write('-' * len(header))
+        self.stdout.write(
+            f"{options['db_delay']:g} ms per query, {options['threads']} WSGI threads "
+            f"(latencies in ms, peak = queries in flight at once)"
+        )
@@ -0,0 +1,135 @@
+# core/management/commands/benchmark_connections.py
+#
+#   DB_HOST=db.internal python manage.py benchmark_connections --requests 2000 --concurrency 16
+#   python manage.py benchmark_connections --server asgi --modes per-request pool
+#
+# Requests per second of one worker process with each connection setting
+# of config/database.py:
+#
+#   per-request   DB_CONN_MAX_AGE=0: connect (TCP, TLS, auth) on every request
+#   persistent    DB_CONN_MAX_AGE=60 + health checks: one connection per thread
+#   pool          DB_POOL=True: psycopg 3 pool shared by the worker's threads
+#
+# Each mode runs in a child process with those variables set, so the
+# settings module must build DATABASES with database_config(). Requests go
+# through the WSGI handler on --threads threads, or the ASGI handler with
+# --server asgi (where persistent connections are not reused: every
+# request runs on a new thread). The game cache is bypassed, as in
+# benchmark_asgi. "connects" counts the connections actually opened.
+# Point it at the PostgreSQL server and network of the deployment: against
+# a local socket a connect costs a fraction of what it does across a
+# network with TLS.
+
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from config.database import pool_available
+
+from .benchmark_asgi import DEFAULT_PATHS, game_cache_bypassed, run_asgi, run_wsgi, summarize
+
+MODES = {
+    'per-request': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'True', 'DB_POOL': 'False'},
+    'pool': {'DB_POOL': 'True', 'DB_CONN_HEALTH_CHECKS': 'True'},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare requests/s with a connection per request, persistent connections and a connection pool"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight')
+        parser.add_argument('--threads', type=int, default=8, help='Threads of the WSGI worker')
+        parser.add_argument('--path', dest='paths', action='append', default=None,
+                            help="Path to request, repeatable; {i} is the request number (default: %s)"
+                                 % ' '.join(DEFAULT_PATHS))
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the report as JSON')
+        parser.add_argument('--worker', choices=list(MODES), default=None, help='Internal: run one mode')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['threads'] < 1:
+            raise CommandError('--requests, --concurrency and --threads must be >= 1')
+        options['paths'] = options['paths'] or DEFAULT_PATHS
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        if 'pool' in options['modes'] and not pool_available():
+            raise CommandError('pool mode needs psycopg_pool: pip install "psycopg[pool]"')
+        report = {}
+        for mode in options['modes']:
+            self.stdout.write(f"{mode}: {options['requests']} requests over {options['server']} ...")
+            report[mode] = self.spawn(mode, options)
+        self.print_report(report, options)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    def spawn(self, mode, options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_connections', '--worker', mode,
+            '--server', options['server'], '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']), '--threads', str(options['threads']),
+            *sum((['--path', path] for path in options['paths']), []),
+        ]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, **MODES[mode]}
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"{mode} worker failed:\n{result.stderr.strip()}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options):
+        database = connections['default']
+        pooled = bool(database.settings_dict['OPTIONS'].get('pool'))
+        if options['worker'] == 'pool' and not pooled:
+            raise CommandError('DB_POOL=True had no effect: is DATABASES built with config.database?')
+
+        connects = [0]
+        lock = threading.Lock()
+
+        def count(sender, connection, **kwargs):   # fired per checkout when pooled
+            with lock:
+                connects[0] += 1
+
+        connection_created.connect(count, weak=False)
+        with game_cache_bypassed():
+            if options['server'] == 'wsgi':
+                result = run_wsgi(options['paths'], options['requests'], options['concurrency'], options['threads'])
+            else:
+                result = run_asgi(options['paths'], options['requests'], options['concurrency'])
+        if pooled:
+            connects[0] = database.pool.get_stats().get('connections_num', 0)
+        return {
+            **summarize(*result),
+            'connects': connects[0],
+            'conn_max_age': database.settings_dict['CONN_MAX_AGE'],
+            'pooled': pooled,
+        }
+
+    def print_report(self, report, options):
+        header = f"{'mode':<14}{'reqs':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'connects':>10}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, r in report.items():
+            self.stdout.write(
+                f"{mode:<14}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['connects']:>10}"
+            )
+        self.stdout.write('-' * len(header))
+        self.stdout.write(
+            f"{settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1]} via {options['server']}, "
+            f"{options['concurrency']} in flight (latencies in ms)"
+        )
@@ -0,0 +1,135 @@
+# core/management/commands/benchmark_indexes.py
+#
+#   python manage.py generate_dataset --players 200000 --sessions 5000000 --promos 100000 --workers 4
+#   python manage.py benchmark_indexes --repeat 20
+#
+# Runs the hot queries (leaderboard, profile history / promos, promo claim)
+# and prints EXPLAIN plans and median timings with the index pack from
+# core/rewards 0003_hot_query_indexes dropped ("before") and in place
+# ("after"). On PostgreSQL the indexes are dropped inside a transaction that
+# is rolled back, so nothing changes - but the tables stay locked while the
+# "before" pass runs. Do not point this at a live primary.
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from core.models import GameSession
+from rewards.models import PromoCode
+
+INDEX_PACK = {
+    GameSession: ['session_leaderboard_idx', 'session_player_recent_idx'],
+    PromoCode: ['promo_unused_idx', 'promo_player_claimed_idx'],
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def hot_queries():
+    """(label, queryset) pairs mirroring the views' queries."""
+    heavy = (
+        GameSession.objects.filter(player__isnull=False).order_by().values('player')
+        .annotate(n=Count('id')).order_by('-n').values_list('player', flat=True).first()
+    )
+    typical = GameSession.objects.filter(player__isnull=False).order_by('pk').values_list('player', flat=True).first()
+    claimer = PromoCode.objects.filter(player__isnull=False).values_list('player', flat=True).first()
+
+    queries = []
+    for difficulty in (1, 4):
+        queries.append((
+            f"leaderboard difficulty={difficulty}",
+            GameSession.objects.filter(ended_at__isnull=False, difficulty=difficulty)
+            .select_related('player').order_by('-score_balls', 'duration')[:10],
+        ))
+    for label, player_id in (('heaviest player', heavy), ('typical player', typical)):
+        queries.append((
+            f"profile history ({label})",
+            GameSession.objects.filter(player_id=player_id).order_by('-started_at')[:20]
+            .values('started_at', 'score_balls', 'difficulty', 'duration'),
+        ))
+    queries.append((
+        'profile promos',
+        PromoCode.objects.filter(player_id=claimer).order_by('-claimed_at').values('code', 'claimed_at'),
+    ))
+    queries.append((
+        'promo claim (FOR UPDATE)',
+        PromoCode.objects.select_for_update().filter(is_used=False).order_by('pk')[:1],
+    ))
+    return queries
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN ANALYZE the hot queries with and without the hot-query index pack"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per query (median reported)')
+        parser.add_argument('--no-plans', action='store_true', help='Only print the timing table')
+
+    def handle(self, *args, **options):
+        if not GameSession.objects.exists():
+            raise CommandError('No game sessions - load data first with `manage.py generate_dataset`')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be >= 1')
+
+        self.repeat = options['repeat']
+        self.show_plans = not options['no_plans']
+        self.postgres = connection.vendor == 'postgresql'
+        if not self.postgres:
+            self.stdout.write(self.style.WARNING(
+                f"{connection.vendor}: plans come without ANALYZE, numbers are indicative only"
+            ))
+
+        queries = hot_queries()
+
+        before = {}
+        try:
+            with transaction.atomic():
+                self.drop_index_pack()
+                before = self.run_pass('BEFORE (index pack dropped)', queries)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        with transaction.atomic():
+            after = self.run_pass('AFTER', queries)
+
+        self.print_table(before, after)
+
+    def drop_index_pack(self):
+        with connection.cursor() as cursor:
+            for names in INDEX_PACK.values():
+                for name in names:
+                    cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}')
+
+    def run_pass(self, title, queries):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {title} ==="))
+        results = {}
+        for label, qs in queries:
+            if self.show_plans:
+                plan = qs.explain(analyze=True, buffers=True) if self.postgres else qs.explain()
+                self.stdout.write(self.style.SQL_FIELD(f"\n-- {label}"))
+                self.stdout.write(plan)
+            results[label] = self.time_query(qs)
+        return results
+
+    def time_query(self, qs):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            list(qs.all())   # fresh clone: no result cache
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def print_table(self, before, after):
+        header = f"{'query':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}"
+        self.stdout.write('\n' + header)
+        self.stdout.write('-' * len(header))
+        for label, after_ms in after.items():
+            before_ms = before.get(label)
+            speedup = f"{before_ms / after_ms:.1f}x" if before_ms and after_ms else '-'
+            self.stdout.write(f"{label:<36}{before_ms or 0:>12.3f}{after_ms:>12.3f}{speedup:>10}")
@@ -0,0 +1,51 @@
+# core/management/commands/build_audio.py
+#
+#   python manage.py build_audio            # re-encodes only what changed
+#   python manage.py build_audio --force    # start from an empty AUDIO_BUILD_DIR
+#
+# Packs static/sounds/*.wav into one sprite and deduplicates/transcodes
+# static/music (core.audio). build_static runs this before collectstatic.
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import audio
+
+
+class Command(BaseCommand):
+    help = "Build the sound effect sprite and the music streams"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-encode everything')
+
+    def handle(self, *args, **options):
+        if audio.ffmpeg() is None:
+            self.stderr.write(self.style.WARNING(
+                f"{settings.AUDIO_FFMPEG} not found: sprite stays WAV, music is copied unencoded"
+            ))
+        try:
+            manifest = audio.build(force=options['force'])
+        except audio.AudioError as e:
+            raise CommandError(str(e))
+
+        source_dir = settings.AUDIO_SOURCE_DIR
+        sprite = manifest['sprite']
+        if sprite:
+            before = sum(
+                os.path.getsize(os.path.join(source_dir, audio.SOUND_DIR, f"{name}.wav")) for name in sprite['sounds']
+            )
+            self.stdout.write(f"Sprite: {len(sprite['sounds'])} sounds, {before / 1024:.0f} KB -> "
+                              + ', '.join(self.describe(entry) for entry in sprite['sources']))
+
+        music = manifest['music']
+        if music:
+            before = sum(os.path.getsize(os.path.join(source_dir, audio.MUSIC_DIR, name)) for name in music)
+            outputs = {entry['path']: entry for entries in music.values() for entry in entries}
+            self.stdout.write(f"Music: {len(music)} tracks, {before / 1024:.0f} KB -> "
+                              + ', '.join(self.describe(entry) for entry in outputs.values()))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {os.path.join(settings.AUDIO_BUILD_DIR, audio.MANIFEST)}"))
+
+    def describe(self, entry):
+        size = os.path.getsize(os.path.join(settings.AUDIO_BUILD_DIR, entry['path'][len(audio.STATIC_PREFIX):]))
+        return f"{entry['path']} {size / 1024:.0f} KB"
@@ -0,0 +1,29 @@
+# core/management/commands/build_card_atlas.py
+#
+#   python manage.py build_card_atlas            # only if the active card images changed
+#   python manage.py build_card_atlas --force    # after changing CARD_ATLAS_CELL / _MAX_SIZE
+#
+# Card saves rebuild the atlas on their own (core.signals); this is for
+# the first build, and for changes made with bulk updates or raw SQL.
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.atlas import build_atlas
+
+
+class Command(BaseCommand):
+    help = "Pack active card images into sprite sheets for /api/game/config/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild even if the active card images did not change')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        atlas = build_atlas(force=options['force'])
+        sheets = ', '.join(f"{s['width']}x{s['height']}" for s in atlas['sheets']) or 'none'
+        self.stdout.write(self.style.SUCCESS(
+            f"Atlas v{atlas['version']}: {len(atlas['sprites'])} cards, sheets {sheets} "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,71 @@
+# core/management/commands/build_card_images.py
+#
+#   python manage.py build_card_images             # cards without variants yet
+#   python manage.py build_card_images --force     # re-encode all (after changing CARD_IMAGE_WIDTHS)
+#
+# New uploads get their variants after the save commits (core.images); this backfills
+# images uploaded before that, and reports how many bytes they save.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core import images
+from core.cache import config_cache
+from core.models import FruitCard, TextCard
+
+
+class Command(BaseCommand):
+    help = "Build resized WebP/AVIF variants of fruit and text card images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild cards that already have variants')
+        parser.add_argument('--workers', type=int, default=settings.CARD_IMAGE_WORKERS,
+                            help='Encoder threads (default: CARD_IMAGE_WORKERS)')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be >= 1')
+
+        started = time.monotonic()
+        self.stdout.write(f"Formats: {', '.join(images.available_formats())}; "
+                          f"widths: {', '.join(map(str, settings.CARD_IMAGE_WIDTHS))}")
+
+        with ThreadPoolExecutor(options['workers']) as pool:
+            for model in (FruitCard, TextCard):
+                self.build(model, pool, options['force'])
+
+        config_cache.invalidate()   # bulk_update sends no post_save
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.monotonic() - started:.1f}s"))
+
+    def build(self, model, pool, force):
+        cards = model.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        if not force:
+            cards = cards.filter(image_variants={})
+
+        updated, replaced = [], set()
+        original = smallest = 0
+        for card in cards:
+            replaced |= images.variant_names(card.image_variants)
+            try:
+                with card.image.open('rb') as source:
+                    card.image_variants = images.build_variants(source, card.image.field.upload_to, pool)
+            except (OSError, images.CardImageError) as e:
+                self.stderr.write(f"{model.__name__} {card.pk} ({card.image.name}): {e}")
+                continue
+            updated.append(card)
+            original += card.image.size
+            smallest += min(
+                default_storage.size(entries[-1]['name'])
+                for entries in card.image_variants['sources'].values()
+            )
+
+        model.objects.bulk_update(updated, ['image_variants'], batch_size=200)
+        images.delete_unreferenced(replaced)   # --force re-encoded at other widths
+        self.stdout.write(
+            f"{model.__name__}: {len(updated)} images, {original / 1024:.0f} KB originals, "
+            f"{smallest / 1024:.0f} KB at the largest variant width"
+        )
@@ -0,0 +1,58 @@
+# core/management/commands/build_static.py
+#
+#   python manage.py build_static        # once per deploy, after migrate
+#
+# build_audio (sound sprite, music), collectstatic with core.storage
+# (hashed names, .gz/.br copies), then renders index.html to
+# INDEX_SHELL_PATH with the hashed URLs inlined, so the game page is
+# rendered once per deploy instead of once per visit.
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from core.storage import ENCODINGS
+
+CLIENT_PREFIXES = ('js/', 'style.css', 'custom-confirm-modal.css', 'images/', 'audio/')
+
+
+class Command(BaseCommand):
+    help = "Collect, fingerprint and precompress static files, then prebuild the game page"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete STATIC_ROOT contents first (drops hashed files of old deploys)')
+
+    def handle(self, *args, **options):
+        call_command('build_audio', verbosity=options['verbosity'], stdout=self.stdout, stderr=self.stderr)
+        call_command('collectstatic', interactive=False, clear=options['clear'],
+                     verbosity=max(0, options['verbosity'] - 1))
+
+        shell = render_to_string('index.html')
+        os.makedirs(os.path.dirname(settings.INDEX_SHELL_PATH), exist_ok=True)
+        tmp = f"{settings.INDEX_SHELL_PATH}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(shell)
+        os.replace(tmp, settings.INDEX_SHELL_PATH)
+        self.stdout.write(f"Game page: {settings.INDEX_SHELL_PATH} ({len(shell.encode()) / 1024:.0f} KB)")
+
+        self.report()
+
+    def report(self):
+        """Bytes a first visit downloads for the client assets, per encoding."""
+        totals = {'identity': 0, **{coding: 0 for coding, _, _ in ENCODINGS}}
+        files = 0
+        for name, hashed in staticfiles_storage.hashed_files.items():
+            if not name.startswith(CLIENT_PREFIXES):
+                continue
+            files += 1
+            path = staticfiles_storage.path(hashed)
+            size = os.path.getsize(path)
+            totals['identity'] += size
+            for coding, suffix, _ in ENCODINGS:
+                totals[coding] += os.path.getsize(path + suffix) if os.path.exists(path + suffix) else size
+        sizes = ', '.join(f"{coding} {total / 1024:.0f} KB" for coding, total in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Client assets: {files} files; {sizes}"))
@@ -0,0 +1,47 @@
+# core/management/commands/flush_session_events.py
+#
+#   python manage.py flush_session_events                 # cron, every minute
+#   python manage.py flush_session_events --interval 15   # or as a loop
+#
+# Writes the move-log chunks buffered by /api/session/<id>/events/ into
+# GameSession.log_bin for games still running, so they survive a lost
+# finish and show up in the admin. Needs the shared events cache
+# (SESSION_EVENTS_CACHE_DIR): the per-process default is empty from here,
+# so the command refuses to run with it.
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.checks import events_cache_is_local
+from core.session_events import flush_in_progress
+
+
+class Command(BaseCommand):
+    help = "Bulk-write buffered move-log chunks of running games to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Games per cache lookup / bulk UPDATE')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and flush every N seconds')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be >= 1')
+        if events_cache_is_local():
+            raise CommandError(
+                f"The '{settings.SESSION_EVENTS_CACHE_ALIAS}' cache is local to each process, so the web "
+                f"workers' buffered chunks are not visible here: set SESSION_EVENTS_CACHE_DIR"
+            )
+
+        while True:
+            started = time.monotonic()
+            checked, flushed = flush_in_progress(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Flushed {flushed} of {checked} running games in {time.monotonic() - started:.2f}s"
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
@@ -0,0 +1,161 @@
+# core/management/commands/generate_dataset.py
+#
+#   python manage.py generate_dataset --players 5000000 --sessions 100000000 --promos 1000000 --workers 8
+#
+# Seeded synthetic players, sessions and promo codes for load tests and
+# query-plan work. On PostgreSQL rows are streamed through COPY in chunks,
+# optionally from several worker processes; other databases fall back to
+# bulk_create. Every chunk has its own seed, so the data only depends on
+# --seed and --chunk-size, not on --workers. Re-running with the same
+# --phone-prefix appends new players after the existing synthetic ones.
+
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.models import GameSession, Player
+from core.synthetic import (
+    PLAYER_COLUMNS, PROMO_COLUMNS, SESSION_COLUMNS, SyntheticDataset,
+    copy_rows, copy_supported, load_difficulty_profiles, orm_rows, player_ids_for_prefix,
+)
+from rewards.models import PromoCode
+
+MAX_PLAYERS_PER_PREFIX = 10 ** 7   # +998 + 2-digit prefix + 7 digits
+
+# (table, columns, make_rows) for the chunk being loaded; forked workers inherit it
+_job = None
+
+
+def _copy_chunk(chunk):
+    index, offset, count = chunk
+    table, columns, make_rows = _job
+    copy_rows(table, columns, make_rows(index, offset, count))
+    return count
+
+
+class Command(BaseCommand):
+    help = "Generate a seeded synthetic dataset of players, game sessions and promo codes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=10000, help='Players to create')
+        parser.add_argument('--sessions', type=int, default=200000, help='Game sessions to create')
+        parser.add_argument('--promos', type=int, default=10000, help='Promo codes to create')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed = same data)')
+        parser.add_argument('--days', type=int, default=180, help='Spread timestamps over the last N days')
+        parser.add_argument('--skew', type=float, default=3.0,
+                            help='Power-law exponent for play frequency (1 = uniform)')
+        parser.add_argument('--phone-prefix', default='77',
+                            help='Two digits after +998 marking synthetic players')
+        parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per COPY / bulk_create chunk')
+        parser.add_argument('--method', choices=['auto', 'copy', 'orm'], default='auto',
+                            help='Loader: COPY (PostgreSQL), bulk_create, or pick automatically')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Parallel COPY processes (row generation is CPU bound)')
+
+    def handle(self, *args, **options):
+        prefix = options['phone_prefix']
+        if len(prefix) != 2 or not prefix.isdigit():
+            raise CommandError('--phone-prefix must be two digits')
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size and --workers must be >= 1')
+
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if copy_supported() else 'orm'
+        elif method == 'copy' and not copy_supported():
+            raise CommandError('COPY needs PostgreSQL with psycopg or psycopg2')
+        if method == 'orm' and options['workers'] > 1:
+            raise CommandError('--workers needs the COPY loader')
+        self.method = method
+        self.workers = options['workers']
+        self.chunk_size = options['chunk_size']
+
+        dataset = SyntheticDataset(
+            seed=options['seed'], days=options['days'], skew=options['skew'],
+            profiles=load_difficulty_profiles(),
+        )
+        self.stdout.write(
+            f"Loading with {method.upper()} in chunks of {self.chunk_size:,} rows, {self.workers} worker(s)"
+        )
+
+        player_ids = player_ids_for_prefix(prefix)
+        if options['players']:
+            start = len(player_ids)
+            if start + options['players'] > MAX_PLAYERS_PER_PREFIX:
+                raise CommandError(
+                    f"Prefix {prefix} has room for {MAX_PLAYERS_PER_PREFIX - start:,} more players; "
+                    "use another --phone-prefix"
+                )
+            self.load(
+                'players', Player, PLAYER_COLUMNS, options['players'],
+                lambda index, offset, count: dataset.chunk('players', start, index).player_rows(
+                    start + offset, count, prefix),
+            )
+            player_ids = player_ids_for_prefix(prefix)
+
+        if options['sessions']:
+            if not player_ids:
+                raise CommandError('No synthetic players to attach sessions to; pass --players')
+            run = GameSession.objects.count()
+            self.load(
+                'sessions', GameSession, SESSION_COLUMNS, options['sessions'],
+                lambda index, offset, count: dataset.chunk('sessions', run, index).session_rows(
+                    count, player_ids),
+            )
+
+        if options['promos']:
+            start = PromoCode.objects.filter(code__startswith=dataset.promo_prefix).count()
+            self.load(
+                'promo codes', PromoCode, PROMO_COLUMNS, options['promos'],
+                lambda index, offset, count: dataset.chunk('promos', start, index).promo_rows(
+                    start + offset, count, player_ids),
+            )
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (Player, GameSession, PromoCode):
+                    cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+    def load(self, label, model, columns, total, make_rows):
+        global _job
+
+        chunks = [
+            (index, offset, min(self.chunk_size, total - offset))
+            for index, offset in enumerate(range(0, total, self.chunk_size))
+        ]
+        started = time.perf_counter()
+        done = 0
+
+        if self.workers > 1:
+            _job = (model._meta.db_table, columns, make_rows)
+            # Children must open their own connections
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(self.workers) as pool:
+                for count in pool.imap_unordered(_copy_chunk, chunks):
+                    done += count
+                    self.progress(label, done, total, started)
+            _job = None
+        else:
+            for index, offset, count in chunks:
+                rows = make_rows(index, offset, count)
+                if self.method == 'copy':
+                    copy_rows(model._meta.db_table, columns, rows)
+                else:
+                    orm_rows(model, columns, rows)
+                done += count
+                self.progress(label, done, total, started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {total:,} {label} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)"
+        ))
+
+    def progress(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"  {label}: {done:,}/{total:,} ({done / elapsed:,.0f} rows/s)",
+            ending='\r' if done < total else '\n',
+        )
+        self.stdout.flush()
@@ -0,0 +1,254 @@
+# core/management/commands/loadtest.py
+#
+#   python manage.py loadtest --url http://127.0.0.1:8000 --players 50 --duration 120
+#
+# Simulates players running the full game loop against a live server:
+# config -> session/start -> (game time) -> session/finish -> leaderboard.
+# DB queries per request are read from the Server-Timing header, so run the
+# server with REQUEST_METRICS_SERVER_TIMING=True to get that column.
+
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_api.metrics import LogLinearHistogram
+
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class EndpointStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = LogLinearHistogram()   # microseconds
+        self.errors = 0
+        self.queries = 0
+        self.queries_seen = 0
+        self.status_codes = defaultdict(int)
+
+    def record(self, latency_us, status_code, queries):
+        with self.lock:
+            self.latency.record(latency_us)
+            self.status_codes[status_code] += 1
+            if status_code == 0 or status_code >= 400:
+                self.errors += 1
+            if queries is not None:
+                self.queries += queries
+                self.queries_seen += 1
+
+
+class VirtualPlayer:
+    """One simulated player with its own keep-alive HTTP connection."""
+
+    def __init__(self, index, base_url, stats, options, rng):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.prefix = parts.path.rstrip('/')
+        self.stats = stats
+        self.options = options
+        self.rng = rng
+        self.name = f"Load Tester {index}"
+        self.phone = f"+99890{rng.randrange(10 ** 7):07d}"
+        self.conn = None
+
+    def _connection(self):
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, self.port, timeout=self.options['timeout'])
+        return self.conn
+
+    def request(self, endpoint, method, path, body=None, token=None):
+        headers = {'Accept': 'application/json'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f"Game {token}"
+
+        start = time.perf_counter()
+        status_code, data, queries = 0, None, None
+        try:
+            conn = self._connection()
+            conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = conn.getresponse()
+            raw = response.read()
+            status_code = response.status
+            match = _QUERIES_RE.search(response.getheader('Server-Timing') or '')
+            if match:
+                queries = int(match.group(1))
+            if raw:
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    data = None
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+
+        self.stats[endpoint].record(int((time.perf_counter() - start) * 1_000_000), status_code, queries)
+        return status_code, data
+
+    def play_once(self):
+        opts = self.options
+        status_code, config = self.request('game/config', 'GET', '/api/game/config/')
+        threshold = 100
+        game_seconds = 180
+        if status_code == 200 and config:
+            threshold = (config.get('config') or {}).get('promo_score_threshold', threshold)
+            levels = config.get('difficulty_settings') or []
+            if levels:
+                game_seconds = self.rng.choice(levels).get('time_seconds', game_seconds)
+
+        status_code, started = self.request('session/start', 'POST', '/api/session/start/', {
+            'name': self.name, 'phone_number': self.phone, 'mode': 'ranked',
+        })
+        if status_code != 201 or not started:
+            return
+
+        # Wait out (scaled) game time
+        time.sleep(game_seconds * opts['time_scale'] * self.rng.uniform(0.7, 1.0))
+
+        if self.rng.random() < opts['winner_rate']:
+            score = threshold + self.rng.randrange(0, max(1, threshold // 2))
+        else:
+            score = self.rng.randrange(0, max(1, threshold))
+        correct = max(1, score // 10)
+        wrong = self.rng.randrange(0, correct + 1)
+        self.request('session/finish', 'POST', '/api/session/finish/', {
+            'session_id': started['session_id'],
+            'score_balls': score,
+            'duration': game_seconds,
+            'correct_count': correct,
+            'wrong_count': wrong,
+            'best_combo': self.rng.randrange(0, correct + 1),
+            'log_json': {'events': self.move_log(correct, wrong, game_seconds)},
+        }, token=started.get('token'))
+
+        self.request('leaderboard', 'GET', '/api/leaderboard/')
+
+    def move_log(self, correct, wrong, game_seconds):
+        """Plausible match / miss events spread over the game, as game.js sends them."""
+        moves = ['match'] * correct + ['miss'] * wrong
+        self.rng.shuffle(moves)
+        times = sorted(self.rng.randrange(game_seconds * 1000) for _ in moves)
+        return [
+            {'t': t, 'type': kind, 'text': self.rng.randrange(1, 40), 'fruit': self.rng.randrange(1, 40)}
+            for t, kind in zip(times, moves)
+        ]
+
+    def run(self, stop_at, iterations):
+        done = 0
+        while time.monotonic() < stop_at and (iterations is None or done < iterations):
+            self.play_once()
+            done += 1
+            time.sleep(self.rng.uniform(0, self.options['pause']))
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Command(BaseCommand):
+    help = "Load-test a running server by simulating players through the full game loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server')
+        parser.add_argument('--players', type=int, default=20, help='Concurrent simulated players')
+        parser.add_argument('--duration', type=int, default=60, help='Test length in seconds')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='Games per player (stops early when reached)')
+        parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds to start all players')
+        parser.add_argument('--time-scale', type=float, default=0.02,
+                            help='Fraction of real game time to wait before finishing (1 = real time)')
+        parser.add_argument('--winner-rate', type=float, default=0.1,
+                            help='Share of games scoring above the promo threshold')
+        parser.add_argument('--pause', type=float, default=1.0, help='Max seconds between games')
+        parser.add_argument('--timeout', type=float, default=30.0, help='HTTP timeout in seconds')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed')
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['players'] < 1:
+            raise CommandError('--players must be >= 1')
+
+        seed_rng = random.Random(options['seed'])
+        stats = defaultdict(EndpointStats)
+        for endpoint in ('game/config', 'session/start', 'session/finish', 'leaderboard'):
+            stats[endpoint]  # fixed report order
+
+        started = time.monotonic()
+        stop_at = started + options['duration']
+        threads = []
+        self.stdout.write(
+            f"Running {options['players']} players against {options['url']} for {options['duration']}s ..."
+        )
+        for index in range(options['players']):
+            player = VirtualPlayer(index, options['url'], stats, options, random.Random(seed_rng.random()))
+            thread = threading.Thread(target=player.run, args=(stop_at, options['iterations']), daemon=True)
+            threads.append(thread)
+            thread.start()
+            time.sleep(options['ramp_up'] / options['players'])
+
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = self.build_report(stats, elapsed)
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    @staticmethod
+    def build_report(stats, elapsed):
+        endpoints = {}
+        total_requests = total_errors = 0
+        for name, s in stats.items():
+            count = s.latency.count
+            total_requests += count
+            total_errors += s.errors
+            endpoints[name] = {
+                'requests': count,
+                'rps': round(count / elapsed, 2) if elapsed else 0,
+                'errors': s.errors,
+                'error_rate': round(s.errors / count * 100, 2) if count else 0,
+                'p50_ms': round(s.latency.percentile(0.50) / 1000, 2),
+                'p95_ms': round(s.latency.percentile(0.95) / 1000, 2),
+                'p99_ms': round(s.latency.percentile(0.99) / 1000, 2),
+                'max_ms': round(s.latency.max / 1000, 2),
+                'db_queries': round(s.queries / s.queries_seen, 2) if s.queries_seen else None,
+                'status_codes': dict(s.status_codes),
+            }
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'requests': total_requests,
+            'rps': round(total_requests / elapsed, 2) if elapsed else 0,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total_requests * 100, 2) if total_requests else 0,
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        header = f"{'endpoint':<16}{'reqs':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'queries':>9}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, e in report['endpoints'].items():
+            queries = '-' if e['db_queries'] is None else f"{e['db_queries']:.1f}"
+            self.stdout.write(
+                f"{name:<16}{e['requests']:>8}{e['rps']:>9.1f}{e['error_rate']:>7.1f}"
+                f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}{e['max_ms']:>9.1f}{queries:>9}"
+            )
+        self.stdout.write('-' * len(header))
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_seconds']}s - "
+            f"{report['rps']} req/s, {report['error_rate']}% errors (latencies in ms)"
+        )
@@ -0,0 +1,94 @@
+# core/management/commands/partition_sessions.py
+#
+#   python manage.py partition_sessions --convert          # once: plain table -> partitioned
+#   python manage.py partition_sessions                    # cron (daily): create upcoming months
+#   python manage.py partition_sessions --archive          # cron (monthly): roll up, detach, export
+#   python manage.py partition_sessions --list
+#
+# Monthly started_at partitions for core_gamesession (PostgreSQL only).
+# Archiving folds each cold partition into GameSessionRollup, detaches it and
+# writes it to SESSION_ARCHIVE_DIR as <partition>.csv.gz before dropping it.
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import partitioning
+
+
+def _month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Expected YYYY-MM, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Create, list and archive the monthly game session partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Convert the plain sessions table into a partitioned one')
+        parser.add_argument('--ahead', type=int, default=None,
+                            help='Months to create ahead of the current one (default: SESSION_PARTITION_MONTHS_AHEAD)')
+        parser.add_argument('--archive', action='store_true',
+                            help='Roll up, detach and export cold partitions')
+        parser.add_argument('--archive-before', type=_month, default=None, metavar='YYYY-MM',
+                            help='Archive partitions ending on or before this month '
+                                 '(default: SESSION_ARCHIVE_AFTER_MONTHS ago)')
+        parser.add_argument('--archive-dir', default=None,
+                            help='Where the .csv.gz exports go (default: SESSION_ARCHIVE_DIR)')
+        parser.add_argument('--keep-tables', action='store_true',
+                            help='Rename archived tables to core_gamesession_archived_* instead of dropping them')
+        parser.add_argument('--list', action='store_true', help='Only print the partitions')
+
+    def handle(self, *args, **options):
+        if options['ahead'] is not None and options['ahead'] < 0:
+            raise CommandError('--ahead must be >= 0')
+
+        try:
+            if options['list']:
+                partitioning.check_supported()
+            elif options['convert']:
+                created = partitioning.convert(options['ahead'])
+                self.stdout.write(self.style.SUCCESS(f"{partitioning.TABLE} is now partitioned"))
+                self.report_created(created)
+            elif options['archive']:
+                self.archive(options)
+            else:
+                self.report_created(partitioning.ensure_partitions(options['ahead']))
+
+            if partitioning.is_partitioned():
+                self.print_partitions()
+            else:
+                self.stdout.write(f"{partitioning.TABLE} is not partitioned (run with --convert)")
+        except partitioning.PartitioningError as exc:
+            raise CommandError(str(exc))
+
+    def archive(self, options):
+        result = partitioning.archive(
+            before=options['archive_before'],
+            directory=options['archive_dir'],
+            keep_tables=options['keep_tables'],
+        )
+        for item in result['archived']:
+            self.stdout.write(f"Rolled up and detached {item['table']} ({item['rows']} rows)")
+        for item in result['exported']:
+            action = 'dropped' if item['dropped'] else 'kept'
+            self.stdout.write(self.style.SUCCESS(f"Exported {item['table']} -> {item['file']} ({action})"))
+        if not result['exported']:
+            self.stdout.write('Nothing to archive')
+
+    def report_created(self, created):
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f"Created {name}"))
+        if not created:
+            self.stdout.write('All partitions already exist')
+
+    def print_partitions(self):
+        header = f"{'partition':<36}{'until (UTC)':>22}{'~rows':>14}{'size MB':>10}"
+        self.stdout.write('\n' + header)
+        self.stdout.write('-' * len(header))
+        for p in partitioning.list_partitions():
+            until = 'DEFAULT' if p['default'] else p['upper'].strftime('%Y-%m-%d %H:%M')
+            self.stdout.write(f"{p['name']:<36}{until:>22}{p['rows']:>14}{p['bytes'] / 2 ** 20:>10.1f}")
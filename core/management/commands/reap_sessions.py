@@ -0,0 +1,43 @@
+# core/management/commands/reap_sessions.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.session_reaper import reap_abandoned_sessions
+
+
+class Command(BaseCommand):
+    help = "Mark games never finished within their time limit as abandoned (run from cron, or with --interval)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None,
+                            help='Seconds past the time limit before a game counts as abandoned '
+                                 '(default: SESSION_REAP_GRACE)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per UPDATE (default: SESSION_REAP_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to sleep between batches (default: SESSION_REAP_PAUSE)')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches per run')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and reap every N seconds')
+
+    def handle(self, *args, **options):
+        if options['grace'] is not None and options['grace'] < 0:
+            raise CommandError('--grace must be >= 0')
+
+        while True:
+            started = time.monotonic()
+            reaped = reap_abandoned_sessions(
+                grace=options['grace'],
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                max_batches=options['max_batches'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Marked {reaped} abandoned sessions in {time.monotonic() - started:.2f}s"
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
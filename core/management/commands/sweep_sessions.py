@@ -0,0 +1,50 @@
+# core/management/commands/sweep_sessions.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.session_cleanup import session_table_stats, sweep_expired_sessions, uses_session_table
+
+
+class Command(BaseCommand):
+    help = "Delete expired django_session rows in small batches (run from cron, or with --interval as a loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per DELETE (default: SESSION_SWEEP_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to sleep between batches (default: SESSION_SWEEP_PAUSE)')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches per sweep')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and sweep every N seconds')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print session table stats after each sweep')
+
+    def handle(self, *args, **options):
+        if not uses_session_table():
+            self.stdout.write("Session engine does not use django_session - nothing to sweep.")
+            return
+
+        while True:
+            started = time.monotonic()
+            deleted = sweep_expired_sessions(
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                max_batches=options['max_batches'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {deleted} expired sessions in {time.monotonic() - started:.2f}s"
+            ))
+
+            if options['stats']:
+                stats = session_table_stats()
+                self.stdout.write(
+                    f"django_session: ~{stats['total_rows']} rows, "
+                    f"{stats['expired_rows']} expired, "
+                    f"{stats['table_bytes'] if stats['table_bytes'] is not None else 'n/a'} bytes"
+                )
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
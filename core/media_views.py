@@ -0,0 +1,41 @@
+# core/media_views.py - Media served by Django itself
+
+import os
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from . import resize
+from .fileserving import file_response
+
+
+@require_safe
+def resized_image(request, width, height, path):
+    """GET /media/r/<w>x<h>/<path> - see core.resize"""
+    ext = resize.negotiate(request.headers.get('Accept', ''))
+    for _ in range(2):   # a render evicted before we open it is rendered again
+        try:
+            version, mtime = resize.source_version(path)
+            if request.GET.get('v') == version:
+                cache_control = {'public': True, 'max_age': settings.IMAGE_RESIZE_MAX_AGE, 'immutable': True}
+            else:
+                cache_control = {'public': True, 'max_age': settings.IMAGE_RESIZE_REVALIDATE_AGE}
+            filename, content_type = resize.resized(path, width, height, ext)
+            # Validators of the source, not of the render (re-rendered after
+            # eviction, touched on hits)
+            served = os.path.splitext(filename)[1][1:]
+            response = file_response(request, filename, content_type, cache_control=cache_control,
+                                     etag=f'"{version}-{width}x{height}-{served}"', last_modified=mtime)
+            break
+        except (FileNotFoundError, Http404):
+            continue
+        except (SuspiciousFileOperation, resize.ResizeError):
+            raise Http404('No such image')
+    else:
+        raise Http404('No such image')
+
+    patch_vary_headers(response, ['Accept'])
+    return response
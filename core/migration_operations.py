@@ -0,0 +1,36 @@
+# core/migration_operations.py - Migration operations shared by the apps
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+def _can_build_concurrently(schema_editor, model):
+    """PostgreSQL, and not a partitioned parent (those reject CONCURRENTLY)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row is None or row[0] != 'p'
+
+
+class AddIndexConcurrentlyIfPostgres(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL so large tables keep taking
+    writes while the index builds; a plain AddIndex on other databases and
+    on partitioned tables. Migrations using it must set atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if _can_build_concurrently(schema_editor, model):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if _can_build_concurrently(schema_editor, model):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_difficultysettings_alter_gameconfig_timer_seconds'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='gamesession',
+            index=models.Index(condition=models.Q(('ended_at__isnull', False)), fields=['difficulty', '-score_balls', 'duration'], name='session_leaderboard_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='gamesession',
+            index=models.Index(fields=['player', '-started_at'], include=('score_balls', 'difficulty', 'duration'), name='session_player_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSessionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('difficulty', models.IntegerField()),
+                ('games', models.PositiveBigIntegerField(default=0)),
+                ('finished_games', models.PositiveBigIntegerField(default=0)),
+                ('score_total', models.BigIntegerField(default=0)),
+                ('duration_total', models.BigIntegerField(default=0)),
+                ('best_score', models.IntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month', 'difficulty'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'difficulty'), name='session_rollup_month_difficulty')],
+            },
+        ),
+    ]
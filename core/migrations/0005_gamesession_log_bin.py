@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_gamesessionrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='log_bin',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrentlyIfPostgres
+
+BACKFILL_BATCH = 10000
+
+
+def mark_finished(apps, schema_editor):
+    """Finished games get status 'finished' in primary-key windows, one short UPDATE each."""
+    GameSession = apps.get_model('core', 'GameSession')
+    bounds = GameSession.objects.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BACKFILL_BATCH):
+        GameSession.objects.filter(
+            id__gte=start, id__lt=start + BACKFILL_BATCH, ended_at__isnull=False,
+        ).update(status='finished')
+
+
+class Migration(migrations.Migration):
+    # Backfill batches commit one by one; the index is built CONCURRENTLY
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_gamesession_log_bin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('finished', 'Finished'), ('abandoned', 'Abandoned')], default='active', max_length=10),
+        ),
+        migrations.RunPython(mark_finished, migrations.RunPython.noop),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='gamesession',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['id'], name='session_active_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_gamesession_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fruitcard',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='textcard',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_card_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameconfig',
+            name='card_atlas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
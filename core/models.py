@@ -1,5 +1,5 @@
 # core/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
@@ -10,6 +10,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+from . import images
+
 
 # =====================================================
 # NEW: DifficultySettings - Manage game difficulty from admin
@@ -192,6 +194,8 @@ class GameConfig(models.Model):
         help_text=_("Score required to earn a promo code"),
         validators=[MinValueValidator(1)]
     )
+    # Sprite sheets of the active card images, see core.atlas
+    card_atlas = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = _("Game Configuration")
@@ -199,9 +203,14 @@ class GameConfig(models.Model):
 
     def save(self, *args, **kwargs):
         self.pk = 1
-        if self.pk and GameConfig.objects.filter(pk=1).exists():
-            self.config_version = GameConfig.objects.get(pk=1).config_version + 1
-        super().save(*args, **kwargs)
+        with transaction.atomic(savepoint=False):
+            # Row locked like core.atlas does before storing a build, so
+            # neither the version bump nor the copied atlas can be stale
+            current = GameConfig.objects.select_for_update().filter(pk=1).first()
+            if current is not None:
+                self.config_version = current.config_version + 1
+                self.card_atlas = current.card_atlas   # written by core.atlas only
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Config v{self.config_version}"
@@ -218,6 +227,8 @@ class GameConfig(models.Model):
 class FruitCard(models.Model):
     title = models.CharField(max_length=100)
     image = models.ImageField(upload_to='fruits/', blank=True, null=True)
+    # Resized WebP/AVIF copies of `image`, see core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     code = models.CharField(max_length=50, unique=True)
     is_active = models.BooleanField(default=True)
     weight = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
@@ -230,6 +241,12 @@ class FruitCard(models.Model):
             models.Index(fields=['order']),
         ]
 
+    def save(self, *args, **kwargs):
+        replaced = images.refresh_variants(self)
+        super().save(*args, **kwargs)
+        if replaced is not None:
+            images.schedule_variants(self, replaced)
+
     def __str__(self):
         return self.title
 
@@ -240,6 +257,8 @@ class FruitCard(models.Model):
 class TextCard(models.Model):
     title = models.CharField(max_length=100)
     image = models.ImageField(upload_to='texts/', blank=True, null=True)
+    # Resized WebP/AVIF copies of `image`, see core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     correct_fruit = models.ForeignKey(
         FruitCard,
         on_delete=models.CASCADE,
@@ -260,6 +279,12 @@ class TextCard(models.Model):
             models.Index(fields=['order']),
         ]
 
+    def save(self, *args, **kwargs):
+        replaced = images.refresh_variants(self)
+        super().save(*args, **kwargs)
+        if replaced is not None:
+            images.schedule_variants(self, replaced)
+
     def __str__(self):
         return self.title
 
@@ -341,6 +366,10 @@ class GameSession(models.Model):
         ('clean', _('Clean')), ('ok', _('OK')),
         ('suspicious', _('Suspicious')), ('flagged', _('Flagged')), ('rejected', _('Rejected')),
     ]
+    STATUS_ACTIVE, STATUS_FINISHED, STATUS_ABANDONED = 'active', 'finished', 'abandoned'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, _('Active')), (STATUS_FINISHED, _('Finished')), (STATUS_ABANDONED, _('Abandoned')),
+    ]
 
     session_id = models.CharField(max_length=100, unique=True, editable=False)
     player = models.ForeignKey(
@@ -359,13 +388,31 @@ class GameSession(models.Model):
     anti_cheat_status = models.CharField(
         max_length=50, choices=ANTI_CHEAT_STATUS_CHOICES, default='clean'
     )
+    # abandoned: never finished within its time limit (manage.py reap_sessions)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     log_json = models.JSONField(default=dict, blank=True)
+    # Move log in the core.gamelog binary format; log_json is only kept for old rows
+    log_bin = models.BinaryField(null=True, blank=True)
 
     class Meta:
         ordering = ['-started_at']
         indexes = [
             models.Index(fields=['-score_balls']),
             models.Index(fields=['-started_at']),
+            # Leaderboard: difficulty = X AND ended_at IS NOT NULL ORDER BY -score_balls, duration
+            models.Index(
+                fields=['difficulty', '-score_balls', 'duration'], name='session_leaderboard_idx',
+                condition=models.Q(ended_at__isnull=False),
+            ),
+            # Profile history: player = X ORDER BY -started_at, answered from the index alone
+            models.Index(
+                fields=['player', '-started_at'], name='session_player_recent_idx',
+                include=['score_balls', 'difficulty', 'duration'],
+            ),
+            # Reaper: status = 'active' scanned in primary-key order; only live games stay in it
+            models.Index(
+                fields=['id'], name='session_active_idx', condition=models.Q(status='active'),
+            ),
         ]
 
     def save(self, *args, **kwargs):
@@ -377,6 +424,30 @@ class GameSession(models.Model):
         return f"Session {str(self.session_id)[:8]}... — {self.score_balls} pts"
 
 
+class GameSessionRollup(models.Model):
+    """
+    Per month / difficulty totals of archived (detached) session partitions,
+    so all-time aggregates survive archival. Written by partition_sessions.
+    """
+    month = models.DateField()
+    difficulty = models.IntegerField()
+    games = models.PositiveBigIntegerField(default=0)
+    finished_games = models.PositiveBigIntegerField(default=0)
+    score_total = models.BigIntegerField(default=0)         # finished games only
+    duration_total = models.BigIntegerField(default=0)      # finished games only
+    best_score = models.IntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month', 'difficulty']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'difficulty'], name='session_rollup_month_difficulty'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} / {self.difficulty}: {self.games} games"
+
+
 # =====================================================
 # Tournament
 # =====================================================
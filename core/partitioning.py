@@ -0,0 +1,317 @@
+# core/partitioning.py - Monthly started_at partitions for core_gamesession (PostgreSQL)
+#
+# Layout after convert():
+#   core_gamesession             partitioned parent (RANGE started_at)
+#   core_gamesession_plegacy     the original table, attached FROM (MINVALUE) TO (<next month>)
+#   core_gamesession_pYYYYMM     one partition per UTC month
+#   core_gamesession_pdefault    catches rows outside every range
+#
+# A partitioned table cannot have a primary key / unique constraint without
+# the partition key, so id and session_id stay unique per partition (ids come
+# from one sequence, session ids are uuid4). Non-unique indexes live on the
+# parent and are created on every partition automatically.
+
+import gzip
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import GameSession, GameSessionRollup
+
+TABLE = GameSession._meta.db_table
+LEGACY = f"{TABLE}_plegacy"
+DEFAULT = f"{TABLE}_pdefault"
+SEQUENCE = f"{TABLE}_id_seq"
+
+_UPPER_RE = re.compile(r"TO \('([^']+)'\)")
+_ON_LEGACY_RE = re.compile(rf"\bON (ONLY )?(\S+\.)?{LEGACY} ")
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bound(month):
+    """Partition bound literal for the first instant of a UTC month."""
+    return f"'{datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()}'"
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def check_supported():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Session partitioning needs PostgreSQL')
+
+
+def is_partitioned():
+    check_supported()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE]
+        )
+        return cursor.fetchone()[0]
+
+
+def _parse_upper(bound):
+    match = _UPPER_RE.search(bound)
+    if not match:
+        return None
+    value = match.group(1)
+    if re.search(r'[+-]\d\d$', value):
+        value += ':00'
+    return datetime.fromisoformat(value)
+
+
+def list_partitions():
+    """Attached partitions, oldest first: name, upper bound, estimated rows, bytes."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                   pg_total_relation_size(c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+        """, [TABLE])
+        rows = cursor.fetchall()
+
+    partitions = [
+        {
+            'name': name,
+            'default': bound == 'DEFAULT',
+            'upper': _parse_upper(bound),
+            'rows': max(estimate, 0),
+            'bytes': size,
+        }
+        for name, bound, estimate, size in rows
+    ]
+    far_future = datetime.max.replace(tzinfo=dt_timezone.utc)
+    partitions.sort(key=lambda p: p['upper'] or far_future)
+    return partitions
+
+
+def detached_tables():
+    """Partitions detached by an earlier archive run that were never exported."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT relname FROM pg_class
+            WHERE relkind = 'r' AND NOT relispartition AND relname LIKE %s
+              AND relnamespace = current_schema()::regnamespace
+            ORDER BY relname
+        """, [f"{TABLE}\\_p%"])
+        return [row[0] for row in cursor.fetchall()]
+
+
+# ====================== CREATE ======================
+def _create_partition(cursor, name, bounds):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(f"CREATE TABLE {qn(name)} PARTITION OF {qn(TABLE)} {bounds}")
+    cursor.execute(f"ALTER TABLE {qn(name)} ADD PRIMARY KEY (id)")
+    cursor.execute(f"ALTER TABLE {qn(name)} ADD CONSTRAINT {qn(name + '_session_id_key')} UNIQUE (session_id)")
+    return True
+
+
+def ensure_partitions(months_ahead=None):
+    """Create this month's and the next N months' partitions plus the default one."""
+    if months_ahead is None:
+        months_ahead = settings.SESSION_PARTITION_MONTHS_AHEAD
+    if not is_partitioned():
+        raise PartitioningError(f"{TABLE} is not partitioned yet - run partition_sessions --convert")
+
+    covered_until = next((p['upper'] for p in list_partitions() if p['name'] == LEGACY), None)
+    created = []
+    this_month = month_start(timezone.now().astimezone(dt_timezone.utc))
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(this_month, offset)
+            upper = add_months(month, 1)
+            if covered_until and datetime(upper.year, upper.month, 1, tzinfo=dt_timezone.utc) <= covered_until:
+                continue   # still inside the legacy partition's range
+            bounds = f"FOR VALUES FROM ({month_bound(month)}) TO ({month_bound(upper)})"
+            if _create_partition(cursor, partition_name(month), bounds):
+                created.append(partition_name(month))
+        if _create_partition(cursor, DEFAULT, 'DEFAULT'):
+            created.append(DEFAULT)
+    return created
+
+
+# ====================== CONVERT ======================
+def convert(months_ahead=None):
+    """
+    Turn the plain sessions table into a partitioned one without rewriting it:
+    the existing table is attached as the legacy partition (everything up to
+    the end of this month), new months get their own partitions.
+    """
+    if is_partitioned():
+        raise PartitioningError(f"{TABLE} is already partitioned")
+
+    upper = add_months(month_start(timezone.now().astimezone(dt_timezone.utc)), 1)
+    check = f"{LEGACY}_bound"
+
+    # Validated CHECK matching the bound lets ATTACH skip its full-table scan;
+    # VALIDATE only takes a SHARE UPDATE EXCLUSIVE lock, so writes continue.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(check)} "
+            f"CHECK (started_at IS NOT NULL AND started_at < {month_bound(upper)}) NOT VALID"
+        )
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} VALIDATE CONSTRAINT {qn(check)}")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT COALESCE(max(id), 0) FROM {qn(TABLE)}")
+        max_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(LEGACY)}")
+        cursor.execute(f"ALTER TABLE {qn(LEGACY)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"ALTER TABLE {qn(LEGACY)} ALTER COLUMN id DROP DEFAULT")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(LEGACY)} INCLUDING DEFAULTS INCLUDING STORAGE) "
+            f"PARTITION BY RANGE (started_at)"
+        )
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {qn(SEQUENCE)} AS bigint")
+        cursor.execute("SELECT setval(%s, %s, false)", [SEQUENCE, max_id + 1])
+        cursor.execute(f"ALTER SEQUENCE {qn(SEQUENCE)} OWNED BY {qn(TABLE)}.id")
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(LEGACY)} "
+            f"FOR VALUES FROM (MINVALUE) TO ({month_bound(upper)})"
+        )
+
+        # Foreign keys: same name/definition on the parent adopts the legacy ones
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [LEGACY]
+        )
+        for name, definition in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}")
+
+        # Non-unique indexes move to the parent under their Django names; the
+        # matching legacy index is attached instead of being rebuilt
+        cursor.execute(
+            "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = to_regclass(%s) AND NOT i.indisunique", [LEGACY]
+        )
+        for name, definition in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(name[:54] + '_legacy')}")
+            cursor.execute(_ON_LEGACY_RE.sub(lambda m: f"ON {m.group(1) or ''}{qn(TABLE)} ", definition))
+
+    return ensure_partitions(months_ahead)
+
+
+# ====================== ARCHIVE ======================
+def _rollup(cursor, table):
+    """Fold a partition's rows into GameSessionRollup (per UTC month / difficulty)."""
+    cursor.execute(f"""
+        SELECT date_trunc('month', started_at AT TIME ZONE 'UTC')::date, difficulty,
+               count(*), count(ended_at),
+               COALESCE(sum(score_balls) FILTER (WHERE ended_at IS NOT NULL), 0),
+               COALESCE(sum(duration) FILTER (WHERE ended_at IS NOT NULL), 0),
+               COALESCE(max(score_balls) FILTER (WHERE ended_at IS NOT NULL), 0)
+        FROM {qn(table)} GROUP BY 1, 2
+    """)
+    rows = cursor.fetchall()
+    for month, difficulty, games, finished, score, duration, best in rows:
+        GameSessionRollup.objects.get_or_create(month=month, difficulty=difficulty)
+        GameSessionRollup.objects.filter(month=month, difficulty=difficulty).update(
+            games=F('games') + games,
+            finished_games=F('finished_games') + finished,
+            score_total=F('score_total') + score,
+            duration_total=F('duration_total') + duration,
+            best_score=Greatest('best_score', best),
+            archived_at=timezone.now(),
+        )
+    return sum(row[2] for row in rows)
+
+
+def export_table(table, directory):
+    """COPY a table to <directory>/<table>.csv.gz; returns the file path."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{table}.csv.gz"
+    if path.exists():
+        path = directory / f"{table}-{timezone.now():%Y%m%d%H%M%S}.csv.gz"
+
+    sql = f"COPY {qn(table)} TO STDOUT WITH (FORMAT csv, HEADER)"
+    connection.ensure_connection()
+    raw = connection.connection.cursor()
+    try:
+        with gzip.open(path, 'wb') as fh:
+            if hasattr(raw, 'copy'):          # psycopg 3
+                with raw.copy(sql) as copy:
+                    for chunk in copy:
+                        fh.write(chunk)
+            else:                             # psycopg2
+                raw.copy_expert(sql, fh)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    finally:
+        raw.close()
+    return path
+
+
+def archive(before=None, directory=None, keep_tables=False):
+    """
+    Roll up, detach and export every monthly partition that ends on or before
+    `before` (default: SESSION_ARCHIVE_AFTER_MONTHS ago). Rollup and detach
+    happen in one transaction, so a table left detached by a failed export
+    is exported on the next run without being counted twice.
+    """
+    directory = directory or settings.SESSION_ARCHIVE_DIR
+    if before is None:
+        this_month = month_start(timezone.now().astimezone(dt_timezone.utc))
+        before = add_months(this_month, -settings.SESSION_ARCHIVE_AFTER_MONTHS)
+    cutoff = datetime(before.year, before.month, 1, tzinfo=dt_timezone.utc)
+
+    if not is_partitioned():
+        raise PartitioningError(f"{TABLE} is not partitioned yet - run partition_sessions --convert")
+
+    results = []
+    pending = detached_tables()
+    for partition in list_partitions():
+        if partition['default'] or partition['upper'] is None or partition['upper'] > cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            rows = _rollup(cursor, partition['name'])
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(partition['name'])}")
+        results.append({'table': partition['name'], 'rows': rows})
+        pending.append(partition['name'])
+
+    exported = []
+    for table in pending:
+        path = export_table(table, directory)
+        with connection.cursor() as cursor:
+            if keep_tables:
+                # Out of the core_gamesession_p* namespace so it is not exported again
+                kept = table.replace(f"{TABLE}_p", f"{TABLE}_archived_", 1)
+                cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(kept)}")
+            else:
+                cursor.execute(f"DROP TABLE {qn(table)}")
+        exported.append({'table': table, 'file': str(path), 'dropped': not keep_tables})
+
+    return {'archived': results, 'exported': exported}
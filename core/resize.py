@@ -0,0 +1,223 @@
+# core/resize.py - Images resized on request, kept in a disk LRU cache
+#
+#   GET /media/r/<w>x<h>/<path>    <path> under MEDIA_ROOT, fit inside w x h
+#   GET /media/r/<w>x<h>/<path>?v=<version>    the same, cacheable for a year
+#
+# <version> is a hash of the source's mtime and size (url() adds it). Only
+# a URL naming the current version is immutable; any other gets a short
+# max-age and an ETag / Last-Modified from the source, so a replaced file
+# is picked up on revalidation.
+#
+# Used for sizes nobody encoded in advance (admin previews, avatars,
+# one-off layouts); card images have their variants already (core.images).
+# The endpoint is public, so w x h must be one of IMAGE_RESIZE_SIZES:
+# otherwise every client could make the server render and store any of a
+# million sizes of every file.
+# The output is AVIF or WebP when the Accept header allows, else PNG/JPEG.
+#
+# Renders run on a small thread pool (IMAGE_RESIZE_WORKERS), so a burst of
+# new sizes cannot take every CPU. Requests for the same missing variant in
+# this process share one render (core.cache.single_flight). Results are
+# written under IMAGE_RESIZE_CACHE_DIR, named after the source path, mtime,
+# size and output, so a replaced source never serves an old render. When
+# the directory grows past IMAGE_RESIZE_CACHE_MAX_BYTES, the least recently
+# used files (mtime, refreshed on hits) are removed.
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import single_flight
+from .images import FORMATS, available_formats
+
+# Source formats served as themselves when the client takes neither AVIF nor WebP
+FALLBACK = {
+    'png': {'format': 'PNG', 'mime': 'image/png', 'options': {'optimize': True}},
+    'jpeg': {'format': 'JPEG', 'mime': 'image/jpeg', 'options': {'quality': 85, 'optimize': True}},
+}
+TOUCH_INTERVAL = 60        # seconds; hits refresh a file's mtime at most this often
+EVICT_TO = 0.9             # eviction stops at this share of the size limit
+
+_executor = None
+_executor_lock = threading.Lock()
+_usage = {}                # cache dir -> bytes, counted once, then kept up to date
+_usage_lock = threading.Lock()
+
+
+class ResizeError(ValueError):
+    pass
+
+
+def _qualities(accept):
+    """{media range: q} of an Accept header; the first mention of a range wins."""
+    qualities = {}
+    for part in accept.split(','):
+        media, *params = (p.strip() for p in part.split(';'))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities.setdefault(media.lower(), q)
+    return qualities
+
+
+def negotiate(accept):
+    """
+    Variant format with the highest q in an Accept header (FORMATS order
+    on ties), or None for the fallback. Only types named outright count:
+    browsers send */* whether or not they decode AVIF.
+    """
+    qualities = _qualities(accept)
+    best, best_q = None, 0.0
+    for ext in available_formats():
+        q = qualities.get(FORMATS[ext]['mime'], 0.0)
+        if q > best_q:
+            best, best_q = ext, q
+    return best
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.IMAGE_RESIZE_WORKERS, thread_name_prefix='resize')
+        return _executor
+
+
+def _spec(ext):
+    return FORMATS.get(ext) or FALLBACK[ext]
+
+
+def _render(source, dest, width, height, ext):
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, height), Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ResizeError(f"Unreadable image: {e}")
+
+    if ext is None:
+        ext = 'png' if image.mode in ('RGBA', 'LA', 'P') else 'jpeg'
+    image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') and ext != 'jpeg' else 'RGB')
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{ext}.{threading.get_ident()}.tmp"
+    spec = _spec(ext)
+    image.save(tmp, spec['format'], **spec['options'])
+    final = f"{dest}.{ext}"
+    os.replace(tmp, final)   # readers never see a half-written file
+    _account(os.path.getsize(final))
+    return final
+
+
+def _cached(dest):
+    """Existing render for dest (any extension), touched for LRU; None on a miss."""
+    for ext in (*FORMATS, *FALLBACK):
+        filename = f"{dest}.{ext}"
+        try:
+            mtime = os.stat(filename).st_mtime
+        except FileNotFoundError:
+            continue
+        if time.time() - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(filename)
+            except FileNotFoundError:
+                continue   # evicted just now
+        return filename
+    return None
+
+
+def source_version(path):
+    """(version, mtime) of the source at `path`; raises FileNotFoundError or SuspiciousFileOperation."""
+    stat = os.stat(default_storage.path(path))
+    return hashlib.sha256(f"{stat.st_mtime_ns}\0{stat.st_size}".encode()).hexdigest()[:12], stat.st_mtime
+
+
+def url(path, width, height):
+    """Versioned URL of `path` resized to width x height."""
+    version, _ = source_version(path)
+    return f"{settings.MEDIA_URL}r/{width}x{height}/{quote(path)}?v={version}"
+
+
+def resized(path, width, height, ext):
+    """
+    Filename of `path` (relative to MEDIA_ROOT) fit inside width x height
+    and encoded as `ext` (None: PNG or JPEG like the source), rendering it
+    on a miss. Raises FileNotFoundError, SuspiciousFileOperation or ResizeError.
+    """
+    if (width, height) not in settings.IMAGE_RESIZE_SIZES:
+        raise ResizeError(f"{width}x{height} is not one of IMAGE_RESIZE_SIZES")
+
+    source = default_storage.path(path)   # refuses paths outside MEDIA_ROOT
+    stat = os.stat(source)
+    key = hashlib.sha256(
+        f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\0{width}x{height}\0{ext}".encode()
+    ).hexdigest()
+    dest = os.path.join(settings.IMAGE_RESIZE_CACHE_DIR, key[:2], key)
+
+    filename = _cached(dest)
+    if filename is None:
+        filename, _ = single_flight(
+            f"resize:{key}", lambda: _pool().submit(_render, source, dest, width, height, ext).result()
+        )
+    return filename, _spec(os.path.splitext(filename)[1][1:])['mime']
+
+
+# ---------------- size limit ----------------
+def _scan(directory):
+    entries = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.tmp'):
+                continue   # still being written
+            filename = os.path.join(root, name)
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+    return entries
+
+
+def _account(size):
+    directory = settings.IMAGE_RESIZE_CACHE_DIR
+    with _usage_lock:
+        if directory not in _usage:
+            _usage[directory] = sum(size for _, size, _ in _scan(directory))
+        else:
+            _usage[directory] += size
+        over = _usage[directory] > settings.IMAGE_RESIZE_CACHE_MAX_BYTES
+    if over:
+        evict()
+
+
+def evict():
+    """Delete least recently used renders until the cache is under EVICT_TO of its limit."""
+    directory = settings.IMAGE_RESIZE_CACHE_DIR
+    with _usage_lock:
+        entries = sorted(_scan(directory))
+        total = sum(size for _, size, _ in entries)
+        target = settings.IMAGE_RESIZE_CACHE_MAX_BYTES * EVICT_TO
+        removed = 0
+        for _, size, filename in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        _usage[directory] = total
+    return removed
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import (
     GameConfig,
@@ -9,6 +10,8 @@ from .models import (
 )
 import re
 
+from . import gamelog, images
+
 
 # =========================
 # HELPERS
@@ -22,11 +25,19 @@ def validate_uz_phone(value):
     return value
 
 
+def encode_move_log(events):
+    try:
+        return gamelog.encode(events)
+    except gamelog.GameLogError as exc:
+        raise serializers.ValidationError(str(exc))
+
+
 # =========================
 # CARDS
 # =========================
 class FruitCardSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = FruitCard
@@ -34,6 +45,7 @@ class FruitCardSerializer(serializers.ModelSerializer):
             'id',
             'code',           # assuming your model has a code or name field
             'image',
+            'image_variants',
             'is_active',
             'order',          # adjust these fields based on your actual FruitCard model
             # Add any other fields like 'name', 'weight', etc. if they exist
@@ -48,6 +60,10 @@ class FruitCardSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_variants(self, obj):
+        request = self.context.get('request')
+        return images.variant_payload(obj.image_variants, request.build_absolute_uri if request else None)
+
 
 class TextCardSerializer(serializers.ModelSerializer):
     correct_fruit_code = serializers.CharField(
@@ -55,6 +71,7 @@ class TextCardSerializer(serializers.ModelSerializer):
         read_only=True
     )
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = TextCard
@@ -63,6 +80,7 @@ class TextCardSerializer(serializers.ModelSerializer):
             'code',
             'title',
             'image',
+            'image_variants',
             'weight',
             'order',
             'correct_fruit_code',
@@ -78,6 +96,10 @@ class TextCardSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_variants(self, obj):
+        request = self.context.get('request')
+        return images.variant_payload(obj.image_variants, request.build_absolute_uri if request else None)
+
 
 # =========================
 # GAME CONFIG
@@ -85,7 +107,7 @@ class TextCardSerializer(serializers.ModelSerializer):
 class GameConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = GameConfig
-        fields = '__all__'  # Safe here: no manually declared fields
+        exclude = ['card_atlas']  # storage paths; clients get URLs from /api/game/config/
 
 
 # =========================
@@ -134,7 +156,39 @@ class GameSessionFinishSerializer(serializers.Serializer):
     correct_count = serializers.IntegerField(min_value=0, required=False, default=0)
     wrong_count = serializers.IntegerField(min_value=0, required=False, default=0)
     best_combo = serializers.IntegerField(min_value=0, required=False, default=0)
-    log_json = serializers.JSONField(required=False)
+    # Sent as JSON, validated into core.gamelog bytes: validated_data['log_bin']
+    log_json = serializers.JSONField(required=False, source='log_bin')
+    # Sequence number the log_json events take in the chunks uploaded during play
+    log_seq = serializers.IntegerField(min_value=1, required=False)
+    # log_json is the whole game, not only the moves after the uploaded chunks
+    log_complete = serializers.BooleanField(required=False, default=False)
+
+    def validate_log_json(self, value):
+        """Move log -> core.gamelog bytes (None when the client sent nothing)."""
+        events = value.get('events', []) if isinstance(value, dict) else value
+        if not events:
+            return None
+        return encode_move_log(events)
+
+
+class SessionFinishBatchSerializer(serializers.Serializer):
+    # Items are GameSessionFinishSerializer payloads, validated one by one in the view
+    sessions = serializers.ListField(
+        child=serializers.JSONField(), min_length=1, max_length=settings.SESSION_FINISH_BATCH_MAX,
+    )
+
+
+class SessionEventsSerializer(serializers.Serializer):
+    seq = serializers.IntegerField(min_value=1, max_value=gamelog.MAX_EVENTS)
+    # Sent as JSON, validated into core.gamelog bytes: validated_data['chunk']
+    events = serializers.JSONField(source='chunk')
+
+    def validate_events(self, value):
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError('Expected a non-empty list of events')
+        if len(value) > settings.SESSION_EVENTS_MAX_CHUNK:
+            raise serializers.ValidationError(f"At most {settings.SESSION_EVENTS_MAX_CHUNK} events per chunk")
+        return encode_move_log(value)
 
 
 class LeaderboardEntrySerializer(serializers.ModelSerializer):
@@ -0,0 +1,109 @@
+# core/services.py - Finishing game sessions (single and batched)
+#
+# Shared by /api/session/finish/ and /api/session/finish/batch/. A batch
+# costs the same handful of queries whatever its size: one locked SELECT
+# for ownership and status, one bulk UPDATE, one promo allocation pass.
+
+from django.db import transaction
+from django.utils import timezone
+
+from rewards.models import PromoCode
+
+from . import gamelog, session_events
+from .cache import profile_cache
+from .models import GameConfig, GameSession
+
+FINISHED = 'finished'
+ALREADY_FINISHED = 'already_finished'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+FINISH_FIELDS = [
+    'score_balls', 'duration', 'correct_count', 'wrong_count', 'best_combo', 'ended_at', 'log_bin', 'status',
+]
+
+
+def finish_sessions(player_id, items):
+    """
+    Finish the player's sessions described by validated finish payloads.
+
+    Returns {session_id: {'status': ..., 'new_promo_code': ...}}. Sessions
+    finished earlier report ALREADY_FINISHED with the code they earned,
+    so a client re-sending its queue gets the same answer again.
+    """
+    items = {str(item['session_id']): item for item in items}   # last copy of a duplicate wins
+    results = {sid: {'status': NOT_FOUND, 'new_promo_code': None} for sid in items}
+    if not items:
+        return results
+
+    with transaction.atomic():
+        # Locked in pk order: two overlapping batches cannot deadlock
+        sessions = list(
+            GameSession.objects.select_for_update()
+            .filter(session_id__in=list(items), player_id=player_id).order_by('pk')
+        )
+        now = timezone.now()
+        finished, done_before = [], []
+        for session in sessions:
+            item = items[session.session_id]
+            if session.ended_at:
+                done_before.append(session)
+                continue
+            try:
+                session.log_bin = session_events.finalize(
+                    session, item.get('log_bin'), item.get('log_seq'), item.get('log_complete', False),
+                )
+            except gamelog.GameLogError as e:
+                results[session.session_id] = {'status': INVALID, 'error': str(e), 'new_promo_code': None}
+                continue
+            session.score_balls = item['score_balls']
+            session.duration = item['duration']
+            session.correct_count = item.get('correct_count', 0)
+            session.wrong_count = item.get('wrong_count', 0)
+            session.best_combo = item.get('best_combo', 0)
+            session.ended_at = now
+            session.status = GameSession.STATUS_FINISHED   # also when the reaper got there first
+            finished.append(session)
+            results[session.session_id]['status'] = FINISHED
+
+        if finished:
+            GameSession.objects.bulk_update(finished, FINISH_FIELDS)
+            threshold = GameConfig.load().promo_score_threshold
+            winners = [s for s in finished if s.score_balls >= threshold]
+            for session, code in allocate_promo_codes(player_id, winners, now):
+                results[session.session_id]['new_promo_code'] = code
+
+        if done_before:
+            earned = dict(
+                PromoCode.objects.filter(session__in=done_before).values_list('session', 'code')
+            )
+            for session in done_before:
+                results[session.session_id] = {
+                    'status': ALREADY_FINISHED, 'new_promo_code': earned.get(session.pk),
+                }
+
+    if finished:
+        profile_cache.delete(player_id)
+    return results
+
+
+def allocate_promo_codes(player_id, sessions, now):
+    """
+    Claim one unused code per session in one locked SELECT and one bulk
+    UPDATE; SKIP LOCKED lets concurrent finishes take different codes.
+    Returns (session, code) pairs while codes last. Call inside a transaction.
+    """
+    if not sessions:
+        return []
+    promos = list(
+        PromoCode.objects.select_for_update(skip_locked=True)
+        .filter(is_used=False).order_by('pk')[:len(sessions)]
+    )
+    for promo, session in zip(promos, sessions):
+        promo.is_used = True
+        promo.player_id = player_id
+        promo.session = session
+        promo.claimed_at = now
+    if promos:
+        PromoCode.objects.bulk_update(promos, ['is_used', 'player', 'session', 'claimed_at'])
+    return [(promo.session, promo.code) for promo in promos]
@@ -0,0 +1,78 @@
+# core/session_cleanup.py - Expired django_session sweeping and table stats
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.utils import timezone
+
+
+def uses_session_table():
+    """True when the configured SESSION_ENGINE stores rows in django_session."""
+    return settings.SESSION_ENGINE in (
+        'django.contrib.sessions.backends.db',
+        'django.contrib.sessions.backends.cached_db',
+    )
+
+
+def sweep_expired_sessions(batch_size=None, pause=None, max_batches=None):
+    """
+    Delete expired sessions in small primary-key batches.
+
+    Every batch is its own short autocommit DELETE, so the table is never
+    locked for long and live logins keep working while the sweep runs.
+    Returns the number of deleted rows.
+    """
+    batch_size = batch_size or settings.SESSION_SWEEP_BATCH_SIZE
+    pause = settings.SESSION_SWEEP_PAUSE if pause is None else pause
+    now = timezone.now()
+
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+
+        count, _ = Session.objects.filter(session_key__in=keys).delete()
+        deleted += count
+        batches += 1
+
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return deleted
+
+
+def session_table_stats():
+    """Row counts and (on PostgreSQL) on-disk size of django_session."""
+    stats = {
+        'engine': settings.SESSION_ENGINE.rsplit('.', 1)[-1],
+        'uses_table': uses_session_table(),
+        'total_rows': None,
+        'expired_rows': None,
+        'table_bytes': None,
+    }
+    if not stats['uses_table']:
+        return stats
+
+    if connection.vendor == 'postgresql':
+        # Planner estimate instead of COUNT(*) - cheap on a huge table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT GREATEST(reltuples, 0)::bigint, pg_total_relation_size(oid) "
+                "FROM pg_class WHERE oid = %s::regclass",
+                [Session._meta.db_table],
+            )
+            stats['total_rows'], stats['table_bytes'] = cursor.fetchone()
+    else:
+        stats['total_rows'] = Session.objects.count()
+
+    stats['expired_rows'] = Session.objects.filter(expire_date__lt=timezone.now()).count()
+    return stats
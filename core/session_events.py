@@ -0,0 +1,187 @@
+# core/session_events.py - Move-log chunks buffered while a game is running
+#
+# POST /api/session/<id>/events/ stores each chunk (already in the
+# core.gamelog binary format) under its own cache key, named by the
+# client's sequence number:
+#
+#   ev:<session_id>:<seq>      chunk bytes, written once (cache.add)
+#   ev:<session_id>:count      events stored so far (cache.incr)
+#   ev:<session_id>:flushed    count as of the last flush_session_events run
+#   ev:<session_id>:closed     set by finish; later uploads are refused
+#
+# A retried seq keeps the copy that landed first and the client moves on by
+# the event count it is told, so retries never duplicate moves. Clients
+# send chunks in order, so the buffered seqs are found by probing
+# 1, 2, 3... a window at a time. Nothing touches the database until
+# `manage.py flush_session_events` writes snapshots for many games in one
+# bulk UPDATE, or session/finish builds the final log.
+#
+# The buffer is a snapshot for games that never finish: current clients
+# send the whole log with finish (log_complete), which then does not
+# depend on every chunk having reached this cache. Memory is bounded by
+# SESSION_EVENTS_MAX_CHUNK, gamelog.MAX_EVENTS per game, the cache TTL and
+# the cache's MAX_ENTRIES.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from . import gamelog
+from .models import GameSession
+
+PROBE_WINDOW = 16   # seqs looked up per cache round trip
+
+
+class EventBufferError(Exception):
+    pass
+
+
+class SessionClosed(EventBufferError):
+    pass
+
+
+def _cache():
+    return caches[settings.SESSION_EVENTS_CACHE_ALIAS]
+
+
+def _key(session_id, part):
+    return f"ev:{session_id}:{part}"
+
+
+def buffer_chunk(session_id, seq, data):
+    """
+    Store one encoded chunk. Returns (events stored under seq, events
+    buffered for the game); raises SessionClosed / EventBufferError.
+    """
+    cache = _cache()
+    if cache.get(_key(session_id, 'closed')):
+        raise SessionClosed('Session already finished')
+
+    ttl = settings.SESSION_EVENTS_TTL
+    chunk_key, count_key = _key(session_id, seq), _key(session_id, 'count')
+    if not cache.add(chunk_key, data, ttl):
+        # A retry of a chunk that landed: the first copy stands
+        stored = cache.get(chunk_key)
+        return gamelog.count(stored if stored is not None else data), cache.get(count_key, 0)
+
+    events = gamelog.count(data)
+    cache.add(count_key, 0, ttl)
+    try:
+        total = cache.incr(count_key, events)
+    except ValueError:   # count evicted since add()
+        cache.set(count_key, events, ttl)
+        total = events
+    if total > gamelog.MAX_EVENTS:
+        cache.delete(chunk_key)
+        cache.decr(count_key, events)
+        raise EventBufferError(f"At most {gamelog.MAX_EVENTS} events per game")
+    return events, total
+
+
+def _find_chunks(cache, session_ids):
+    """{session_id: [(seq, chunk bytes)] in seq order}, probing seqs a window at a time."""
+    found = {sid: [] for sid in session_ids}
+    pending, start = list(session_ids), 1
+    while pending:
+        keys = {
+            _key(sid, seq): (sid, seq) for sid in pending for seq in range(start, start + PROBE_WINDOW)
+        }
+        hits = cache.get_many(list(keys))
+        for key, (sid, seq) in keys.items():
+            if key in hits:
+                found[sid].append((seq, hits[key]))
+        # A window without any chunk ends the search for that session
+        pending = list(dict.fromkeys(keys[key][0] for key in hits))
+        start += PROBE_WINDOW
+    return found
+
+
+def finalize(session, log=None, seq=None, complete=False):
+    """
+    Final log for session/finish. With `complete` the client sent its whole
+    log, which is used as is. Otherwise `log` holds the moves not yet
+    acknowledged and is stored as chunk `seq` (replacing a chunk that landed
+    before its response was lost), merged with every buffered chunk.
+
+    Closes the buffer. Its keys are deleted once the finish commits, so a
+    rolled back finish can be retried with the chunks still there.
+    """
+    cache = _cache()
+    sid = session.session_id
+    cache.set(_key(sid, 'closed'), True, settings.SESSION_EVENTS_TTL)
+    chunks = _find_chunks(cache, [sid])[sid]
+    if chunks:
+        stale = [_key(sid, part) for part in ['count', 'flushed', *(seq for seq, _ in chunks)]]
+        transaction.on_commit(lambda: cache.delete_many(stale))
+
+    if complete and log is not None:
+        return log
+    if not chunks:
+        return log if log is not None else session.log_bin
+
+    replaced = (seq or chunks[-1][0] + 1) if log is not None else None
+    parts = [data for chunk_seq, data in chunks if chunk_seq != replaced]
+    if log is not None:
+        parts.append(log)
+    merged = gamelog.merge(parts)
+
+    # Evicted chunks: keep the last flushed snapshot if it holds more. The
+    # snapshot may already hold `log` (its chunk was flushed before the
+    # response was lost), so only the moves it lacks are added.
+    if session.log_bin and gamelog.count(session.log_bin) > gamelog.count(merged):
+        if log is None:
+            return session.log_bin
+        merged = gamelog.merge([session.log_bin, gamelog.difference(log, session.log_bin)])
+    return merged
+
+
+def flush_in_progress(batch_size=500):
+    """
+    Write the buffered log of every running game that got new chunks since
+    the last flush: one cache round trip per batch for the counts, one per
+    PROBE_WINDOW seqs for the chunks and one bulk UPDATE. Returns (checked, flushed).
+    """
+    cache = _cache()
+    since = timezone.now() - timedelta(seconds=settings.SESSION_EVENTS_TTL)
+    running = GameSession.objects.filter(ended_at__isnull=True, started_at__gte=since)
+
+    checked = flushed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            running.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'session_id')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        checked += len(batch)
+        last_batch = len(batch) < batch_size
+
+        state = cache.get_many(
+            [_key(sid, 'count') for _, sid in batch] + [_key(sid, 'flushed') for _, sid in batch]
+        )
+        dirty = [
+            (pk, sid, state[_key(sid, 'count')]) for pk, sid in batch
+            if _key(sid, 'count') in state and state[_key(sid, 'count')] != state.get(_key(sid, 'flushed'))
+        ]
+        if dirty:
+            flushed += _flush(cache, dirty)
+        if last_batch:
+            break
+
+    return checked, flushed
+
+
+def _flush(cache, dirty):
+    chunks = _find_chunks(cache, [sid for _, sid, _ in dirty])
+    updates = [
+        GameSession(pk=pk, log_bin=gamelog.merge(data for _, data in chunks[sid])) for pk, sid, _ in dirty
+    ]
+
+    # Filter again: a game finished meanwhile already has its final log
+    GameSession.objects.filter(ended_at__isnull=True).bulk_update(updates, ['log_bin'])
+    cache.set_many({_key(sid, 'flushed'): count for _, sid, count in dirty}, settings.SESSION_EVENTS_TTL)
+    return len(updates)
@@ -0,0 +1,66 @@
+# core/session_reaper.py - Mark games that were started but never finished
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DifficultySettings, GameConfig, GameSession
+
+
+def time_limits():
+    """difficulty -> seconds a game may run; the longest known limit for anything else."""
+    limits = dict(DifficultySettings.objects.order_by().values_list('difficulty_level', 'time_seconds'))
+    fallback = max([GameConfig.load().timer_seconds, *limits.values()])
+    return limits, fallback
+
+
+def expired_filter(now=None, grace=None):
+    """Q matching games whose time limit plus `grace` seconds has passed."""
+    now = now or timezone.now()
+    grace = settings.SESSION_REAP_GRACE if grace is None else grace
+    limits, fallback = time_limits()
+
+    q = Q(started_at__lt=now - timedelta(seconds=fallback + grace)) & ~Q(difficulty__in=list(limits))
+    for level, seconds in limits.items():
+        q |= Q(difficulty=level, started_at__lt=now - timedelta(seconds=seconds + grace))
+    return q
+
+
+def reap_abandoned_sessions(grace=None, batch_size=None, pause=None, max_batches=None):
+    """
+    Set status 'abandoned' on active games past their time limit.
+
+    Walks the active games in primary-key order (session_active_idx) and
+    updates at most batch_size rows per autocommit UPDATE, so row locks are
+    held briefly and finishes arriving meanwhile are not blocked for long.
+    A game finished between the SELECT and the UPDATE keeps its status.
+    Returns the number of reaped games.
+    """
+    batch_size = batch_size or settings.SESSION_REAP_BATCH_SIZE
+    pause = settings.SESSION_REAP_PAUSE if pause is None else pause
+    expired = GameSession.objects.filter(expired_filter(grace=grace), status=GameSession.STATUS_ACTIVE)
+
+    reaped = 0
+    batches = 0
+    last_pk = 0
+    while max_batches is None or batches < max_batches:
+        pks = list(
+            expired.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+
+        reaped += GameSession.objects.filter(pk__in=pks, status=GameSession.STATUS_ACTIVE) \
+            .update(status=GameSession.STATUS_ABANDONED)
+        batches += 1
+        last_pk = pks[-1]
+
+        if len(pks) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return reaped
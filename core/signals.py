@@ -0,0 +1,44 @@
+# core/signals.py - Cache invalidation and card atlas rebuild hooks
+#
+# QuerySet.update() and bulk_update() send no signals. Code changing
+# cached data that way invalidates explicitly (services.finish_sessions,
+# the card admin actions via cards_changed()). The remaining bulk writes
+# only touch columns no cached payload shows: the reaper's status and the
+# event flush's log_bin are not part of /api/profile/. Anything missed is
+# still bounded by the namespace TTLs in GAME_CACHE_TTLS.
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import atlas
+from .cache import config_cache, profile_cache
+from .models import DifficultySettings, FruitCard, GameConfig, GameSession, TextCard
+
+
+@receiver([post_save, post_delete], sender=GameConfig)
+@receiver([post_save, post_delete], sender=FruitCard)
+@receiver([post_save, post_delete], sender=TextCard)
+@receiver([post_save, post_delete], sender=DifficultySettings)
+def invalidate_game_config(sender, **kwargs):
+    config_cache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=FruitCard)
+@receiver([post_save, post_delete], sender=TextCard)
+def rebuild_card_atlas(sender, **kwargs):
+    # After commit, so the build sees the change, and off the request path;
+    # a no-op if no active image changed
+    transaction.on_commit(atlas.schedule_build, robust=True)
+
+
+def cards_changed():
+    """What the card signals do, for bulk .update()s of cards (which send none)."""
+    config_cache.invalidate()
+    rebuild_card_atlas(sender=None)
+
+
+@receiver([post_save, post_delete], sender=GameSession)
+def invalidate_player_profile(sender, instance, **kwargs):
+    if instance.player_id:
+        profile_cache.delete(instance.player_id)
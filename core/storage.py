@@ -0,0 +1,74 @@
+# core/storage.py - Static files: content-hashed names plus .gz / .br copies
+#
+# STORAGES['staticfiles'] backend. `collectstatic` (or `build_static`)
+# copies every file as-is and as name.<md5 prefix>.ext, rewrites url()
+# references in CSS to the hashed names and writes staticfiles.json. Then
+# each text asset gets a gzip copy, and a brotli copy when the `brotli`
+# package is installed, which core.fileserving serves to clients that
+# accept them. Copies that are not at least 5% smaller are not kept.
+
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:   # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.html', '.txt', '.xml', '.ico', '.wasm', '.wav'}
+MIN_SIZE = 256          # bytes; smaller files are not worth a second request path
+MIN_SAVING = 0.05
+
+
+def _compress_gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)   # mtime=0: same input, same bytes
+
+
+def _compress_brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+ENCODINGS = [('br', '.br', _compress_brotli)] if brotli else []
+ENCODINGS.append(('gzip', '.gz', _compress_gzip))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # A template naming a file that was never collected gets its plain URL
+    # instead of a 500 for the whole page
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        names = {name for name in [*paths, *self.hashed_files.values()] if self._compressible(name)}
+        with ThreadPoolExecutor() as pool:
+            for name, written in zip(names, pool.map(self.compress, names)):
+                for compressed in written:
+                    yield name, compressed, True
+
+    def _compressible(self, name):
+        return os.path.splitext(name)[1].lower() in COMPRESSIBLE
+
+    def compress(self, name):
+        """Write name.br / name.gz next to name; returns the names written."""
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        written = []
+        for _, suffix, compress in ENCODINGS:
+            target = path + suffix
+            if len(data) >= MIN_SIZE:
+                compressed = compress(data)
+                if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                    with open(target, 'wb') as f:
+                        f.write(compressed)
+                    written.append(name + suffix)
+                    continue
+            if os.path.exists(target):   # left from an older build of a different file
+                os.remove(target)
+        return written
@@ -0,0 +1,266 @@
+# core/synthetic.py - Seeded synthetic players / sessions / promo codes
+#
+# Row generators shared by `manage.py generate_dataset` (bulk loads through
+# PostgreSQL COPY, falling back to bulk_create) and the performance tests.
+
+import bisect
+import contextlib
+import copy
+import io
+import itertools
+import json
+import math
+import random
+from array import array
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import DifficultySettings, Player
+
+FIRST_NAMES = [
+    'Aziz', 'Bekzod', 'Dilnoza', 'Farrux', 'Gulnora', 'Jasur', 'Kamola', 'Laziz',
+    'Madina', 'Nodir', 'Otabek', 'Rustam', 'Sardor', 'Shahnoza', 'Timur', 'Umida',
+    'Zarina', 'Anna', 'Ivan', 'Olga', 'Sergey', 'Elena', 'Dmitry', 'Malika',
+]
+
+# difficulty -> share of games
+DIFFICULTY_MIX = {1: 0.30, 2: 0.25, 3: 0.15, 4: 0.30}
+
+# Fallback game parameters when DifficultySettings rows are missing (ranked = 4 never has one)
+DEFAULT_PROFILES = {
+    1: {'time_seconds': 180, 'points': 7, 'combo_bonus': 1.5, 'matches_per_min': 5.0},
+    2: {'time_seconds': 150, 'points': 9, 'combo_bonus': 1.5, 'matches_per_min': 4.0},
+    3: {'time_seconds': 120, 'points': 12, 'combo_bonus': 2.0, 'matches_per_min': 3.0},
+    4: {'time_seconds': 180, 'points': 9, 'combo_bonus': 1.5, 'matches_per_min': 4.0},
+}
+
+PLAYER_COLUMNS = (
+    'password', 'last_login', 'is_superuser', 'name', 'phone_number',
+    'theme', 'language', 'is_active', 'is_staff', 'created_at',
+)
+SESSION_COLUMNS = (
+    'session_id', 'player_id', 'user_identifier', 'difficulty', 'score_balls',
+    'started_at', 'ended_at', 'duration', 'correct_count', 'wrong_count',
+    'best_combo', 'anti_cheat_status', 'log_json', 'status',
+)
+PROMO_COLUMNS = ('code', 'is_used', 'player_id', 'claimed_at', 'created_at')
+
+_BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_UUID_MASK = ~(0xf000 << 64 | 0xc000 << 48) & (1 << 128) - 1
+_UUID_V4_BITS = 0x4000 << 64 | 0x8000 << 48
+
+
+def _base36(value, width):
+    digits = []
+    while value:
+        value, rem = divmod(value, 36)
+        digits.append(_BASE36[rem])
+    return ''.join(reversed(digits)).rjust(width, '0')
+
+
+def load_difficulty_profiles():
+    """DEFAULT_PROFILES overridden with the live DifficultySettings values."""
+    profiles = {level: dict(values) for level, values in DEFAULT_PROFILES.items()}
+    for setting in DifficultySettings.objects.all():
+        profile = profiles.setdefault(setting.difficulty_level, dict(DEFAULT_PROFILES[1]))
+        profile['time_seconds'] = setting.time_seconds
+        profile['points'] = setting.base_points + setting.level_multiplier
+        profile['combo_bonus'] = setting.combo_bonus_per_match
+    return profiles
+
+
+class SyntheticDataset:
+    """
+    Deterministic (per seed) row factory.
+
+    Play frequency follows a power law: a player's share of games is picked
+    as rank = n * u**skew, so a small core of players owns most sessions.
+    Scores are derived from a per-difficulty match rate, points per match
+    and combo bonus, so score/duration distributions differ by difficulty.
+
+    Rows are tuples in *_COLUMNS order with timestamps as ISO strings, so
+    they can go straight into COPY or through the ORM. chunk(name, i) gives an
+    independently seeded copy, which keeps output identical no matter how
+    many workers load the chunks.
+    """
+
+    def __init__(self, seed=42, days=180, skew=3.0, profiles=None, unfinished_rate=0.05, end_ts=None):
+        self.seed = seed
+        self.days = days
+        self.skew = skew
+        self.unfinished_rate = unfinished_rate
+        self.profiles = profiles or DEFAULT_PROFILES
+        self.end_ts = int(end_ts or timezone.now().timestamp())
+        self.start_ts = self.end_ts - days * 86400
+        self.rng = random.Random(seed)
+
+        self._levels = list(DIFFICULTY_MIX)
+        self._level_cum = list(itertools.accumulate(DIFFICULTY_MIX.values()))
+        self._days = {}
+
+    def chunk(self, *key):
+        dataset = copy.copy(self)
+        dataset.rng = random.Random(':'.join(map(str, (self.seed,) + key)))
+        dataset._days = {}
+        return dataset
+
+    def _iso(self, ts):
+        # Much cheaper than datetime.fromtimestamp().isoformat() per value
+        day, secs = divmod(ts, 86400)
+        prefix = self._days.get(day)
+        if prefix is None:
+            prefix = self._days[day] = f"{datetime.fromtimestamp(day * 86400, tz=dt_timezone.utc):%Y-%m-%d} "
+        return f"{prefix}{secs // 3600:02d}:{secs % 3600 // 60:02d}:{secs % 60:02d}+00:00"
+
+    # ---------------- players ----------------
+    def player_rows(self, start, count, phone_prefix='77'):
+        rng = self.rng
+        for i in range(start, start + count):
+            yield (
+                '!synthetic', None, False,
+                f"{rng.choice(FIRST_NAMES)} {i}", f"+998{phone_prefix}{i:07d}",
+                'dark' if rng.random() < 0.7 else 'light', rng.choice(('en', 'uz', 'uz', 'ru')),
+                True, False, self._iso(rng.randrange(self.start_ts, self.end_ts)),
+            )
+
+    # ---------------- sessions ----------------
+    def pick_player(self, player_ids):
+        n = len(player_ids)
+        rank = int(n * self.rng.random() ** self.skew)
+        # Scatter ranks over the id range so heavy players are not just the oldest ids
+        return player_ids[(rank * 2654435761) % n]
+
+    def session_rows(self, count, player_ids):
+        rng = self.rng
+        random_, gauss, expovariate = rng.random, rng.gauss, rng.expovariate
+        levels, level_cum, profiles = self._levels, self._level_cum, self.profiles
+        start_ts, end_ts, iso = self.start_ts, self.end_ts, self._iso
+        unfinished_rate, pick_player = self.unfinished_rate, self.pick_player
+        for _ in range(count):
+            level = levels[bisect.bisect(level_cum, random_() * level_cum[-1])]
+            profile = profiles.get(level) or DEFAULT_PROFILES[1]
+            time_seconds = profile['time_seconds']
+            started_ts = start_ts + int(random_() * (end_ts - start_ts))
+
+            if random_() < unfinished_rate:
+                duration = correct = wrong = combo = score = 0
+                ended = None
+                status = 'active'   # left for reap_sessions
+            else:
+                # Most games run the clock out, some end early
+                duration = time_seconds if random_() < 0.85 else 10 + int(random_() * (time_seconds - 10))
+                skill = math.exp(gauss(0, 0.35))
+                expected = profile['matches_per_min'] * duration / 60 * skill
+                correct = max(0, int(gauss(expected, math.sqrt(expected + 1))))
+                wrong = int(expovariate(1 / (1 + 4 / skill)))
+                combo = min(correct, 1 + int(expovariate(1 / (1 + correct / 4))))
+                score = correct * profile['points'] + int(combo * (combo - 1) / 2 * profile['combo_bonus'])
+                ended = iso(started_ts + duration)
+                status = 'finished'
+
+            h = '%032x' % (rng.getrandbits(128) & _UUID_MASK | _UUID_V4_BITS)
+            yield (
+                f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}", pick_player(player_ids), None,
+                level, score, iso(started_ts), ended, duration, correct, wrong, combo,
+                'clean', '{}', status,
+            )
+
+    # ---------------- promo codes ----------------
+    @property
+    def promo_prefix(self):
+        return f"S{_base36(self.seed % 36, 1)}"
+
+    def promo_rows(self, start, count, player_ids, used_rate=0.3):
+        rng = self.rng
+        prefix = self.promo_prefix
+        for i in range(start, start + count):
+            created_ts = rng.randrange(self.start_ts, self.end_ts)
+            if player_ids and rng.random() < used_rate:
+                player_id = self.pick_player(player_ids)
+                claimed = self._iso(rng.randrange(created_ts, self.end_ts + 1))
+                used = True
+            else:
+                player_id, claimed, used = None, None, False
+            yield (f"{prefix}{_base36(i, 8)}", used, player_id, claimed, self._iso(created_ts))
+
+
+# ====================== WRITERS ======================
+def _copy_line(row):
+    # Generated values never contain tabs, newlines or backslashes, so no escaping.
+    # str(True) / str(False) are valid boolean input for COPY.
+    return '\t'.join(['\\N' if value is None else str(value) for value in row])
+
+
+def copy_supported():
+    """PostgreSQL with a psycopg (3) or psycopg2 driver that can COPY FROM STDIN."""
+    if connection.vendor != 'postgresql':
+        return False
+    connection.ensure_connection()
+    raw = connection.connection.cursor()
+    try:
+        return hasattr(raw, 'copy') or hasattr(raw, 'copy_expert')
+    finally:
+        raw.close()
+
+
+def copy_rows(table, columns, rows):
+    """Stream rows into `table` with COPY ... FROM STDIN (text format)."""
+    sql = f'COPY "{table}" ({", ".join(columns)}) FROM STDIN'
+    buffer = io.StringIO()
+    buffer.writelines(_copy_line(row) + '\n' for row in rows)
+
+    connection.ensure_connection()
+    with transaction.atomic():
+        raw = connection.connection.cursor()
+        try:
+            if hasattr(raw, 'copy'):          # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:                             # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+        finally:
+            raw.close()
+
+
+@contextlib.contextmanager
+def _keep_timestamps(*fields):
+    """bulk_create would overwrite auto_now_add fields with now()."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def orm_rows(model, columns, rows, batch_size=5000):
+    """bulk_create fallback for databases without COPY."""
+    timestamp_fields = [
+        f for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False)
+    ]
+    # Rows carry JSON as text for COPY; decode it for the ORM
+    json_columns = [
+        i for i, column in enumerate(columns)
+        if isinstance(model._meta.get_field(column), models.JSONField)
+    ]
+    objs = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        for i in json_columns:
+            values[columns[i]] = json.loads(row[i])
+        objs.append(model(**values))
+    with _keep_timestamps(*timestamp_fields):
+        model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def player_ids_for_prefix(phone_prefix):
+    """All player ids whose phone number uses the synthetic prefix, as a compact array."""
+    ids = array('q')
+    qs = Player.objects.filter(phone_number__startswith=f"+998{phone_prefix}").order_by('pk')
+    ids.extend(qs.values_list('pk', flat=True).iterator(chunk_size=50000))
+    return ids
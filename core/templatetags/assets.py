@@ -0,0 +1,28 @@
+# core/templatetags/assets.py - Hashed static URLs for scripts
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from core import audio
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_urls(*prefixes):
+    """
+    {path: hashed URL} for collected files under the given prefixes, for
+    scripts that build asset paths at run time ({% static %} only covers
+    names written in the template). Empty before collectstatic.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return {
+        name: staticfiles_storage.base_url + hashed
+        for name, hashed in sorted(hashed_files.items()) if name.startswith(prefixes)
+    }
+
+
+@register.simple_tag
+def audio_manifest():
+    """The sound sprite / music map from `manage.py build_audio`, or None (sounds.js loads the WAVs)."""
+    return audio.load_manifest()
@@ -0,0 +1,163 @@
+# core/testing.py - Query-count / latency regression helpers for the API test suites
+#
+#   python manage.py test                                 # assert query limits, print comparison table
+#   PERF_UPDATE_BASELINE=1 python manage.py test          # rewrite <app>/perf_baseline.json
+#   PERF_ENFORCE_LATENCY=1 python manage.py test          # also fail on latency budgets
+#   PERF_BUDGET_SCALE=3 python manage.py test             # slower machine: loosen latency budgets
+#
+# Query limits are exact regressions checks: a seeded dataset with hundreds of
+# rows per table makes any per-row query (N+1, per-day loop) blow the limit.
+# Latency depends on the machine, its load and the database, so by default
+# it is only reported ("slow" in the table); enforce it on a quiet, known
+# machine. Baseline milliseconds are compared only against a run on the
+# same database vendor as the one they were recorded on.
+
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .models import DifficultySettings, FruitCard, GameConfig, GameSession, Player, TextCard
+from .synthetic import (
+    PLAYER_COLUMNS, PROMO_COLUMNS, SESSION_COLUMNS, SyntheticDataset, orm_rows, player_ids_for_prefix,
+)
+
+SEED_PLAYERS = 200
+SEED_SESSIONS = 3000
+SEED_PROMOS = 400
+
+
+def seed_dataset():
+    """Fixed dataset shared by the performance suites (same seed every run)."""
+    GameConfig.load()
+    for level, (name, seconds) in enumerate([('Easy', 180), ('Medium', 150), ('Hard', 120)], start=1):
+        DifficultySettings.objects.create(
+            difficulty_level=level, name_en=name, name_uz=name, name_ru=name,
+            time_seconds=seconds, order=level,
+        )
+    fruits = [
+        FruitCard.objects.create(title=f"Fruit {i}", code=f"fruit-{i}", order=i) for i in range(12)
+    ]
+    for i, fruit in enumerate(fruits):
+        TextCard.objects.create(title=f"Text {i}", code=f"text-{i}", correct_fruit=fruit, order=i)
+
+    dataset = SyntheticDataset(seed=1234, days=60)
+    orm_rows(Player, PLAYER_COLUMNS, dataset.player_rows(0, SEED_PLAYERS, '70'))
+    player_ids = player_ids_for_prefix('70')
+    orm_rows(GameSession, SESSION_COLUMNS, dataset.session_rows(SEED_SESSIONS, player_ids))
+
+    from rewards.models import PromoCode
+    orm_rows(PromoCode, PROMO_COLUMNS, dataset.promo_rows(0, SEED_PROMOS, player_ids))
+    return player_ids
+
+
+@override_settings(GAME_CACHE_BACKGROUND_REFRESH=False, REQUEST_METRICS_SERVER_TIMING=False)
+class PerformanceTestCase(TestCase):
+    """
+    TestCase with assertPerformance(); subclasses set baseline_path.
+
+    Each measured call runs with an empty cache, so the numbers describe
+    the database path rather than a cache hit.
+    """
+    baseline_path = None
+    repeat = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = {}
+        cls.slow = {}   # name -> budget the median went over
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_ids = seed_dataset()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            if cls.results:
+                cls.report()
+        finally:
+            super().tearDownClass()
+
+    def assertPerformance(self, name, call, max_queries, budget_ms, status=200, before=None):
+        """
+        Run call() `repeat` times and check the worst query count and the
+        median latency. before() runs untimed ahead of every call and may
+        return kwargs for it (e.g. a fresh game session to finish).
+        """
+        timings, query_counts = [], []
+        for _ in range(self.repeat):
+            caches[settings.GAME_CACHE_ALIAS].clear()
+            kwargs = before() if before else None
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = call(**(kwargs or {}))
+                timings.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(ctx.captured_queries))
+            self.assertEqual(response.status_code, status, f"{name}: unexpected status")
+
+        queries = max(query_counts)
+        median_ms = statistics.median(timings)
+        budget = budget_ms * float(os.environ.get('PERF_BUDGET_SCALE', 1))
+        self.results[name] = {'queries': queries, 'ms': round(median_ms, 2)}
+        if median_ms > budget:
+            self.slow[name] = budget
+
+        self.assertLessEqual(
+            queries, max_queries,
+            f"{name}: {queries} queries (limit {max_queries}) - N+1 or per-row loop?\n"
+            + '\n'.join(q['sql'] for q in ctx.captured_queries),
+        )
+        if os.environ.get('PERF_ENFORCE_LATENCY'):
+            self.assertLessEqual(median_ms, budget, f"{name}: median {median_ms:.1f}ms over {budget:.0f}ms budget")
+
+    @classmethod
+    def report(cls):
+        path = Path(cls.baseline_path) if cls.baseline_path else None
+        try:
+            stored = json.loads(path.read_text()) if path else {}
+        except (OSError, ValueError):
+            stored = {}
+        baseline = stored.get(cls.__name__, {})
+        # Files from before the key was written were recorded on SQLite
+        same_database = stored.get('database', 'sqlite') == connection.vendor
+
+        out = sys.stderr
+        header = f"{'endpoint':<32}{'queries':>10}{'base':>7}{'ms':>10}{'base':>10}{'change':>14}"
+        out.write(f"\n{cls.__name__} ({connection.vendor})\n{header}\n{'-' * len(header)}\n")
+        for name, now in cls.results.items():
+            base = baseline.get(name)
+            if base:
+                base_queries, base_ms, change = base['queries'], '-', '-'
+                if same_database:
+                    base_ms = f"{base['ms']:.1f}"
+                    if base['ms']:
+                        change = f"{(now['ms'] - base['ms']) / base['ms'] * 100:+.0f}%"
+                if now['queries'] > base['queries']:
+                    change += ' Q!'
+            else:
+                base_queries, base_ms, change = '-', '-', 'new'
+            if name in cls.slow:
+                change += ' slow'
+            out.write(
+                f"{name:<32}{now['queries']:>10}{base_queries:>7}{now['ms']:>10.1f}{base_ms:>10}{change:>14}\n"
+            )
+
+        if path and os.environ.get('PERF_UPDATE_BASELINE'):
+            if not same_database:
+                stored = {}   # milliseconds from another database are not comparable
+            stored['database'] = connection.vendor
+            stored.setdefault(cls.__name__, {}).update(cls.results)
+            path.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
+            out.write(f"baseline written to {path}\n")
+        if cls.slow:
+            out.write(f"{len(cls.slow)} over their latency budget (PERF_ENFORCE_LATENCY=1 to fail)\n")
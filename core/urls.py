@@ -1,21 +1,34 @@
 # core/urls.py
+from django.conf import settings
 from django.urls import path
-from .api_views import UserGameConfigView     # ← direct import from api_views.py
+from .api_views import GameConfigVersionView, UserGameConfigView     # ← direct import from api_views.py
 
 from .views import (                          # your other views
     ConfigView,
     SessionStartView,
     SessionFinishView,
+    SessionFinishBatchView,
+    SessionEventsView,
     LeaderboardView,
     PlayerProfileView,
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncGameConfigView as UserGameConfigView,
+        AsyncLeaderboardView as LeaderboardView,
+        AsyncPlayerProfileView as PlayerProfileView,
+    )
+
 urlpatterns = [
     path('game/config/', UserGameConfigView.as_view(), name='game-config'),
+    path('game/version/', GameConfigVersionView.as_view(), name='game-config-version'),
 
     path('config/', ConfigView.as_view(), name='config'),
     path('session/start/', SessionStartView.as_view(), name='session-start'),
     path('session/finish/', SessionFinishView.as_view(), name='session-finish'),
+    path('session/finish/batch/', SessionFinishBatchView.as_view(), name='session-finish-batch'),
+    path('session/<uuid:session_id>/events/', SessionEventsView.as_view(), name='session-events'),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
     path('profile/', PlayerProfileView.as_view(), name='profile'),
 ]
\ No newline at end of file
@@ -4,16 +4,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.utils import timezone
-from django.contrib.auth import login
-from django.db import transaction
-import traceback
+from django.conf import settings
+from . import services, session_events
+from .authentication import GameTokenAuthentication, issue_game_token
+from .cache import config_cache, finish_cache, leaderboard_cache, profile_cache
 from .models import (
     GameConfig, FruitCard, TextCard, GameSession,
     Player, Tournament, DifficultySettings
 )
 from .serializers import (
     GameConfigSerializer, FruitCardSerializer, TextCardSerializer,
-    GameSessionStartSerializer, GameSessionFinishSerializer,
+    GameSessionStartSerializer, GameSessionFinishSerializer, SessionEventsSerializer,
+    SessionFinishBatchSerializer,
     LeaderboardEntrySerializer, PlayerSerializer,
     PlayerSettingsSerializer, TournamentSerializer
 )
@@ -26,9 +28,16 @@ class ConfigView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
+        # Image URLs are absolute, so the cached payload is per host
+        return Response(config_cache.get_or_build(
+            f"legacy:{request.get_host()}", lambda: self.build_payload(request)
+        ))
+
+    @staticmethod
+    def build_payload(request):
         config = GameConfig.load()
         fruits = FruitCard.objects.filter(is_active=True)
-        texts = TextCard.objects.filter(is_active=True)
+        texts = TextCard.objects.filter(is_active=True).select_related('correct_fruit')
 
         # ✅ Get difficulty settings from admin panel
         difficulty_settings = DifficultySettings.objects.filter(is_active=True).order_by('order')
@@ -59,16 +68,17 @@ class ConfigView(APIView):
                 }
             })
 
-        return Response({
+        return {
             "config": GameConfigSerializer(config).data,
             "fruit_cards": FruitCardSerializer(fruits, many=True, context={'request': request}).data,
             "text_cards": TextCardSerializer(texts, many=True, context={'request': request}).data,
             "difficulty_settings": difficulty_data,  # ← KEY FIX: Added this line
-        })
+        }
 
 
 # ====================== SESSION START ======================
 class SessionStartView(APIView):
+    authentication_classes = [GameTokenAuthentication]
     permission_classes = [permissions.AllowAny]
 
     DIFFICULTY_MAP = {
@@ -100,15 +110,17 @@ class SessionStartView(APIView):
         player.last_login = timezone.now()
         player.save()
 
-        login(request, player, backend='django.contrib.auth.backends.ModelBackend')
-
         session = GameSession.objects.create(
             player=player,
             difficulty=difficulty
         )
 
+        # No django login(): the player authenticates the rest of the game
+        # with a signed token, so no session row is written.
         return Response({
             "session_id": session.session_id,
+            "token": issue_game_token(player, session),
+            "token_expires_in": settings.GAME_TOKEN_MAX_AGE,
             "server_time": timezone.now().isoformat(),
             "player": PlayerSerializer(player).data,
         }, status=status.HTTP_201_CREATED)
@@ -116,6 +128,7 @@ class SessionStartView(APIView):
 
 # ====================== SESSION FINISH ======================
 class SessionFinishView(APIView):
+    authentication_classes = [GameTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
@@ -125,50 +138,106 @@ class SessionFinishView(APIView):
 
         session_id = serializer.validated_data["session_id"]
 
+        # The token is bound to one session, so ownership is checked without a query
+        if str(session_id) != request.user.session_id:
+            return Response({"error": "Session not found or not yours"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Double taps and retries replay the first answer from the dedupe cache;
+        # concurrent duplicates wait for the first one instead of racing it
         try:
-            session = GameSession.objects.select_related('player').get(
-                session_id=session_id,
-                player=request.user
+            body = finish_cache.get_or_build(
+                str(session_id), lambda: self.finish(request.user.id, serializer.validated_data)
             )
-        except GameSession.DoesNotExist:
-            return Response({"error": "Session not found or not yours"}, status=status.HTTP_404_NOT_FOUND)
+        except _Uncached as e:
+            return e.response
+        return Response(body)
+
+    @staticmethod
+    def finish(player_id, data):
+        result = services.finish_sessions(player_id, [data])[str(data["session_id"])]
+
+        if result["status"] == services.NOT_FOUND:
+            raise _Uncached(Response(
+                {"error": "Session not found or not yours"}, status=status.HTTP_404_NOT_FOUND
+            ))
+        if result["status"] == services.INVALID:
+            raise _Uncached(Response({"log_json": [result["error"]]}, status=status.HTTP_400_BAD_REQUEST))
+
+        # Finished now or by an earlier request whose answer is gone from the cache: same body
+        return {
+            "status": "success",
+            "new_promo_code": result["new_promo_code"],
+        }
 
-        if session.ended_at:
-            return Response({"error": "Session already finished"}, status=status.HTTP_400_BAD_REQUEST)
 
-        session.score_balls = serializer.validated_data["score_balls"]
-        session.duration = serializer.validated_data["duration"]
-        session.correct_count = serializer.validated_data.get("correct_count", 0)
-        session.wrong_count = serializer.validated_data.get("wrong_count", 0)
-        session.best_combo = serializer.validated_data.get("best_combo", 0)
-        session.ended_at = timezone.now()
-        session.save()
+class _Uncached(Exception):
+    """Carries an error response that must not be stored in the dedupe cache."""
 
-        new_promo_code = None
-        config = GameConfig.load()
+    def __init__(self, response):
+        self.response = response
 
-        if session.score_balls >= config.promo_score_threshold:
-            from rewards.models import PromoCode
 
-            try:
-                with transaction.atomic():
-                    promo = PromoCode.objects.select_for_update() \
-                        .filter(is_used=False).first()
+# ====================== SESSION FINISH (BATCH) ======================
+class SessionFinishBatchView(APIView):
+    """
+    Finished games a client queued while offline, sent in one request.
+    Idempotent per session_id: re-sending an already finished game returns
+    "already_finished" with the promo code it earned.
+    """
+    authentication_classes = [GameTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
-                    if promo:
-                        promo.is_used = True
-                        promo.player = session.player
-                        promo.claimed_at = timezone.now()
-                        promo.save()
-                        new_promo_code = promo.code
-            except Exception as e:
-                print(f"[PROMO ERROR] {e}")
-                traceback.print_exc()
+    def post(self, request):
+        serializer = SessionFinishBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            "status": "success",
-            "new_promo_code": new_promo_code,
-        })
+        # Items are validated one by one so a single bad entry does not block the queue
+        items = [GameSessionFinishSerializer(data=raw) for raw in serializer.validated_data["sessions"]]
+        finished = services.finish_sessions(
+            request.user.id, [item.validated_data for item in items if item.is_valid()]
+        )
+
+        results = []
+        for item in items:
+            if item.errors:
+                session_id = item.initial_data.get("session_id") if isinstance(item.initial_data, dict) else None
+                results.append({"session_id": session_id, "status": services.INVALID, "errors": item.errors})
+            else:
+                session_id = str(item.validated_data["session_id"])
+                results.append({"session_id": session_id, **finished[session_id]})
+        return Response({"results": results})
+
+
+# ====================== SESSION EVENTS ======================
+class SessionEventsView(APIView):
+    """
+    Move-log chunks uploaded while the game runs. Buffered in the events
+    cache (core.session_events) - no database query per chunk.
+    """
+    authentication_classes = [GameTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, session_id):
+        if str(session_id) != request.user.session_id:
+            return Response({"error": "Session not found or not yours"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = SessionEventsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        seq = serializer.validated_data["seq"]
+        try:
+            stored, buffered = session_events.buffer_chunk(session_id, seq, serializer.validated_data["chunk"])
+        except session_events.SessionClosed as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except session_events.EventBufferError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # stored_events: how far the client moves on (a retried seq keeps its first copy)
+        return Response(
+            {"seq": seq, "stored_events": stored, "buffered_events": buffered}, status=status.HTTP_202_ACCEPTED
+        )
 
 
 # ====================== LEADERBOARD ======================
@@ -184,34 +253,37 @@ class LeaderboardView(APIView):
     DEFAULT_DIFFICULTY = 4
 
     def get(self, request):
-        difficulty_param = request.query_params.get("difficulty")
-
-        qs = GameSession.objects.filter(ended_at__isnull=False)
-
-        if difficulty_param:
-            try:
-                if difficulty_param.isdigit():
-                    difficulty = int(difficulty_param)
-                else:
-                    difficulty = self.DIFFICULTY_MAP.get(difficulty_param.lower())
-                    if difficulty is None:
-                        return Response(
-                            {"error": "Invalid difficulty. Use: easy, medium, hard, ranked or number 1-4"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                qs = qs.filter(difficulty=difficulty)
-            except ValueError:
-                return Response({"error": "Invalid difficulty value"}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            qs = qs.filter(difficulty=self.DEFAULT_DIFFICULTY)
-
-        top_10 = qs.order_by('-score_balls', 'duration')[:10]
-
-        return Response(LeaderboardEntrySerializer(top_10, many=True).data)
+        difficulty, error = self.parse_difficulty(request.query_params.get("difficulty"))
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Short TTL + stale-while-revalidate: no invalidation on every finish
+        return Response(leaderboard_cache.get_or_build(
+            difficulty,
+            lambda: list(LeaderboardEntrySerializer(self.top_sessions(difficulty), many=True).data)
+        ))
+
+    @classmethod
+    def parse_difficulty(cls, difficulty_param):
+        """(difficulty, None) for ?difficulty=, or (None, error message)."""
+        if not difficulty_param:
+            return cls.DEFAULT_DIFFICULTY, None
+        if difficulty_param.isdigit():
+            return int(difficulty_param), None
+        difficulty = cls.DIFFICULTY_MAP.get(difficulty_param.lower())
+        if difficulty is None:
+            return None, "Invalid difficulty. Use: easy, medium, hard, ranked or number 1-4"
+        return difficulty, None
+
+    @staticmethod
+    def top_sessions(difficulty):
+        return GameSession.objects.filter(ended_at__isnull=False, difficulty=difficulty) \
+            .select_related('player').order_by('-score_balls', 'duration')[:10]
 
 
 # ====================== PLAYER PROFILE ======================
 class PlayerProfileView(APIView):
+    authentication_classes = [GameTokenAuthentication]
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
@@ -225,14 +297,37 @@ class PlayerProfileView(APIView):
             player.last_login = timezone.now()
             player.save()
         elif request.user.is_authenticated:
-            player = request.user
+            player = request.user.player
         else:
             return Response({"player": None, "history": [], "promos": []})
 
-        history = GameSession.objects.filter(player=player) \
+        # History and promos are cached per player; core/rewards signals drop the
+        # entry when one of the player's sessions or promo codes changes.
+        activity = profile_cache.get_or_build(player.pk, lambda: self.build_activity(player.pk))
+
+        return Response({
+            "player": PlayerSerializer(player).data,
+            **activity,
+        })
+
+    @classmethod
+    def build_activity(cls, player_id):
+        history, promos = cls.activity_querysets(player_id)
+        return cls.activity_payload(history, promos)
+
+    @staticmethod
+    def activity_querysets(player_id):
+        from rewards.models import PromoCode
+        history = GameSession.objects.filter(player_id=player_id) \
             .order_by('-started_at')[:20] \
             .values('started_at', 'score_balls', 'difficulty', 'duration')
+        promos = PromoCode.objects.filter(player_id=player_id) \
+            .order_by('-claimed_at') \
+            .values('code', 'claimed_at')
+        return history, promos
 
+    @staticmethod
+    def activity_payload(history, promos):
         history_data = [
             {
                 "date": h["started_at"],
@@ -243,24 +338,15 @@ class PlayerProfileView(APIView):
             for h in history
         ]
 
-        from rewards.models import PromoCode
-        promos = PromoCode.objects.filter(player=player) \
-            .order_by('-claimed_at') \
-            .values('code', 'claimed_at')
-
         promo_data = [{"code": p['code'], "claimed_at": p['claimed_at']} for p in promos]
 
-        return Response({
-            "player": PlayerSerializer(player).data,
-            "history": history_data,
-            "promos": promo_data,
-        })
+        return {"history": history_data, "promos": promo_data}
 
     def patch(self, request):
         if not request.user.is_authenticated:
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        serializer = PlayerSettingsSerializer(request.user, data=request.data, partial=True)
+        serializer = PlayerSettingsSerializer(request.user.player, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
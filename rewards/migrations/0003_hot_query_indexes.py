@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('rewards', '0002_alter_promocode_code_alter_promocode_player'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='promocode',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['id'], name='promo_unused_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='promocode',
+            index=models.Index(fields=['player', '-claimed_at'], include=('code',), name='promo_player_claimed_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_gamesession_log_bin'),
+        ('rewards', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocode',
+            name='session',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promo_codes', to='core.gamesession'),
+        ),
+    ]
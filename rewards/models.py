@@ -1,5 +1,5 @@
 from django.db import models
-from core.models import Player
+from core.models import GameSession, Player
 
 
 class PromoCode(models.Model):
@@ -7,7 +7,21 @@ class PromoCode(models.Model):
     is_used = models.BooleanField(default=False)
     player = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, blank=True)
     claimed_at = models.DateTimeField(null=True, blank=True)
+    # Game that earned the code; no database FK because a partitioned
+    # core_gamesession (core.partitioning) has no table-wide unique id
+    session = models.ForeignKey(
+        GameSession, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='promo_codes', db_constraint=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Claim: first unused code by id; stays small as codes get used
+            models.Index(fields=['id'], name='promo_unused_idx', condition=models.Q(is_used=False)),
+            # Profile promos: player = X ORDER BY -claimed_at
+            models.Index(fields=['player', '-claimed_at'], name='promo_player_claimed_idx', include=['code']),
+        ]
+
     def __str__(self):
         return self.code
\ No newline at end of file
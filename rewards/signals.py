@@ -0,0 +1,13 @@
+# rewards/signals.py - Cache invalidation hooks
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import profile_cache
+from .models import PromoCode
+
+
+@receiver([post_save, post_delete], sender=PromoCode)
+def invalidate_player_profile(sender, instance, **kwargs):
+    if instance.player_id:
+        profile_cache.delete(instance.player_id)
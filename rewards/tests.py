@@ -1,3 +1,107 @@
-from django.test import TestCase
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+
+from core.authentication import issue_game_token
+from core.models import GameConfig, GameSession, Player
+from core.testing import PerformanceTestCase
+
+from .models import PromoCode
+
+
+class PromoClaimPerformanceTests(PerformanceTestCase):
+    """Claiming a promo code on a winning finish stays a fixed number of queries"""
+    baseline_path = Path(__file__).with_name('perf_baseline.json')
+
+    def setUp(self):
+        self.player = Player.objects.get(pk=self.player_ids[2])
+        self.threshold = GameConfig.load().promo_score_threshold
+
+    def new_session(self):
+        session = GameSession.objects.create(player=self.player, difficulty=1)
+        return {'session': session, 'token': issue_game_token(self.player, session)}
+
+    def finish(self, session, token):
+        return self.client.post('/api/session/finish/', {
+            'session_id': session.session_id, 'score_balls': self.threshold + 10, 'duration': 90,
+        }, content_type='application/json', HTTP_AUTHORIZATION=f"Game {token}")
+
+    def test_winning_finish_claims_code(self):
+        unused = PromoCode.objects.filter(is_used=False).count()
+        self.assertPerformance(
+            'session-finish (promo claim)', self.finish,
+            max_queries=7, budget_ms=30, before=self.new_session,
+        )
+        self.assertEqual(PromoCode.objects.filter(is_used=False).count(), unused - self.repeat)
+
+    def test_winning_finish_without_codes_left(self):
+        PromoCode.objects.filter(is_used=False).update(is_used=True)
+        self.assertPerformance(
+            'session-finish (no codes left)', self.finish,
+            max_queries=6, budget_ms=30, before=self.new_session,
+        )
+
+    def test_retried_finish_replays_first_answer(self):
+        def finished_once():
+            kwargs = self.new_session()
+            kwargs['first'] = self.finish(**kwargs).json()
+            return kwargs
+
+        def retry(session, token, first):
+            response = self.finish(session, token)
+            self.assertEqual(response.json(), first)
+            return response
+
+        self.assertPerformance(
+            'session-finish (retry replay)', retry, max_queries=0, budget_ms=10, before=finished_once,
+        )
+
+    def test_retry_after_dedupe_cache_loss_returns_earned_code(self):
+        kwargs = self.new_session()
+        first = self.finish(**kwargs).json()
+        caches[settings.GAME_CACHE_ALIAS].clear()
+
+        response = self.finish(**kwargs)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), first)
+        self.assertTrue(first['new_promo_code'])
+
+    def test_batch_finish_allocates_codes_in_one_pass(self):
+        def queue():
+            sessions = [GameSession.objects.create(player=self.player, difficulty=1) for _ in range(20)]
+            return {'sessions': sessions, 'token': issue_game_token(self.player, sessions[0])}
+
+        def flush(sessions, token):
+            return self.client.post('/api/session/finish/batch/', {'sessions': [
+                {'session_id': s.session_id, 'score_balls': self.threshold + i, 'duration': 90}
+                for i, s in enumerate(sessions)
+            ]}, content_type='application/json', HTTP_AUTHORIZATION=f"Game {token}")
+
+        unused = PromoCode.objects.filter(is_used=False).count()
+        # Same count for 1 or 50 games: lock, bulk UPDATE, config, promo SELECT + bulk UPDATE
+        # (+ SAVEPOINT pair); building bulk_update's CASE expressions is most of the time
+        self.assertPerformance(
+            'session-finish batch (20 winners)', flush, max_queries=7, budget_ms=120, before=queue,
+        )
+        self.assertEqual(PromoCode.objects.filter(is_used=False).count(), unused - 20 * self.repeat)
+
+    def test_batch_finish_is_idempotent(self):
+        sessions = [GameSession.objects.create(player=self.player, difficulty=1) for _ in range(3)]
+        payload = {'sessions': [
+            {'session_id': s.session_id, 'score_balls': score, 'duration': 60}
+            for s, score in zip(sessions, (self.threshold, 0, self.threshold + 1))
+        ]}
+        auth = {'HTTP_AUTHORIZATION': f"Game {issue_game_token(self.player, sessions[0])}"}
+
+        first = self.client.post('/api/session/finish/batch/', payload, content_type='application/json', **auth)
+        again = self.client.post('/api/session/finish/batch/', payload, content_type='application/json', **auth)
+
+        self.assertEqual([r['status'] for r in first.json()['results']], ['finished'] * 3)
+        self.assertEqual([r['status'] for r in again.json()['results']], ['already_finished'] * 3)
+        codes = [r['new_promo_code'] for r in first.json()['results']]
+        self.assertEqual(codes[1], None)
+        self.assertTrue(codes[0] and codes[2])
+        self.assertEqual([r['new_promo_code'] for r in again.json()['results']], codes)
+        self.assertEqual(PromoCode.objects.filter(session__in=sessions).count(), 2)
@@ -3,6 +3,36 @@
 class API {
     constructor() {
         this.baseURL = '/api';
+
+        // Signed game token issued by /session/start/ (replaces cookie login)
+        this.gameToken = null;
+        this.gameTokenExpiresAt = 0;
+        this.gameTokenPhone = null;   // player the token was issued to
+
+        // Finishes that failed on a bad network, sent later via /session/finish/batch/
+        this.FINISH_QUEUE_MAX = 50;   // SESSION_FINISH_BATCH_MAX
+    }
+
+    /**
+     * Remember the game token returned by /session/start/
+     * @param {string} token - Signed token
+     * @param {number} expiresIn - Lifetime in seconds
+     * @param {string} phone - Player the token was issued to
+     */
+    _setGameToken(token, expiresIn, phone) {
+        this.gameToken = token || null;
+        this.gameTokenExpiresAt = token ? Date.now() + (expiresIn || 0) * 1000 : 0;
+        this.gameTokenPhone = token ? phone || null : null;
+    }
+
+    /**
+     * Current game token, or null once it has expired
+     */
+    _getGameToken() {
+        if (this.gameToken && Date.now() >= this.gameTokenExpiresAt) {
+            this._setGameToken(null);
+        }
+        return this.gameToken;
     }
 
     /**
@@ -51,6 +81,12 @@ class API {
                 ...options.headers
             };
 
+            // Player endpoints authenticate with the game token
+            const gameToken = this._getGameToken();
+            if (gameToken && !headers['Authorization']) {
+                headers['Authorization'] = `Game ${gameToken}`;
+            }
+
             // Add CSRF token for non-GET requests
             if (options.method && options.method !== 'GET') {
                 const csrfToken = this._getCSRFToken();
@@ -67,6 +103,11 @@ class API {
                 credentials: 'include'
             });
 
+            // Token rejected (expired/invalid) - drop it so later calls go anonymous
+            if (response.status === 401) {
+                this._setGameToken(null);
+            }
+
             // Handle non-OK responses
             if (!response.ok) {
                 let errorMessage = `HTTP error! status: ${response.status}`;
@@ -84,7 +125,9 @@ class API {
                     errorMessage = response.statusText || errorMessage;
                 }
 
-                throw new Error(errorMessage);
+                const httpError = new Error(errorMessage);
+                httpError.status = response.status;
+                throw httpError;
             }
 
             // Parse and return JSON response
@@ -107,12 +150,12 @@ class API {
     /**
      * Start a new game session
      * @param {string} mode - Game mode ('ranked' or 'training')
-     * @returns {Promise<{session_id: string, server_time: string, player: object}>}
+     * @returns {Promise<{session_id: string, token: string, server_time: string, player: object}>}
      */
     async startSession(mode = 'ranked') {
         const user = this._getCurrentUser();
 
-        return this._fetch(`${this.baseURL}/session/start/`, {
+        const data = await this._fetch(`${this.baseURL}/session/start/`, {
             method: 'POST',
             body: JSON.stringify({
                 phone_number: user.phone,
@@ -120,6 +163,9 @@ class API {
                 mode: mode
             })
         });
+
+        this._setGameToken(data.token, data.token_expires_in, user.phone);
+        return data;
     }
 
     /**
@@ -129,17 +175,111 @@ class API {
      * @returns {Promise<{status: string, new_promo_code: string}>}
      */
     async finishSession(sessionId, sessionData) {
-        return this._fetch(`${this.baseURL}/session/finish/`, {
+        const payload = this.finishPayload(sessionId, sessionData);
+        try {
+            return await this._fetch(`${this.baseURL}/session/finish/`, {
+                method: 'POST',
+                body: JSON.stringify(payload)
+            });
+        } catch (error) {
+            // Network failure or gateway/server error: keep the result for later
+            if (error instanceof TypeError || error.status >= 500) this.queueFinish(payload);
+            throw error;
+        }
+    }
+
+    finishPayload(sessionId, sessionData) {
+        return {
+            session_id: sessionId,
+            score_balls: sessionData.score_balls || 0,
+            duration: sessionData.duration || 0,
+            correct_count: sessionData.correct_count || 0,
+            wrong_count: sessionData.wrong_count || 0,
+            best_combo: sessionData.best_combo || 0,
+            log_json: sessionData.log_json || {},
+            ...(sessionData.log_seq ? { log_seq: sessionData.log_seq } : {}),
+            ...(sessionData.log_complete ? { log_complete: true } : {})
+        };
+    }
+
+    /**
+     * Finish several queued games in one request (idempotent per session_id)
+     * @param {array} sessions - finishSession payloads, each with its session_id
+     * @returns {Promise<{results: array}>} One {session_id, status, new_promo_code} per entry
+     */
+    async finishSessionsBatch(sessions) {
+        return this._fetch(`${this.baseURL}/session/finish/batch/`, {
             method: 'POST',
-            body: JSON.stringify({
-                session_id: sessionId,
-                score_balls: sessionData.score_balls || 0,
-                duration: sessionData.duration || 0,
-                correct_count: sessionData.correct_count || 0,
-                wrong_count: sessionData.wrong_count || 0,
-                best_combo: sessionData.best_combo || 0,
-                log_json: sessionData.log_json || {}
-            })
+            body: JSON.stringify({ sessions })
+        });
+    }
+
+    /**
+     * Remember a finish that could not be sent; flushed by flushFinishQueue()
+     * @param {object} payload - finishSession body including session_id
+     */
+    queueFinish(payload) {
+        const key = this._finishQueueKey(this.gameTokenPhone || (window.getCurrentUser() || {}).phone);
+        if (!key) return;
+        const queue = this._getFinishQueue(key).filter(item => item.session_id !== payload.session_id);
+        queue.push(payload);
+        localStorage.setItem(key, JSON.stringify(queue.slice(-this.FINISH_QUEUE_MAX)));
+    }
+
+    // One queue per player: on a shared device a finish queued by player A
+    // must never be sent with player B's token (the server would answer
+    // not_found, and B would be charged for A's games if it did not).
+    _finishQueueKey(phone) {
+        return phone ? `finish_queue:${phone}` : null;
+    }
+
+    _getFinishQueue(key) {
+        try {
+            return JSON.parse(localStorage.getItem(key)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    /**
+     * Send the token owner's queued finishes (needs a valid game token).
+     * Only entries the server finished (now or earlier) or rejected as
+     * invalid are dropped; not_found, auth and network errors keep them for
+     * a later flush, e.g. once their player logs in again on this device.
+     * @returns {Promise<array>} Per-session results, empty when nothing was sent
+     */
+    async flushFinishQueue() {
+        // The token is sent by _fetch; its owner picks the queue
+        const key = this._getGameToken() && this._finishQueueKey(this.gameTokenPhone);
+        if (!key) return [];
+        const queue = this._getFinishQueue(key);
+        if (!queue.length) return [];
+
+        const batch = queue.slice(0, this.FINISH_QUEUE_MAX);
+        const data = await this.finishSessionsBatch(batch);
+
+        const DONE = new Set(['finished', 'already_finished', 'invalid']);
+        const done = new Set(data.results.filter(r => DONE.has(r.status)).map(r => r.session_id));
+        const remaining = this._getFinishQueue(key).filter(item => !done.has(item.session_id));
+        if (remaining.length) {
+            localStorage.setItem(key, JSON.stringify(remaining));
+        } else {
+            localStorage.removeItem(key);
+        }
+        return data.results;
+    }
+
+    /**
+     * Upload a chunk of moves while the game is running
+     * @param {string} sessionId - Session ID
+     * @param {number} seq - Chunk number (1, 2, ...); re-sending a seq replaces that chunk
+     * @param {array} events - Move events since the last acknowledged chunk
+     * @returns {Promise<{seq: number, buffered_events: number}>}
+     */
+    async uploadEvents(sessionId, seq, events) {
+        return this._fetch(`${this.baseURL}/session/${sessionId}/events/`, {
+            method: 'POST',
+            body: JSON.stringify({ seq, events })
         });
     }
 
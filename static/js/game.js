@@ -1,5 +1,9 @@
 // static/js/game.js - REAL-TIME ADMIN SYNC VERSION (Full original code + fixes)
 
+// Space for a card image: 85x110px card minus padding (see createCardElement)
+const CARD_IMAGE_CSS_WIDTH = 80;
+const CARD_IMAGE_CSS_HEIGHT = 102;
+
 class Game {
     constructor(api, ui) {
         this.api = api;
@@ -38,6 +42,21 @@ class Game {
         this.stats = { correct: 0, wrong: 0, bestCombo: 0 };
         this.CARDS_PER_GAME = 8;
 
+        // Move log sent with session/finish (stored server-side in a compact binary form)
+        this.moveLog = [];
+        this.gameStartedAt = 0;
+
+        // Moves are uploaded in chunks during play; a chunk is re-sent under the
+        // same seq (with any newer moves) until the server acknowledges it
+        this.logSeq = 1;
+        this.logAcked = 0;          // moveLog entries the server has
+        this.logUpload = null;      // in-flight upload promise
+        this.logInterval = null;
+        this.LOG_UPLOAD_MS = 10000;
+        this.LOG_CHUNK_SIZE = 200;  // SESSION_EVENTS_MAX_CHUNK
+
+        this.atlas = null;          // sprite sheets from /api/game/config/
+
         this.isProcessing = false;
         this.revealedTextCards = new Set();
         this.shuffleInterval = null;
@@ -67,6 +86,10 @@ class Game {
             this.fruitCards = data.fruit_cards || [];
             this.textCards = data.text_cards || [];
 
+            // Sprite sheets: fetched once here instead of one image per card
+            this.atlas = data.atlas || null;
+            (this.atlas?.sheets || []).forEach(sheet => { new Image().src = sheet.url; });
+
             // Load difficulty settings
             this.difficultySettings = {};
             (data.difficulty_settings || []).forEach(setting => {
@@ -150,9 +173,11 @@ class Game {
 
         console.log(`[Game] Starting Level ${this.difficultyLevel} with admin settings:`, settings);
 
+        this.sessionId = null;  // never upload to / finish the previous game
         try {
             const data = await this.api.startSession('ranked');
             this.sessionId = data.session_id;
+            this.flushOfflineFinishes();   // fresh token: send games queued while offline
         } catch (e) {
             console.warn('[Game] Session start failed (offline mode?):', e);
         }
@@ -252,6 +277,15 @@ class Game {
         this.selectedFruitIndex = null;
         this.revealedTextCards = new Set();
         this.stats = { correct: 0, wrong: 0, bestCombo: 0 };
+        this.moveLog = [];
+        this.gameStartedAt = performance.now();
+        this.logSeq = 1;
+        this.logAcked = 0;
+        this.logUpload = null;
+        clearInterval(this.logInterval);
+        this.logInterval = this.sessionId
+            ? setInterval(() => this.uploadMoves(), this.LOG_UPLOAD_MS)
+            : null;
 
         if (this.shuffleInterval) {
             clearInterval(this.shuffleInterval);
@@ -344,6 +378,7 @@ class Game {
                         this.allCards[j].card.pairCode === pairCode &&
                         this.allCards[j].active) {
 
+                        this.logMove('hint');
                         textSlot.el.classList.add('hint-glow');
                         this.allCards[j].el.classList.add('hint-glow');
 
@@ -400,16 +435,7 @@ class Game {
             el.style.background = 'linear-gradient(135deg, #f093fb 0%, #f5576c 100%)';
 
             if (cardData.data.image) {
-                const img = document.createElement('img');
-                img.src = cardData.data.image;
-                img.alt = cardData.data.title || 'Fruit';
-                img.style.cssText = `
-                    max-width: 95%;
-                    max-height: 95%;
-                    object-fit: contain;
-                    border-radius: 4px;
-                `;
-                el.appendChild(img);
+                el.appendChild(this.createCardImage(cardData.data, cardData.data.title || 'Fruit'));
             } else {
                 el.innerHTML = `<span style="color:white;padding:4px;text-align:center;font-size:10px;line-height:1.2;word-break:break-word;">${cardData.data.title || 'Fruit'}</span>`;
             }
@@ -433,6 +459,64 @@ class Game {
         return el;
     }
 
+    /**
+     * <picture> for a card: the browser picks AVIF/WebP at the size it needs
+     * from image_variants, and falls back to the original image.
+     */
+    createCardImage(data, alt) {
+        const sheet = data.sprite && this.atlas?.sheets[data.sprite.sheet];
+        if (sheet) return this.createSpriteImage(sheet, data.sprite, alt);
+
+        const img = document.createElement('img');
+        img.src = data.image;
+        img.alt = alt;
+        img.decoding = 'async';
+        img.style.cssText = `
+            max-width: 95%;
+            max-height: 95%;
+            object-fit: contain;
+            border-radius: 4px;
+        `;
+
+        const variants = data.image_variants;
+        if (!variants) return img;
+
+        img.width = variants.width;
+        img.height = variants.height;
+        const picture = document.createElement('picture');
+        variants.formats.forEach(format => {
+            const source = document.createElement('source');
+            source.type = format.type;
+            source.srcset = format.sizes.map(size => `${size.url} ${size.width}w`).join(', ');
+            source.sizes = `${CARD_IMAGE_CSS_WIDTH}px`;
+            picture.appendChild(source);
+        });
+        picture.style.cssText = 'display:contents;';
+        picture.appendChild(img);
+        return picture;
+    }
+
+    /** A card image cut from an atlas sheet, scaled to fit like the <img> above. */
+    createSpriteImage(sheet, sprite, alt) {
+        const scale = Math.min(
+            (CARD_IMAGE_CSS_WIDTH * 0.95) / sprite.width,
+            (CARD_IMAGE_CSS_HEIGHT * 0.95) / sprite.height,
+        );
+        const el = document.createElement('div');
+        el.setAttribute('role', 'img');
+        el.setAttribute('aria-label', alt);
+        el.style.cssText = `
+            width: ${sprite.width * scale}px;
+            height: ${sprite.height * scale}px;
+            background-image: url('${sheet.url}');
+            background-size: ${sheet.width * scale}px ${sheet.height * scale}px;
+            background-position: ${-sprite.x * scale}px ${-sprite.y * scale}px;
+            background-repeat: no-repeat;
+            border-radius: 4px;
+        `;
+        return el;
+    }
+
     onCardClick(index) {
         if (this.isPaused || this.isProcessing) return;
 
@@ -482,17 +566,8 @@ class Game {
                 slot.el.style.background = 'linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)';
 
                 if (slot.el.dataset.image) {
-                    const img = document.createElement('img');
-                    img.src = slot.el.dataset.image;
-                    img.alt = 'Card';
-                    img.style.cssText = `
-                        max-width: 95%;
-                        max-height: 95%;
-                        object-fit: contain;
-                        border-radius: 4px;
-                    `;
                     slot.el.innerHTML = '';
-                    slot.el.appendChild(img);
+                    slot.el.appendChild(this.createCardImage(slot.card.data, 'Card'));
                 } else {
                     slot.el.innerHTML = `<span style="color:white;padding:4px;text-align:center;font-size:9px;line-height:1.2;word-break:break-word;">${slot.el.dataset.title || 'Text'}</span>`;
                 }
@@ -512,6 +587,34 @@ class Game {
         setTimeout(() => this.checkMatch(), 300);
     }
 
+    logMove(type, text, fruit) {
+        const event = { t: Math.round(performance.now() - this.gameStartedAt), type };
+        if (text !== undefined) {
+            event.text = text;
+            event.fruit = fruit;
+        }
+        this.moveLog.push(event);
+    }
+
+    uploadMoves() {
+        if (this.logUpload || !this.sessionId) return this.logUpload;
+
+        const events = this.moveLog.slice(this.logAcked, this.logAcked + this.LOG_CHUNK_SIZE);
+        if (!events.length) return null;
+
+        const sessionId = this.sessionId;
+        this.logUpload = this.api.uploadEvents(sessionId, this.logSeq, events)
+            .then(result => {
+                if (sessionId !== this.sessionId) return;
+                // A retried seq keeps the copy that landed first
+                this.logAcked += (result && result.stored_events) || events.length;
+                this.logSeq++;
+            })
+            .catch(e => console.warn('[Game] Move upload failed, retrying with the next chunk:', e))
+            .finally(() => { this.logUpload = null; });
+        return this.logUpload;
+    }
+
     checkMatch() {
         this.isProcessing = true;
 
@@ -525,6 +628,8 @@ class Game {
 
         const isMatch = textSlot.card.pairCode === fruitSlot.card.pairCode;
 
+        this.logMove(isMatch ? 'match' : 'miss', textSlot.card.data.id, fruitSlot.card.data.id);
+
         if (isMatch) {
             this.handleSuccess();
         } else {
@@ -695,16 +800,7 @@ class Game {
             el.innerHTML = '';
 
             if (newFruitCard.image) {
-                const img = document.createElement('img');
-                img.src = newFruitCard.image;
-                img.alt = newFruitCard.title || 'Fruit';
-                img.style.cssText = `
-                    max-width: 95%;
-                    max-height: 95%;
-                    object-fit: contain;
-                    border-radius: 4px;
-                `;
-                el.appendChild(img);
+                el.appendChild(this.createCardImage(newFruitCard, newFruitCard.title || 'Fruit'));
             } else {
                 el.innerHTML = `<span style="color:white;padding:4px;text-align:center;font-size:10px;line-height:1.2;word-break:break-word;">${newFruitCard.title || 'Fruit'}</span>`;
             }
@@ -721,6 +817,7 @@ class Game {
 
         if (window.soundManager) soundManager.play('card_shuffle');
 
+        this.logMove('shuffle');
         this.shuffleArray(this.allCards);
 
         const grid = document.getElementById('game-grid');
@@ -901,12 +998,21 @@ class Game {
         if (this.sessionId) {
             try {
                 const duration = this.timeSeconds - Math.max(0, this.timer);
+
+                // The whole log goes with finish: chunks that reached another
+                // worker's buffer, or were evicted, are not needed
+                clearInterval(this.logInterval);
+                this.logInterval = null;
+                if (this.logUpload) await this.logUpload;
+
                 const result = await this.api.finishSession(this.sessionId, {
                     score_balls: this.score,
                     duration: duration,
                     correct_count: this.stats.correct,
                     wrong_count: this.stats.wrong,
-                    best_combo: this.stats.bestCombo
+                    best_combo: this.stats.bestCombo,
+                    log_json: { events: this.moveLog },
+                    log_complete: true
                 });
 
                 const container = document.getElementById('promos-won-container');
@@ -971,6 +1077,18 @@ class Game {
         }
     }
 
+    async flushOfflineFinishes() {
+        try {
+            const results = await this.api.flushFinishQueue();
+            const codes = results.filter(r => r.status === 'finished' && r.new_promo_code);
+            if (codes.length && window.showToast) {
+                window.showToast(`🎉 Promo code earned offline: ${codes.map(r => r.new_promo_code).join(', ')}`);
+            }
+        } catch (e) {
+            console.warn('[Game] Offline finishes not sent yet:', e);
+        }
+    }
+
     getStats() {
         return {
             score: this.score,
@@ -57,7 +57,7 @@ async function initApp() {
     // Set background image
     const bg = document.getElementById('game-bg');
     if (bg) {
-        bg.style.backgroundImage = "url('/static/images/background.jpg')";
+        bg.style.backgroundImage = `url('${staticUrl('images/background.jpg')}')`;
     }
 
   } catch(e) {
@@ -103,6 +103,9 @@ window.onload = () => {
     // Check if user is already logged in
     checkExistingLogin();
 
+    // Send finishes queued on a bad connection once it is back
+    window.addEventListener('online', () => window.game.flushOfflineFinishes());
+
     // Load pending tickets
     if (typeof loadPendingTickets === 'function') {
         loadPendingTickets();
@@ -187,4 +190,14 @@ window.logout = () => {
   modal.querySelector('.custom-confirm-overlay').onclick = () => {
     modal.remove();
   };
-};
\ No newline at end of file
+};
+
+// ===============================
+// Service worker (static/js/sw.js, served at /sw.js)
+// ===============================
+if ('serviceWorker' in navigator) {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('/sw.js')
+      .catch(e => console.warn('Service worker not registered:', e));
+  });
+}
@@ -10,6 +10,8 @@ class SoundManager {
         this.ambientVolume = 0.2;
 
         this.sounds = {};
+        this.sprite = null;             // {buffer, sounds: {name: [start, duration]}} once decoded
+        this.audioContext = null;
         this.music = null;
         this.ambient = null;
         this.currentMusicKey = null;
@@ -18,8 +20,9 @@ class SoundManager {
         this.isUnlocked = false;
         this.isInitialized = false;
 
-        this.soundPath = '/static/sounds/';
-        this.musicPath = '/static/music/';  // Create this folder and add MP3s
+        this.soundPath = 'sounds/';  // under /static/, resolved by staticUrl()
+        this.musicPath = 'music/';
+        this.manifest = this.readManifest();  // sprite + music built by `manage.py build_audio`
 
         console.log('SoundManager: Ready');
     }
@@ -38,8 +41,20 @@ class SoundManager {
         console.log('SoundManager: Fully initialized');
     }
 
+    readManifest() {
+        const el = document.getElementById('audio-manifest');
+        return el ? JSON.parse(el.textContent) : null;
+    }
+
+    // First entry of [{type, path}] this browser can play, as a URL
+    pickSource(sources) {
+        const probe = document.createElement('audio');
+        const source = (sources || []).find(s => probe.canPlayType(s.type) !== '');
+        return source ? staticUrl(source.path) : null;
+    }
+
     preloadSounds() {
-        const soundFiles = {
+        this.soundFiles = {
             'click': 'click.wav',
             'menu_hover': 'menu_hover.wav',
             'card_select': 'card_select.wav',
@@ -57,8 +72,32 @@ class SoundManager {
             'promo_win': 'big_win.wav'
         };
 
-        for (const [name, file] of Object.entries(soundFiles)) {
-            const audio = new Audio(this.soundPath + file);
+        const spriteUrl = this.manifest?.sprite && window.AudioContext && this.pickSource(this.manifest.sprite.sources);
+        if (spriteUrl) {
+            this.loadSprite(spriteUrl);
+            return;
+        }
+        this.loadSoundFiles();
+    }
+
+    // One request and one decode for every effect; played by offset
+    async loadSprite(url) {
+        try {
+            this.audioContext = new AudioContext();
+            const response = await fetch(url);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const buffer = await this.audioContext.decodeAudioData(await response.arrayBuffer());
+            this.sprite = { buffer, sounds: this.manifest.sprite.sounds };
+            console.log(`Loaded SFX sprite (${Object.keys(this.sprite.sounds).length} sounds)`);
+        } catch (e) {
+            console.warn('Sound sprite failed, loading separate files:', e);
+            this.loadSoundFiles();
+        }
+    }
+
+    loadSoundFiles() {
+        for (const [name, file] of Object.entries(this.soundFiles)) {
+            const audio = new Audio(staticUrl(this.soundPath + file));
             audio.preload = 'auto';
             audio.volume = this.baseVolume * this.masterVolume;
             this.sounds[name] = audio;
@@ -78,7 +117,9 @@ class SoundManager {
 
         this.musicTracks = {};
         for (const [key, file] of Object.entries(musicFiles)) {
-            const audio = new Audio(this.musicPath + file);
+            // Transcoded (and deduplicated) stream when built, else the original file
+            const url = this.pickSource(this.manifest?.music?.[file]) || staticUrl(this.musicPath + file);
+            const audio = new Audio(url);
             audio.loop = true;
             audio.preload = 'metadata';
             audio.volume = 0; // Will be set when playing
@@ -119,6 +160,7 @@ class SoundManager {
             if (this.isUnlocked) return;
 
             // Play a silent sound or short click to unlock audio context
+            this.audioContext?.resume().catch(() => {});
             this.play('click', 0);
 
             // Also try to start music context
@@ -180,6 +222,11 @@ class SoundManager {
     play(soundName, volumeMultiplier = 1.0) {
         if (!this.enabled || !this.isUnlocked) return;
 
+        if (this.sprite) {
+            this.playSprite(soundName, volumeMultiplier);
+            return;
+        }
+
         const base = this.sounds[soundName];
         if (!base) {
             console.warn(`Sound not found: ${soundName}`);
@@ -197,6 +244,25 @@ class SoundManager {
         }
     }
 
+    playSprite(soundName, volumeMultiplier) {
+        const file = this.soundFiles[soundName];
+        const span = file && this.sprite.sounds[file.replace(/\.wav$/, '')];
+        if (!span) {
+            console.warn(`Sound not found: ${soundName}`);
+            return;
+        }
+
+        const ctx = this.audioContext;
+        const gain = ctx.createGain();
+        gain.gain.value = this.baseVolume * this.masterVolume * volumeMultiplier;
+        gain.connect(ctx.destination);
+
+        const source = ctx.createBufferSource();
+        source.buffer = this.sprite.buffer;
+        source.connect(gain);
+        source.start(0, span[0], span[1]);
+    }
+
     // Background Music Control
     async playMusic(key = 'menu_chill', fadeIn = true) {
         if (!this.enabled || !this.isUnlocked) return;
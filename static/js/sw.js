@@ -0,0 +1,136 @@
+// static/js/sw.js
+// Service worker: repeat visits start from the Cache API, not the network.
+//
+// Served at /sw.js by core.fileserving.service_worker, which prepends
+//   self.ASSET_MANIFEST = {build: "...", precache: ["/", "/static/js/game.3f2a....js", ...]}
+// so every deploy changes this script: the browser installs the new
+// worker, which precaches the new hashed files and drops the old ones.
+//
+//   /                     cached shell, revalidated in the background
+//   /static/<hashed>      cache first (names change with the content)
+//   /api/game/config/     stale-while-revalidate: the cached config is
+//                         answered at once; /api/game/version/ is asked in
+//                         the background and the config (and the card
+//                         atlas sheets of that version) refetched only
+//                         when the version changed
+//   /media/...            card images, cache first, one cache per config version
+//
+// Everything else (other API calls, POSTs, range requests) goes to the network.
+
+const BUILD = self.ASSET_MANIFEST?.build || 'dev';
+const PRECACHE = self.ASSET_MANIFEST?.precache || ['/'];
+
+const STATIC_CACHE = `static-${BUILD}`;
+const CONFIG_CACHE = 'config';
+const CARDS_PREFIX = 'cards-v';
+const CONFIG_URL = '/api/game/config/';
+const VERSION_URL = '/api/game/version/';
+const HASHED = /\.[0-9a-f]{12}\.[^./]+$/;   // core.storage / ManifestStaticFilesStorage names
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then(cache => cache.addAll(PRECACHE))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (name.startsWith('static-') && name !== STATIC_CACHE) await caches.delete(name);
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin || request.headers.has('Range')) return;
+
+    if (request.mode === 'navigate' && url.pathname === '/') {
+        event.respondWith(shell(event));
+    } else if (url.pathname === CONFIG_URL) {
+        event.respondWith(config(event));
+    } else if (url.pathname.startsWith('/static/') && HASHED.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (url.pathname.startsWith('/media/')) {
+        event.respondWith(cardsCacheName().then(name => name ? cacheFirst(request, name) : fetch(request)));
+    }
+});
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) await cache.put(request, response.clone());
+    return response;
+}
+
+// ===============================
+// Game page
+// ===============================
+async function shell(event) {
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match('/');
+    // Revalidated with the ETag (usually a 304); also renews the csrftoken cookie
+    const network = fetch('/', { credentials: 'include' }).then(async response => {
+        if (response.ok) await cache.put('/', response.clone());
+        return response;
+    });
+    if (!cached) return network;
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+}
+
+// ===============================
+// Config + card images
+// ===============================
+async function config(event) {
+    const cached = await (await caches.open(CONFIG_CACHE)).match(CONFIG_URL);
+    if (!cached) return refreshConfig(event);
+    event.waitUntil(checkVersion(cached).catch(() => {}));   // offline: keep what we have
+    return cached;
+}
+
+async function checkVersion(cached) {
+    const response = await fetch(VERSION_URL, { credentials: 'include' });
+    if (!response.ok) return;
+    const { version } = await response.json();
+    const current = (await cached.clone().json()).config?.version;
+    if (version !== current) await refreshConfig();
+}
+
+// With `event` (nothing cached yet) the page gets the config without
+// waiting for the sheets to download
+async function refreshConfig(event = null) {
+    const response = await fetch(CONFIG_URL, { credentials: 'include' });
+    if (!response.ok) return response;
+    const data = await response.clone().json();
+    await (await caches.open(CONFIG_CACHE)).put(CONFIG_URL, response.clone());
+    const cards = precacheCards(data).catch(e => console.warn('[SW] Card images not cached:', e));
+    if (event) event.waitUntil(cards);
+    else await cards;
+    return response;
+}
+
+// Atlas sheets of this config version; sheets already cached under an
+// older version are copied over (their names are content hashes)
+async function precacheCards(data) {
+    const name = CARDS_PREFIX + data.config?.version;
+    const cache = await caches.open(name);
+    const urls = (data.atlas?.sheets || []).map(sheet => sheet.url);
+    await Promise.all(urls.map(async url => {
+        const response = (await caches.match(url)) || (await fetch(url));
+        if (response.ok) await cache.put(url, response);
+    }));
+    for (const key of await caches.keys()) {
+        if (key.startsWith(CARDS_PREFIX) && key !== name) await caches.delete(key);
+    }
+}
+
+async function cardsCacheName() {
+    return (await caches.keys()).find(name => name.startsWith(CARDS_PREFIX)) || null;
+}
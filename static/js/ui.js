@@ -24,7 +24,7 @@ class UI {
     }
 
     startBackgroundRotation() {
-        const images = ['bg1.jpg', 'bg2.jpg', 'bg3.jpg', 'bg4.jpg'].map(f => `/static/images/${f}`);
+        const images = ['bg1.jpg', 'bg2.jpg', 'bg3.jpg', 'bg4.jpg'].map(f => staticUrl(`images/${f}`));
         let idx = 0;
         const container = document.getElementById('bg-container');
         if (!container) return;
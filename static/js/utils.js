@@ -1,5 +1,18 @@
 // static/js/utils.js
 
+// ===============================
+// Static asset URLs
+// ===============================
+// Content-hashed URL of a static file (map inlined by index.html after
+// collectstatic), else its plain /static/ URL
+window.staticUrl = function (path) {
+  if (!window._staticUrls) {
+    const el = document.getElementById('static-urls');
+    window._staticUrls = el ? JSON.parse(el.textContent) : {};
+  }
+  return window._staticUrls[path] || `/static/${path}`;
+};
+
 // ===============================
 // Toast + Clipboard helpers
 // ===============================